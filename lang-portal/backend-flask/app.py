@@ -1,7 +1,17 @@
+import atexit
+
 from flask import Flask, g
-from flask_cors import CORS
 
 from lib.db import Db
+from lib.review_events import ReviewEventQueue
+import lib.json_provider
+import lib.compression
+import lib.tenants
+import lib.cors
+from lib.maintenance import MaintenanceScheduler
+from lib.kana_drill import DrillCache
+from lib.recommendations import ModelCache
+from lib.limits import Limits
 
 import routes.words
 import routes.groups
@@ -10,28 +20,10 @@ import routes.dashboard
 import routes.study_activities
 import routes.vocab_importer
 import routes.writing_practice
-from dotenv import load_dotenv
-
-load_dotenv()
-
-def get_allowed_origins(app):
-    try:
-        cursor = app.db.cursor()
-        cursor.execute('SELECT url FROM study_activities')
-        urls = cursor.fetchall()
-        # Convert URLs to origins (e.g., https://example.com/app -> https://example.com)
-        origins = set()
-        for url in urls:
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(url['url'])
-                origin = f"{parsed.scheme}://{parsed.netloc}"
-                origins.add(origin)
-            except:
-                continue
-        return list(origins) if origins else ["*"]
-    except:
-        return ["*"]  # Fallback to allow all origins if there's an error
+import routes.review_events
+import routes.snapshots
+import routes.recommendations
+import routes.metrics
 
 def create_app(test_config=None):
     app = Flask(__name__)
@@ -42,26 +34,113 @@ def create_app(test_config=None):
         )
     else:
         app.config.update(test_config)
+
+    # Review events are group-committed: a batch is written once it reaches
+    # BATCH_SIZE events or FLUSH_MS have passed since the first one arrived.
+    # DURABILITY is the default for requests ("async" answers 202 before the
+    # write, "sync" waits for the commit); SYNCHRONOUS is the writer's PRAGMA.
+    app.config.setdefault('REVIEW_EVENTS_BATCH_SIZE', 100)
+    app.config.setdefault('REVIEW_EVENTS_FLUSH_MS', 50)
+    app.config.setdefault('REVIEW_EVENTS_DURABILITY', 'async')
+    app.config.setdefault('REVIEW_EVENTS_SYNCHRONOUS', 'NORMAL')
+    app.config.setdefault('REVIEW_EVENTS_SYNC_TIMEOUT', 5)
+
+    # Optional background ANALYZE / PRAGMA optimize / WAL checkpoint /
+    # incremental vacuum (same as `invoke maintain-db`); off unless set
+    app.config.setdefault('MAINTENANCE_INTERVAL_SECONDS', None)
+    app.config.setdefault('MAINTENANCE_VACUUM_PAGES', None)
+
+    # Load manga_ocr in a background thread at startup instead of on the
+    # first /writing-practice/verify-kana request
+    app.config.setdefault('WRITING_PRACTICE_PRELOAD_OCR', False)
+
+    # Local kana classifier tried before manga_ocr (see lib/kana_classifier.py);
+    # trained with `invoke train-kana-classifier`, skipped if the file is missing
+    app.config.setdefault('KANA_CLASSIFIER_PATH', 'kana_classifier.npz')
+    app.config.setdefault('KANA_CLASSIFIER_MIN_SIMILARITY', 0.8)
+    app.config.setdefault('KANA_CLASSIFIER_MIN_MARGIN', 0.05)
+
+    # Append every drawing verify-kana grades, as a normalized bitmap with its
+    # label, to this dataset file (see lib/kana_dataset.py); off unless set
+    app.config.setdefault('KANA_DATASET_PATH', None)
+
+    # Most ids accepted by /words/batch at once
+    app.config.setdefault('WORDS_BATCH_LIMIT', 1000)
+
+    # Most drawings accepted by /writing-practice/verify-kana/batch at once
+    app.config.setdefault('WRITING_PRACTICE_BATCH_LIMIT', 50)
+    # Largest drawing (width * height) verify-kana will decode
+    app.config.setdefault('WRITING_PRACTICE_MAX_PIXELS', 2048 * 2048)
+
+    # /writing-practice/drill: most kana per call, and how long a learner's
+    # cached error weights are used before kana_stats is read again
+    app.config.setdefault('WRITING_PRACTICE_DRILL_LIMIT', 100)
+    app.config.setdefault('WRITING_PRACTICE_DRILL_CACHE_SECONDS', 300)
+
+    # Most words per /api/recommendations call, and how many databases'
+    # models (one per learner in multi-tenant mode) are kept in memory
+    app.config.setdefault('RECOMMENDATIONS_LIMIT', 100)
+    app.config.setdefault('RECOMMENDATIONS_CACHE_SIZE', 64)
+
+    # Hot backups (see lib/snapshots.py): where they go, and how many pages
+    # are copied per step with what pause in between. The /api/admin
+    # endpoints are only enabled when ADMIN_TOKEN is set.
+    app.config.setdefault('SNAPSHOT_DIR', 'snapshots')
+    app.config.setdefault('SNAPSHOT_PAGES_PER_STEP', 256)
+    app.config.setdefault('SNAPSHOT_PAUSE_MS', 5)
+    app.config.setdefault('ADMIN_TOKEN', None)
+
+    # Concurrency limits for the expensive endpoints (see lib/limits.py): how
+    # many requests run at once, how many more may wait and for how many
+    # seconds before they get 429 too. GET /api/metrics/limits reports them.
+    app.config.setdefault('CONCURRENCY_LIMITS', {
+        'verify_kana': {'concurrency': 2, 'queue': 8, 'timeout': 2.0},
+        'get_new_words': {'concurrency': 4, 'queue': 4, 'timeout': 5.0}
+    })
+    # Seconds /get_new_words waits for the Groq API
+    app.config.setdefault('GET_NEW_WORDS_TIMEOUT', 30)
+
+    # Origins allowed besides those of the study activities ("*" allows any)
+    app.config.setdefault('CORS_ORIGINS', ["*"])
     
-    # Initialize database first since we need it for CORS configuration
-    app.db = Db(database=app.config['DATABASE'])
-    
-    # Get allowed origins from study_activities table
-    allowed_origins = get_allowed_origins(app)
-    
-    # In development, add localhost to allowed origins
-    if app.debug:
-        allowed_origins.extend(["http://localhost:8080", "http://127.0.0.1:8080"])
+    # Fast JSON serialization (orjson when installed) and gzip/brotli responses
+    lib.json_provider.init_app(app)
+    lib.compression.init_app(app)
     
-    # Configure CORS with combined origins
-    CORS(app, resources={
-        r"/*": {
-            "origins": allowed_origins,
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
-        }
-    })
+    # Per-learner databases when TENANT_DIR is set (see lib/tenants.py)
+    lib.tenants.init_app(app)
+    if app.tenants is not None:
+        atexit.register(app.tenants.close)
+
+    # CORS_ORIGINS plus the study activities' own origins; preflights are
+    # answered from memory (see lib/cors.py)
+    lib.cors.init_app(app)
 
+    # Initialize database
+    app.db = Db(database=app.config['DATABASE'], tenants=app.tenants)
+
+    app.review_events = ReviewEventQueue(
+        database=app.config['DATABASE'],
+        batch_size=app.config['REVIEW_EVENTS_BATCH_SIZE'],
+        flush_interval_ms=app.config['REVIEW_EVENTS_FLUSH_MS'],
+        synchronous=app.config['REVIEW_EVENTS_SYNCHRONOUS']
+    )
+    # Flush buffered events before the process exits
+    atexit.register(app.review_events.close)
+
+    app.kana_drills = DrillCache(max_age=app.config['WRITING_PRACTICE_DRILL_CACHE_SECONDS'])
+    app.recommendations = ModelCache(max_entries=app.config['RECOMMENDATIONS_CACHE_SIZE'])
+    app.limits = Limits(app.config['CONCURRENCY_LIMITS'])
+
+    if app.config['MAINTENANCE_INTERVAL_SECONDS']:
+        app.maintenance = MaintenanceScheduler(
+            database=app.config['DATABASE'],
+            interval=app.config['MAINTENANCE_INTERVAL_SECONDS'],
+            vacuum_pages=app.config['MAINTENANCE_VACUUM_PAGES']
+        )
+        app.maintenance.start()
+        atexit.register(app.maintenance.stop)
+    
     # Close database connection
     @app.teardown_appcontext
     def close_db(exception):
@@ -75,6 +154,10 @@ def create_app(test_config=None):
     routes.study_activities.load(app)
     routes.vocab_importer.load(app)
     routes.writing_practice.load(app)
+    routes.review_events.load(app)
+    routes.snapshots.load(app)
+    routes.recommendations.load(app)
+    routes.metrics.load(app)
     
     return app
 
@@ -0,0 +1,77 @@
+# Compares JSON providers and response encodings on /words-shaped payloads:
+#
+#   python benchmarks/json_payloads.py --words 5000 --repeat 50
+#
+# Reports serialization time per response and bytes on the wire for identity,
+# gzip and (when installed) brotli encoding.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from lib import compression, json_provider
+
+def make_payload(count):
+  return {
+    "words": [{
+      "id": i,
+      "kanji": "運動する",
+      "romaji": f"undousuru{i}",
+      "english": "to exercise",
+      "correct_count": i % 17,
+      "wrong_count": i % 5,
+      "difficulty": (i % 100) / 100
+    } for i in range(count)],
+    "total_pages": 1,
+    "current_page": 1,
+    "total_words": count
+  }
+
+def time_provider(provider_class, payload, repeat):
+  app = Flask(__name__)
+  app.json = provider_class(app)
+  with app.app_context():
+    start = time.perf_counter()
+    for _ in range(repeat):
+      body = app.json.response(payload).get_data()
+    elapsed = (time.perf_counter() - start) / repeat
+  return elapsed, body
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--words', type=int, default=5000)
+  parser.add_argument('--repeat', type=int, default=50)
+  args = parser.parse_args()
+
+  payload = make_payload(args.words)
+
+  providers = [('stdlib', DefaultJSONProvider)]
+  if json_provider.orjson is not None:
+    providers.append(('orjson', json_provider.OrjsonProvider))
+  else:
+    print("orjson is not installed, only timing the stdlib provider")
+
+  print(f"Serialization of {args.words} words (mean of {args.repeat}):")
+  body = None
+  for name, provider_class in providers:
+    elapsed, body = time_provider(provider_class, payload, args.repeat)
+    print(f"  {name:<8} {elapsed * 1000:8.2f} ms  {len(body):>10,} bytes")
+
+  app = Flask(__name__)
+  compression.init_app(app)
+  print("Bytes on the wire:")
+  print(f"  {'identity':<8} {len(body):>10,} bytes")
+  encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+  for encoding in encodings:
+    start = time.perf_counter()
+    compressed = compression.compress(body, encoding, app)
+    elapsed = time.perf_counter() - start
+    print(f"  {encoding:<8} {len(compressed):>10,} bytes  ({len(compressed) / len(body):.1%}, {elapsed * 1000:.2f} ms)")
+
+if __name__ == '__main__':
+  main()
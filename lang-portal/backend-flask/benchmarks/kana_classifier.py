@@ -0,0 +1,124 @@
+# Accuracy and latency of the local kana classifier, optionally against
+# manga_ocr on the same drawings:
+#
+#   python benchmarks/kana_classifier.py --font NotoSansJP-Regular.ttf
+#   python benchmarks/kana_classifier.py --model kana_classifier.npz --eval drawings.npz --ocr
+#   python benchmarks/kana_classifier.py --synthetic 92   # latency only, no font needed
+#
+# With --font the templates and the evaluation drawings are rendered from the
+# font with different random seeds. --eval takes an .npz with images and
+# labels arrays (e.g. drawings collected from learners). --synthetic draws
+# random stroke "glyphs" per class, which says nothing about accuracy on real
+# kana but times a model of realistic size.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from kana_dictionary import ALL_HIRAGANA_LIST, ALL_KATAKANA_LIST
+from lib.kana_classifier import KanaClassifier, normalize, render_samples
+
+def synthetic_samples(classes, variants, seed, size=128):
+  # Each class is a fixed set of strokes, jittered per variant
+  from PIL import Image, ImageDraw
+  shapes = np.random.default_rng(1234).uniform(0.15, 0.85, (classes, 3, 4, 2))
+  rng = np.random.default_rng(seed)
+  images, labels = [], []
+  for label, strokes in enumerate(shapes):
+    for _ in range(variants):
+      image = Image.new('L', (size, size), 255)
+      draw = ImageDraw.Draw(image)
+      scale, shift = rng.uniform(0.8, 1.0), rng.uniform(-0.05, 0.05, 2)
+      for stroke in strokes:
+        points = (stroke * scale + shift + rng.normal(0, 0.01, stroke.shape)) * size
+        draw.line([tuple(p) for p in points], fill=0, width=int(rng.integers(4, 9)))
+      images.append(np.array(image))
+      labels.append(f'k{label}')
+  return images, labels
+
+def timed(function, *args):
+  start = time.perf_counter()
+  result = function(*args)
+  return result, time.perf_counter() - start
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--model', help='Trained classifier (.npz); built from --font or --synthetic when omitted')
+  parser.add_argument('--font', help='Font with kana glyphs to render training/evaluation drawings from')
+  parser.add_argument('--eval', help='.npz with images and labels arrays to evaluate on')
+  parser.add_argument('--synthetic', type=int, default=0, help='Number of random stroke classes to time on')
+  parser.add_argument('--variants', type=int, default=12, help='Rendered drawings per kana')
+  parser.add_argument('--min-similarity', type=float, default=0.8)
+  parser.add_argument('--min-margin', type=float, default=0.05)
+  parser.add_argument('--ocr', action='store_true', help='Also time manga_ocr on the evaluation drawings')
+  args = parser.parse_args()
+
+  kana = ALL_HIRAGANA_LIST + ALL_KATAKANA_LIST
+  if args.synthetic:
+    train = synthetic_samples(args.synthetic, args.variants, seed=0)
+    evaluation = synthetic_samples(args.synthetic, max(2, args.variants // 4), seed=1)
+  elif args.font:
+    train = render_samples(args.font, kana, variants=args.variants, seed=0)
+    evaluation = render_samples(args.font, kana, variants=max(2, args.variants // 4), seed=1)
+  else:
+    train = None
+    evaluation = None
+
+  if args.eval:
+    with np.load(args.eval) as data:
+      evaluation = (list(data['images']), [str(label) for label in data['labels']])
+  if evaluation is None:
+    sys.exit("Nothing to evaluate on: pass --font, --eval or --synthetic")
+
+  if args.model:
+    classifier = KanaClassifier.load(args.model)
+  elif train is not None:
+    classifier, seconds = timed(KanaClassifier.fit, *train)
+    print(f"Trained on {len(train[0])} drawings in {seconds * 1000:.0f} ms")
+  else:
+    sys.exit("No model: pass --model, --font or --synthetic")
+  classifier.min_similarity, classifier.min_margin = args.min_similarity, args.min_margin
+
+  images, labels = evaluation
+  print(f"{len(classifier.template_labels)} templates, {len(classifier.labels)} classes, {len(images)} evaluation drawings")
+
+  normalize_times, classify_times, results = [], [], []
+  for image in images:
+    vector, seconds = timed(normalize, image)
+    normalize_times.append(seconds)
+    result, seconds = timed(classifier.classify, vector)
+    classify_times.append(seconds)
+    results.append(result)
+
+  vectors = np.stack([normalize(image) for image in images])
+  _, batch_seconds = timed(classifier.classify_batch, vectors)
+
+  confident = [(result[0] == label) for result, label in zip(results, labels) if result[3]]
+  correct = sum(result[0] == label for result, label in zip(results, labels))
+  print(f"Coverage (answered locally)   {len(confident) / len(images):7.1%}")
+  print(f"Accuracy when confident       {sum(confident) / len(confident) if confident else 0:7.1%}")
+  print(f"Top-1 accuracy overall        {correct / len(images):7.1%}")
+  for name, times in [('normalize', normalize_times), ('classify', classify_times)]:
+    times = np.array(times) * 1e6
+    print(f"{name:<12} mean {times.mean():8.1f} us  p50 {np.percentile(times, 50):8.1f} us  p99 {np.percentile(times, 99):8.1f} us")
+  print(f"{'batch':<12} {batch_seconds / len(images) * 1e6:8.1f} us per drawing ({len(images)} at once)")
+
+  if args.ocr:
+    from PIL import Image
+    from manga_ocr import MangaOcr
+    ocr, seconds = timed(MangaOcr)
+    print(f"manga_ocr loaded in {seconds:.1f} s")
+    ocr_times, ocr_correct = [], 0
+    for image, label in zip(images, labels):
+      text, seconds = timed(ocr, Image.fromarray(image))
+      ocr_times.append(seconds)
+      ocr_correct += text[:1] == label
+    times = np.array(ocr_times) * 1000
+    print(f"{'manga_ocr':<12} mean {times.mean():8.1f} ms  p99 {np.percentile(times, 99):8.1f} ms  accuracy {ocr_correct / len(images):.1%}")
+
+if __name__ == '__main__':
+  main()
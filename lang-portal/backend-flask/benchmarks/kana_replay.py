@@ -0,0 +1,106 @@
+# Replays drawings captured by verify-kana (KANA_DATASET_PATH, see
+# lib/kana_dataset.py) through the recognition pipeline and reports accuracy
+# against the requested kana and throughput, so preprocessing and model
+# changes can be compared on the same drawings:
+#
+#   python benchmarks/kana_replay.py drawings.npy --model kana_classifier.npz
+#   python benchmarks/kana_replay.py drawings.npy --model kana_classifier.npz --ocr --batch-size 16
+#   python benchmarks/kana_replay.py drawings.npy --ocr --type katakana --limit 500
+#
+# Like verify-kana, confident classifier answers are final and everything
+# else goes to manga_ocr (with --ocr; otherwise it counts as unanswered).
+# A drawing counts as correct when the answer matches the kana the learner
+# was asked for, so drawings the learner got wrong lower every engine's
+# accuracy alike; "agreement" is how often the replay gave the answer the
+# app gave at capture time.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lib import kana_dataset
+from lib.kana_classifier import KanaClassifier, normalize
+
+def replay(records, classifier=None, ocr=False, batch_size=16):
+  # Returns (answers, engines, seconds): the pipeline's answer per record
+  # ('' when unanswered), the engine that gave it, and the wall time taken
+  from routes.writing_practice import KANA_CANDIDATES, first_kana, prepare_for_ocr, recognize_batch
+  answers = [''] * len(records)
+  engines = ['none'] * len(records)
+  start = time.perf_counter()
+  for offset in range(0, len(records), batch_size):
+    batch = records[offset:offset + batch_size]
+    images = np.asarray(batch['image'])
+    pending = list(range(len(batch)))
+    if classifier is not None:
+      vectors = [normalize(image) for image in images]
+      by_type = {}
+      for i in pending:
+        if vectors[i] is not None:
+          by_type.setdefault(str(batch['kana_type'][i]), []).append(i)
+      for kana_type, indexes in by_type.items():
+        results = classifier.classify_batch(np.stack([vectors[i] for i in indexes]),
+                                            candidates=KANA_CANDIDATES.get(kana_type))
+        for i, (label, _, _, confident) in zip(indexes, results):
+          if confident:
+            answers[offset + i], engines[offset + i] = label, 'classifier'
+      pending = [i for i in pending if engines[offset + i] == 'none']
+    if ocr and pending:
+      texts = recognize_batch([prepare_for_ocr(images[i])[0] for i in pending])
+      for i, text in zip(pending, texts):
+        answers[offset + i], engines[offset + i] = first_kana(text), 'manga_ocr'
+  return answers, engines, time.perf_counter() - start
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('dataset', help='Dataset captured with KANA_DATASET_PATH (.npy)')
+  parser.add_argument('--model', help='Trained classifier (.npz) tried before manga_ocr')
+  parser.add_argument('--ocr', action='store_true', help='Send drawings the classifier is unsure of to manga_ocr')
+  parser.add_argument('--type', choices=['hiragana', 'katakana'], help='Only replay this kana type')
+  parser.add_argument('--limit', type=int, default=0, help='Only replay the first N drawings')
+  parser.add_argument('--batch-size', type=int, default=16)
+  parser.add_argument('--min-similarity', type=float, default=0.8)
+  parser.add_argument('--min-margin', type=float, default=0.05)
+  args = parser.parse_args()
+
+  if not args.model and not args.ocr:
+    sys.exit("Nothing to replay through: pass --model and/or --ocr")
+
+  records = kana_dataset.load(args.dataset)
+  if args.type:
+    records = records[records['kana_type'] == args.type]
+  if args.limit:
+    records = records[:args.limit]
+  if len(records) == 0:
+    sys.exit("No drawings to replay")
+
+  classifier = None
+  if args.model:
+    classifier = KanaClassifier.load(args.model, min_similarity=args.min_similarity, min_margin=args.min_margin)
+  if args.ocr:
+    from routes.writing_practice import get_ocr
+    start = time.perf_counter()
+    get_ocr()
+    print(f"manga_ocr loaded in {time.perf_counter() - start:.1f} s")
+
+  answers, engines, seconds = replay(records, classifier, args.ocr, args.batch_size)
+
+  labels = [str(label) for label in records['label']]
+  captured = [str(answer) for answer in records['recognized']]
+  correct = [answer == label for answer, label in zip(answers, labels)]
+  print(f"{len(records)} drawings, {len(set(labels))} kana")
+  print(f"Accuracy                      {sum(correct) / len(records):7.1%}")
+  print(f"Accuracy at capture time      {sum(a == l for a, l in zip(captured, labels)) / len(records):7.1%}")
+  print(f"Agreement with capture time   {sum(a == c for a, c in zip(answers, captured)) / len(records):7.1%}")
+  for engine in ['classifier', 'manga_ocr', 'none']:
+    answered = [ok for ok, used in zip(correct, engines) if used == engine]
+    if answered:
+      print(f"{engine:<12} {len(answered):6d} drawings ({len(answered) / len(records):6.1%}), {sum(answered) / len(answered):6.1%} correct")
+  print(f"Throughput    {len(records) / seconds:8.1f} drawings/s, {seconds / len(records) * 1000:.2f} ms per drawing")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,302 @@
+# Load generator for the production request mix: create a study session,
+# page through words, submit reviews, look at the dashboard and check drawn
+# kana with the OCR route.
+#
+#   python benchmarks/loadgen.py --users 20 --duration 60 --think-time 0.5
+#   python benchmarks/loadgen.py --url http://127.0.0.1:5000 --mix create=1,words=4,review=4,dashboard=1,ocr=0
+#
+# Without --url the app is built in-process with create_app() and driven
+# through one Flask test client per virtual user. It runs against a
+# temporary copy of --database (and a temporary TENANT_DIR with --learners),
+# so the synthetic sessions and reviews never reach the real study history;
+# --in-place writes to --database itself. Each user picks its next
+# step at random, weighted by --mix, and waits an exponentially distributed
+# think time (mean --think-time seconds) between steps. Reports throughput,
+# error rate and latency percentiles per step.
+import argparse
+import atexit
+import base64
+import io
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+STEPS = ['create', 'words', 'review', 'dashboard', 'ocr']
+DEFAULT_MIX = 'create=1,words=3,review=3,dashboard=1,ocr=1'
+PERCENTILES = [50, 90, 95, 99]
+
+# Kana the synthetic drawings are labelled with; the strokes are only a rough
+# stand-in for a learner's handwriting, so OCR accuracy is not meaningful here
+KANA = ['あ', 'い', 'う', 'え', 'お', 'か', 'き', 'く', 'け', 'こ']
+
+def parse_mix(value):
+  weights = {}
+  for part in value.split(','):
+    name, _, weight = part.partition('=')
+    name = name.strip()
+    if name not in STEPS:
+      raise argparse.ArgumentTypeError(f"Unknown step {name!r}, expected one of {', '.join(STEPS)}")
+    weights[name] = float(weight or 1)
+  if not any(weights.values()):
+    raise argparse.ArgumentTypeError("At least one step needs a positive weight")
+  return weights
+
+def draw_kana(rng, size=300, font=None):
+  # Returns a data URL for a PNG of a kana, like the canvas the writing
+  # practice page posts. With a CJK font the glyph is rendered and jittered,
+  # otherwise a few random brush strokes are drawn instead.
+  from PIL import Image, ImageDraw, ImageFont
+  image = Image.new('L', (size, size), 255)
+  draw = ImageDraw.Draw(image)
+  kana = rng.choice(KANA)
+  if font is not None:
+    glyph = ImageFont.truetype(font, int(size * rng.uniform(0.5, 0.7)))
+    offset = (rng.randint(size // 8, size // 4), rng.randint(size // 8, size // 4))
+    draw.text(offset, kana, fill=0, font=glyph)
+  else:
+    for _ in range(rng.randint(2, 4)):
+      x, y = rng.uniform(0.2, 0.8) * size, rng.uniform(0.2, 0.8) * size
+      points = [(x, y)]
+      for _ in range(rng.randint(3, 8)):
+        x = min(max(x + rng.gauss(0, size / 10), 0), size)
+        y = min(max(y + rng.gauss(0, size / 10), 0), size)
+        points.append((x, y))
+      draw.line(points, fill=0, width=rng.randint(6, 12), joint='curve')
+  buffer = io.BytesIO()
+  image.save(buffer, format='PNG')
+  return kana, 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+class TestClientTransport:
+  # Drives the app in-process; one test client per virtual user
+  def __init__(self, app):
+    self.client = app.test_client()
+
+  def request(self, method, path, body=None, headers=None):
+    response = self.client.open(path, method=method, json=body, headers=headers)
+    data = response.get_data()
+    return response.status_code, json.loads(data) if data and response.is_json else None
+
+class HttpTransport:
+  def __init__(self, base_url):
+    self.base_url = base_url.rstrip('/')
+
+  def request(self, method, path, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json', **(headers or {})})
+    try:
+      with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status, json.loads(response.read() or 'null')
+    except urllib.error.HTTPError as e:
+      return e.code, None
+
+class VirtualUser:
+  def __init__(self, transport, args, rng, word_ids, headers):
+    self.transport = transport
+    self.args = args
+    self.rng = rng
+    self.word_ids = word_ids
+    self.headers = headers
+    self.session = None  # (id, word_ids) of the session being reviewed
+
+  def create(self):
+    word_ids = self.rng.sample(self.word_ids, min(self.args.session_words, len(self.word_ids)))
+    status, body = self.transport.request('POST', '/api/study-sessions', {
+      'group_id': self.args.group_id,
+      'study_activity_id': self.args.activity_id,
+      'word_ids': word_ids
+    }, self.headers)
+    if status == 201 and body:
+      self.session = (body['id'], word_ids)
+    return status
+
+  def words(self):
+    page = self.rng.randint(1, self.args.word_pages)
+    return self.transport.request('GET', f'/words?page={page}', headers=self.headers)[0]
+
+  def review(self):
+    session_id, word_ids = self.session
+    reviews = [{'word_id': word_id, 'is_correct': self.rng.random() < 0.7} for word_id in word_ids]
+    status, _ = self.transport.request('POST', f'/api/study-sessions/{session_id}/review',
+                                       {'reviews': reviews}, self.headers)
+    self.session = None
+    return status
+
+  def dashboard(self):
+    return self.transport.request('GET', '/dashboard/stats', headers=self.headers)[0]
+
+  def ocr(self):
+    kana, image = draw_kana(self.rng, font=self.args.font)
+    return self.transport.request('POST', '/writing-practice/verify-kana', {
+      'image': image,
+      'expectedKana': kana,
+      'expectedRomaji': '',
+      'kanaType': 'hiragana'
+    }, self.headers)[0]
+
+class Stats:
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.latencies = defaultdict(list)
+    self.errors = defaultdict(int)
+
+  def record(self, step, seconds, ok):
+    with self.lock:
+      self.latencies[step].append(seconds)
+      if not ok:
+        self.errors[step] += 1
+
+def percentile(sorted_values, p):
+  # Nearest-rank percentile
+  if not sorted_values:
+    return 0.0
+  return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+def run_user(user, args, stats, deadline, weights):
+  steps = [step for step in STEPS if weights.get(step)]
+  step_weights = [weights[step] for step in steps]
+  iterations = 0
+  while time.monotonic() < deadline and (not args.iterations or iterations < args.iterations):
+    step = user.rng.choices(steps, step_weights)[0]
+    # A review needs a session to review, like in the browser
+    if step == 'review' and user.session is None:
+      step = 'create'
+    start = time.perf_counter()
+    try:
+      status = getattr(user, step)()
+      ok = status < 400
+    except Exception:
+      ok = False
+    stats.record(step, time.perf_counter() - start, ok)
+    iterations += 1
+    if args.think_time:
+      time.sleep(user.rng.expovariate(1 / args.think_time))
+
+def copy_database(source, directory):
+  # Consistent copy of source (WAL included) into directory, via the backup API
+  if not os.path.exists(source):
+    sys.exit(f"No database at {source}; run `invoke init-db` or pass --database")
+  target = os.path.join(directory, os.path.basename(source))
+  reader = sqlite3.connect(source)
+  writer = sqlite3.connect(target)
+  try:
+    reader.backup(writer)
+  finally:
+    writer.close()
+    reader.close()
+  return target
+
+def make_transports(args, scratch):
+  # scratch: temporary directory for the in-process app's databases, or None
+  # to use --database and --tenant-dir as they are
+  if args.url:
+    return lambda: HttpTransport(args.url)
+  from app import create_app
+  config = {'DATABASE': args.database}
+  if args.tenant_dir:
+    config['TENANT_DIR'] = args.tenant_dir
+  if scratch is not None:
+    config['DATABASE'] = copy_database(args.database, scratch)
+    if args.tenant_dir:
+      config['TENANT_DIR'] = os.path.join(scratch, 'tenants')
+  app = create_app(config)
+  return lambda: TestClientTransport(app)
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--url', help='Base URL of a running server; the app is built in-process when omitted')
+  parser.add_argument('--database', default='words.db', help='DATABASE the in-process app runs against a copy of')
+  parser.add_argument('--tenant-dir', help='Run the in-process app in multi-tenant mode (in a temporary TENANT_DIR '
+                                           'unless --in-place); users then get separate learners')
+  parser.add_argument('--in-place', action='store_true',
+                      help='Let the in-process app write to --database and --tenant-dir instead of temporary copies')
+  parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+  parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+  parser.add_argument('--iterations', type=int, default=0, help='Stop each user after this many steps (0: no limit)')
+  parser.add_argument('--think-time', type=float, default=0.2, help='Mean seconds between a user\'s steps')
+  parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'Step weights (default {DEFAULT_MIX})')
+  parser.add_argument('--learners', type=int, default=0, help='Send X-Learner-Id for this many learners (0: none)')
+  parser.add_argument('--group-id', type=int, default=1)
+  parser.add_argument('--activity-id', type=int, default=1)
+  parser.add_argument('--session-words', type=int, default=10)
+  parser.add_argument('--word-pages', type=int, default=5)
+  parser.add_argument('--font', help='TrueType font with kana glyphs for the synthetic drawings')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+  args = parser.parse_args()
+
+  learners = args.learners or (args.users if args.tenant_dir else 0)
+  scratch = None
+  if not args.url and not args.in_place:
+    scratch = tempfile.mkdtemp(prefix='loadgen-')
+    # Registered before create_app() registers its own shutdown hooks, so it
+    # runs after them, once the review event writer has flushed and stopped
+    atexit.register(shutil.rmtree, scratch, True)
+  new_transport = make_transports(args, scratch)
+
+  # The words sessions are created from, fetched once up front
+  headers = {'X-Learner-Id': 'learner-0'} if learners else {}
+  transport = new_transport()
+  word_ids = []
+  page, total_pages = 1, 1
+  while page <= min(total_pages, 10):
+    status, body = transport.request('GET', f'/groups/{args.group_id}/words?page={page}', headers=headers)
+    if status != 200 or not body:
+      break
+    word_ids.extend(word['id'] for word in body['words'])
+    total_pages = body.get('total_pages', 1)
+    page += 1
+  if not word_ids:
+    sys.exit(f"Could not load the words of group {args.group_id} (status {status})")
+
+  stats = Stats()
+  users = []
+  for i in range(args.users):
+    headers = {'X-Learner-Id': f'learner-{i % learners}'} if learners else {}
+    users.append(VirtualUser(new_transport(), args, random.Random(args.seed + i), word_ids, headers))
+
+  start = time.monotonic()
+  deadline = start + args.duration
+  threads = [threading.Thread(target=run_user, args=(user, args, stats, deadline, args.mix)) for user in users]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  elapsed = time.monotonic() - start
+
+  report = {'users': args.users, 'seconds': round(elapsed, 2), 'steps': {}}
+  for step in STEPS:
+    latencies = sorted(stats.latencies.get(step, []))
+    if not latencies:
+      continue
+    report['steps'][step] = {
+      'requests': len(latencies),
+      'throughput': round(len(latencies) / elapsed, 2),
+      'error_rate': round(stats.errors[step] / len(latencies), 4),
+      **{f'p{p}_ms': round(percentile(latencies, p) * 1000, 2) for p in PERCENTILES}
+    }
+
+  if args.json:
+    print(json.dumps(report, indent=2))
+    return
+
+  print(f"{args.users} users for {elapsed:.1f}s")
+  print(f"{'step':<10} {'requests':>9} {'req/s':>8} {'errors':>7}" + ''.join(f" {f'p{p} ms':>9}" for p in PERCENTILES))
+  for step, row in report['steps'].items():
+    print(f"{step:<10} {row['requests']:>9} {row['throughput']:>8.1f} {row['error_rate']:>7.1%}"
+          + ''.join(f" {row[f'p{p}_ms']:>9.1f}" for p in PERCENTILES))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,82 @@
+# Measures how long a fresh process takes to import app.py and build the app:
+#
+#   python benchmarks/startup.py --repeat 5 --top 15
+#
+# Each run is a new interpreter started with -X importtime, so nothing is
+# cached between runs. Reports the wall time of the import and of
+# create_app(), the modules with the largest cumulative import time, and
+# whether any of the heavy dependencies (loaded lazily by the routes that need
+# them) were imported during startup.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Only the routes that use these should import them, on first use
+HEAVY_MODULES = ['manga_ocr', 'torch', 'transformers', 'PIL', 'numpy', 'requests', 'dotenv']
+
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app({'DATABASE': sys.argv[1]})
+created = time.perf_counter()
+print(json.dumps({
+  'import': imported - start,
+  'create_app': created - imported,
+  'heavy': [name for name in sys.argv[2:] if name in sys.modules]
+}))
+'''
+
+def run_once(database):
+  result = subprocess.run(
+    [sys.executable, '-X', 'importtime', '-c', SCRIPT, database, *HEAVY_MODULES],
+    cwd=ROOT, capture_output=True, text=True, check=True
+  )
+  # -X importtime lines: "import time: self [us] | cumulative | imported package"
+  modules = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith('import time:') or 'self [us]' in line:
+      continue
+    self_us, cumulative_us, name = line[len('import time:'):].split('|')
+    modules[name.strip()] = (int(self_us), int(cumulative_us))
+  return json.loads(result.stdout.strip().splitlines()[-1]), modules
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--top', type=int, default=15, help='Number of slowest modules to list')
+  args = parser.parse_args()
+
+  timings = []
+  modules = {}
+  with tempfile.TemporaryDirectory() as directory:
+    database = os.path.join(directory, 'words.db')
+    for _ in range(args.repeat):
+      timing, modules = run_once(database)
+      timings.append(timing)
+
+  print(f"Startup over {args.repeat} fresh processes (median / max):")
+  for key in ['import', 'create_app']:
+    values = [timing[key] * 1000 for timing in timings]
+    print(f"  {key:<12} {statistics.median(values):8.1f} ms {max(values):8.1f} ms")
+
+  print("Slowest imports (cumulative, last run):")
+  slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+  for name, (self_us, cumulative_us) in slowest:
+    print(f"  {name:<40} {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:.1f} ms)")
+
+  heavy = sorted({name for timing in timings for name in timing['heavy']})
+  if heavy:
+    print(f"Heavy modules imported at startup: {', '.join(heavy)}")
+    sys.exit(1)
+  print("No heavy modules imported at startup.")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,131 @@
+import json
+from lib import daily_activity
+
+# Study history lives in a few append-mostly tables. Old sessions are moved to
+# an attached archive database so the hot tables the dashboard and session
+# queries aggregate over stay small; daily_activity and word_reviews are not
+# touched, so streaks, heatmaps and word totals keep their history.
+
+# Setup files for each history table, in dependency order
+HISTORY_TABLES = {
+  'study_sessions': ['setup/create_table_study_sessions.sql', 'setup/create_index_study_sessions_group_id.sql'],
+  'word_review_items': ['setup/create_table_word_review_items.sql', 'setup/create_index_word_review_items_study_session_id.sql'],
+  'review_events': ['setup/create_table_review_events.sql', 'setup/create_index_review_events_study_session_id.sql']
+}
+
+# Triggers on history tables, dropped with them and recreated by reset. Not
+# created in the archive, whose copies of these tables are never counted.
+HISTORY_TRIGGERS = ['setup/create_trigger_review_events_word_reviews.sql']
+
+# Rebuilt by reset along with the history it is derived from: rollups, word
+# totals and scores, and the kana drill answer counts. word_stats is zeroed
+# instead, since it keeps a row for every word.
+DERIVED_TABLES = {
+  'daily_activity': ['setup/create_table_daily_activity.sql'],
+  'word_reviews': ['setup/create_table_word_reviews.sql', 'setup/create_index_word_reviews_word_id.sql'],
+  'word_scores': ['setup/create_table_word_scores.sql', 'setup/create_index_word_scores_difficulty.sql'],
+  'kana_stats': ['setup/create_table_kana_stats.sql']
+}
+
+def columns(cursor, schema, table):
+  cursor.execute(f'PRAGMA {schema}.table_info({table})')
+  return [(row[1], row[2]) for row in cursor.fetchall()]
+
+def attach(db, cursor, archive_path):
+  # Attach the archive and make sure it has every history table and column
+  cursor.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+  for table, setup_files in HISTORY_TABLES.items():
+    for setup_file in setup_files:
+      cursor.execute(db.sql(setup_file).replace('IF NOT EXISTS ', 'IF NOT EXISTS archive.', 1))
+    archived = {name for name, _ in columns(cursor, 'archive', table)}
+    for name, column_type in columns(cursor, 'main', table):
+      if name not in archived:
+        cursor.execute(f'ALTER TABLE archive.{table} ADD COLUMN {name} {column_type}')
+
+def archive_sessions(db, connection, archive_path, older_than_days=90, batch_size=500):
+  # Moves completed sessions started before midnight older_than_days ago,
+  # with their review items and events, into the archive; sessions still in
+  # progress stay until they are completed. Their counts stay in
+  # daily_activity's archived_* columns. Each batch is its own short write
+  # transaction so the app keeps serving requests. Returns the number of rows
+  # moved per table.
+  connection.isolation_level = None
+  cursor = connection.cursor()
+  attach(db, cursor, archive_path)
+
+  column_lists = {table: ', '.join(name for name, _ in columns(cursor, 'main', table))
+                  for table in HISTORY_TABLES}
+  key_column = {'study_sessions': 'id', 'word_review_items': 'study_session_id', 'review_events': 'study_session_id'}
+  moved = {table: 0 for table in HISTORY_TABLES}
+
+  try:
+    while True:
+      cursor.execute('BEGIN IMMEDIATE')
+      cursor.execute('''
+        SELECT id FROM main.study_sessions
+        WHERE created_at < date('now', ?) AND completed = 1
+        ORDER BY id
+        LIMIT ?
+      ''', (f'-{int(older_than_days)} days', batch_size))
+      session_ids = [row[0] for row in cursor.fetchall()]
+      if not session_ids:
+        cursor.execute('COMMIT')
+        break
+
+      ids_json = json.dumps(session_ids)
+      daily_activity.archive(cursor, ids_json)
+      for table, column_list in column_lists.items():
+        cursor.execute(f'''
+          INSERT INTO archive.{table} ({column_list})
+          SELECT {column_list} FROM main.{table}
+          WHERE {key_column[table]} IN (SELECT value FROM json_each(?))
+        ''', (ids_json,))
+      # Children first so no review item is ever left without its session
+      for table in reversed(list(HISTORY_TABLES)):
+        cursor.execute(f'''
+          DELETE FROM main.{table}
+          WHERE {key_column[table]} IN (SELECT value FROM json_each(?))
+        ''', (ids_json,))
+        moved[table] += cursor.rowcount
+      cursor.execute('COMMIT')
+  except Exception:
+    if connection.in_transaction:
+      cursor.execute('ROLLBACK')
+    raise
+  finally:
+    cursor.execute('DETACH DATABASE archive')
+
+  return moved
+
+def reset_study_history(db, cursor):
+  # Clears the hot history tables by swapping in empty ones: dropping a table
+  # frees its pages in one go instead of deleting (and firing triggers for)
+  # every row. AUTOINCREMENT counters are kept so new ids never collide with
+  # archived ones.
+  connection = cursor.connection
+  if not connection.in_transaction:
+    cursor.execute('BEGIN IMMEDIATE')
+
+  tables = {**HISTORY_TABLES, **DERIVED_TABLES}
+  cursor.execute(f'''
+    SELECT name, seq FROM sqlite_sequence
+    WHERE name IN ({','.join('?' * len(tables))})
+  ''', list(tables))
+  sequences = cursor.fetchall()
+
+  for table in reversed(list(tables)):
+    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+  for setup_files in tables.values():
+    for setup_file in setup_files:
+      cursor.execute(db.sql(setup_file))
+  for setup_file in HISTORY_TRIGGERS:
+    cursor.execute(db.sql(setup_file))
+
+  cursor.executemany('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)',
+                     [tuple(row) for row in sequences])
+  # The per-word totals start again from nothing, like the history they count
+  # (see lib/counters.py), so verify-counters finds them in step
+  cursor.execute('''
+    UPDATE word_stats
+    SET correct_count = 0, wrong_count = 0, accuracy = NULL, last_reviewed = NULL
+  ''')
@@ -0,0 +1,72 @@
+import gzip
+import zlib
+from flask import request
+
+try:
+  import brotli
+except ImportError:  # brotli is optional, gzip is always available
+  brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+def compress(body, encoding, app):
+  if encoding == 'br':
+    return brotli.compress(body, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+  return gzip.compress(body, compresslevel=app.config['COMPRESS_GZIP_LEVEL'])
+
+def compress_stream(chunks, encoding, app):
+  # Incremental version of compress() for streamed responses
+  if encoding == 'br':
+    compressor = brotli.Compressor(quality=app.config['COMPRESS_BROTLI_QUALITY'])
+    for chunk in chunks:
+      data = compressor.process(chunk)
+      if data:
+        yield data
+    yield compressor.finish()
+    return
+  compressor = zlib.compressobj(app.config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+  for chunk in chunks:
+    data = compressor.compress(chunk)
+    if data:
+      yield data
+  yield compressor.flush()
+
+def init_app(app):
+  # Responses of at least COMPRESS_MIN_SIZE bytes are gzip/brotli encoded when
+  # the client accepts it; small payloads aren't worth the CPU
+  app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+  app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+  app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+
+  encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+  @app.after_request
+  def compress_response(response):
+    if (response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+      return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(encodings)
+    if encoding is None:
+      return response
+
+    # Streamed bodies have no known size up front, so they are always encoded
+    if response.is_streamed:
+      chunks = response.iter_encoded()
+      if hasattr(response.response, 'close'):
+        response.call_on_close(response.response.close)
+      response.response = compress_stream(chunks, encoding, app)
+      response.headers['Content-Encoding'] = encoding
+      return response
+
+    body = response.get_data()
+    if len(body) < app.config['COMPRESS_MIN_SIZE']:
+      return response
+
+    response.set_data(compress(body, encoding, app))
+    response.headers['Content-Encoding'] = encoding
+    return response
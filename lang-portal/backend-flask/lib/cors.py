@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+from flask import request
+from lib.db import connect
+
+# CORS for every route, in place of flask-cors. Study activities are embedded
+# from their own sites, so besides CORS_ORIGINS the origin of each activity's
+# url is allowed. The allowed set is kept in memory: preflight (OPTIONS)
+# requests are answered by a before_request hook without reaching a route or
+# the database, and the set is only re-read from study_activities after a
+# snapshot restore (the only in-process change to that table) or once it is
+# older than CORS_REFRESH_SECONDS, which picks up activities imported by
+# other processes such as `invoke init-db`.
+
+METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+# Request headers clients may send besides the tenant header; the X-Image-*
+# pair sizes raw bitmaps sent to verify-kana
+HEADERS = ['Content-Type', 'Authorization', 'X-Image-Width', 'X-Image-Height']
+# Response headers scripts may read: the back-off on 429 (see lib/limits.py)
+EXPOSED_HEADERS = ['Retry-After']
+
+def origin_of(url):
+  # 'https://example.com:8080/app?x' -> 'https://example.com:8080'
+  try:
+    parsed = urlparse(url)
+  except (TypeError, ValueError):
+    return None
+  if not parsed.scheme or not parsed.netloc:
+    return None
+  return f'{parsed.scheme.lower()}://{parsed.netloc.lower()}'
+
+class OriginRegistry:
+  def __init__(self, database, origins, max_age=60):
+    # origins: the configured ones; '*' allows any origin and the
+    # study_activities lookup is skipped altogether
+    self.database = database
+    self.any = '*' in origins
+    self.configured = frozenset(origin_of(origin) or origin for origin in origins if origin != '*')
+    self.max_age = max_age
+    self.origins = self.configured
+    self.loaded_at = None
+    self.lock = threading.Lock()
+
+  def load(self):
+    # The configured origins plus every study activity's; just the configured
+    # ones if the database isn't set up yet
+    try:
+      connection = connect(self.database, readonly=True)
+    except Exception as e:
+      logging.warning(f"Could not read study activity origins: {str(e)}")
+      return self.configured
+    try:
+      urls = [row[0] for row in connection.execute('SELECT url FROM study_activities')]
+    except Exception as e:
+      logging.warning(f"Could not read study activity origins: {str(e)}")
+      urls = []
+    finally:
+      connection.close()
+    return self.configured | {origin for origin in map(origin_of, urls) if origin}
+
+  def current(self):
+    loaded_at = self.loaded_at
+    if loaded_at is not None and time.monotonic() - loaded_at < self.max_age:
+      return self.origins
+    with self.lock:
+      if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.max_age:
+        self.origins = self.load()
+        self.loaded_at = time.monotonic()
+      return self.origins
+
+  def invalidate(self):
+    # After study_activities changed; re-read on the next request that needs it
+    self.loaded_at = None
+
+  def allowed_origin(self, origin):
+    # Value for Access-Control-Allow-Origin, or None if origin isn't allowed
+    if self.any:
+      return '*'
+    if origin and origin.lower() in self.current():
+      return origin
+    return None
+
+def init_app(app):
+  # Browsers may reuse a preflight answer for this many seconds, and the
+  # study activity origins are re-read at most this often
+  app.config.setdefault('CORS_MAX_AGE', 600)
+  app.config.setdefault('CORS_REFRESH_SECONDS', 60)
+
+  origins = list(app.config['CORS_ORIGINS'])
+  # In development, add localhost to allowed origins
+  if app.debug:
+    origins.extend(["http://localhost:8080", "http://127.0.0.1:8080"])
+  app.cors = OriginRegistry(app.config['DATABASE'], origins, max_age=app.config['CORS_REFRESH_SECONDS'])
+
+  allowed_headers = {header.lower() for header in HEADERS + [app.config['TENANT_HEADER']]}
+  preflight_headers = {
+    'Access-Control-Allow-Methods': ', '.join(METHODS),
+    'Access-Control-Max-Age': str(app.config['CORS_MAX_AGE'])
+  }
+
+  def answer_preflight():
+    if request.method != 'OPTIONS' or 'Access-Control-Request-Method' not in request.headers:
+      return None
+    response = app.response_class(status=200)
+    allowed = app.cors.allowed_origin(request.headers.get('Origin'))
+    if allowed is None:
+      # No CORS headers: the browser refuses the actual request
+      return response
+    response.headers.update(preflight_headers)
+    response.headers['Access-Control-Allow-Origin'] = allowed
+    requested = [header.strip() for header in request.headers.get('Access-Control-Request-Headers', '').split(',')]
+    permitted = [header for header in requested if header.lower() in allowed_headers]
+    if permitted:
+      response.headers['Access-Control-Allow-Headers'] = ', '.join(permitted)
+    if allowed != '*':
+      response.vary.add('Origin')
+    return response
+
+  # Ahead of every other before_request hook (e.g. tenant selection, which
+  # would create a learner's database), so preflights do no other work
+  app.before_request_funcs.setdefault(None, []).insert(0, answer_preflight)
+
+  @app.after_request
+  def add_cors_headers(response):
+    if 'Access-Control-Allow-Origin' in response.headers:
+      return response
+    origin = request.headers.get('Origin')
+    if origin is None:
+      return response
+    allowed = app.cors.allowed_origin(origin)
+    if allowed is not None:
+      response.headers['Access-Control-Allow-Origin'] = allowed
+      response.headers['Access-Control-Expose-Headers'] = ', '.join(EXPOSED_HEADERS)
+    if allowed != '*':
+      response.vary.add('Origin')
+    return response
+
+  return app.cors
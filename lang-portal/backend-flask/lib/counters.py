@@ -0,0 +1,116 @@
+# Counter caches maintained by triggers (sql/setup/create_trigger_*.sql):
+# groups.words_count from word_groups, and the per-word totals in
+# word_reviews and word_stats from review_events. check() recomputes
+# them in bulk and reports the rows that disagree; repair() rewrites those
+# rows.
+
+def review_events(archive=False):
+  # Archived sessions keep counting towards the totals, so their events are
+  # included when the archive is attached
+  sources = ['SELECT word_id, correct, created_at FROM main.review_events']
+  if archive:
+    sources.append('SELECT word_id, correct, created_at FROM archive.review_events')
+  return ' UNION ALL '.join(sources)
+
+def expected_word_reviews(archive=False):
+  # Totals as the trigger would have counted them
+  return f'''
+    SELECT word_id,
+           SUM(CASE WHEN correct THEN 1 ELSE 0 END) AS correct_count,
+           SUM(CASE WHEN correct THEN 0 ELSE 1 END) AS wrong_count
+    FROM ({review_events(archive)})
+    GROUP BY word_id
+  '''
+
+STALE_GROUPS = '''
+  SELECT g.id
+  FROM groups g
+  LEFT JOIN (SELECT group_id, COUNT(*) AS words_count FROM word_groups GROUP BY group_id) wg
+    ON wg.group_id = g.id
+  WHERE g.words_count IS NOT COALESCE(wg.words_count, 0)
+'''
+
+def stale_words(archive=False):
+  # Words whose stored totals differ from the recount either way (including
+  # duplicate word_reviews rows, which never match a single recount row)
+  expected = expected_word_reviews(archive)
+  actual = 'SELECT word_id, correct_count, wrong_count FROM word_reviews'
+  return f'''
+    SELECT DISTINCT word_id FROM (
+      SELECT * FROM ({expected}) EXCEPT SELECT * FROM ({actual})
+      UNION ALL
+      SELECT * FROM ({actual}) EXCEPT SELECT * FROM ({expected})
+    )
+  '''
+
+# word_stats as the word_reviews totals imply, for every word
+EXPECTED_WORD_STATS = '''
+  SELECT w.id AS word_id,
+         COALESCE(SUM(r.correct_count), 0) AS correct_count,
+         COALESCE(SUM(r.wrong_count), 0) AS wrong_count,
+         CASE WHEN SUM(r.correct_count) + SUM(r.wrong_count) > 0
+              THEN SUM(r.correct_count) * 1.0 / (SUM(r.correct_count) + SUM(r.wrong_count)) END AS accuracy,
+         MAX(r.last_reviewed) AS last_reviewed
+  FROM words w
+  LEFT JOIN word_reviews r ON r.word_id = w.id
+  GROUP BY w.id
+'''
+
+STALE_WORD_STATS = f'''
+  SELECT DISTINCT word_id FROM (
+    SELECT * FROM ({EXPECTED_WORD_STATS}) EXCEPT SELECT * FROM word_stats
+    UNION ALL
+    SELECT * FROM word_stats EXCEPT SELECT * FROM ({EXPECTED_WORD_STATS})
+  )
+'''
+
+def check(cursor, archive=False):
+  # Returns {'groups': [group ids], 'word_reviews': [word ids],
+  # 'word_stats': [word ids]} out of step
+  cursor.execute(STALE_GROUPS)
+  groups = [row[0] for row in cursor.fetchall()]
+  cursor.execute(stale_words(archive))
+  words = [row[0] for row in cursor.fetchall()]
+  cursor.execute(STALE_WORD_STATS)
+  stats = [row[0] for row in cursor.fetchall()]
+  return {'groups': groups, 'word_reviews': words, 'word_stats': stats}
+
+def repair(cursor, archive=False):
+  # Rewrites only the stale rows, in the caller's transaction. Returns what
+  # check() found.
+  stale = check(cursor, archive)
+  cursor.executemany('''
+    UPDATE groups
+    SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id)
+    WHERE id = ?
+  ''', [(group_id,) for group_id in stale['groups']])
+
+  if stale['word_reviews']:
+    cursor.execute('CREATE TEMP TABLE stale_words (word_id INTEGER PRIMARY KEY)')
+    try:
+      cursor.executemany('INSERT INTO stale_words VALUES (?)', [(word_id,) for word_id in stale['word_reviews']])
+      cursor.execute('DELETE FROM word_reviews WHERE word_id IN (SELECT word_id FROM stale_words)')
+      cursor.execute(f'''
+        INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+        SELECT word_id,
+               SUM(CASE WHEN correct THEN 1 ELSE 0 END),
+               SUM(CASE WHEN correct THEN 0 ELSE 1 END),
+               MAX(created_at)
+        FROM ({review_events(archive)})
+        WHERE word_id IN (SELECT word_id FROM stale_words)
+        GROUP BY word_id
+      ''')
+    finally:
+      cursor.execute('DROP TABLE temp.stale_words')
+
+  # Checked again: the word_reviews rewrite above changes what word_stats
+  # should hold
+  cursor.execute(STALE_WORD_STATS)
+  stale_stats = [row[0] for row in cursor.fetchall()]
+  cursor.executemany('DELETE FROM word_stats WHERE word_id = ?', [(word_id,) for word_id in stale_stats])
+  cursor.execute(f'''
+    INSERT INTO word_stats (word_id, correct_count, wrong_count, accuracy, last_reviewed)
+    SELECT * FROM ({EXPECTED_WORD_STATS})
+    WHERE word_id NOT IN (SELECT word_id FROM word_stats)
+  ''')
+  return stale
@@ -0,0 +1,137 @@
+from datetime import date, datetime, timedelta, timezone
+
+# daily_activity is a rollup of study_sessions and word_review_items per
+# (day, group). Writers refresh only the rows they touched, so dashboard
+# streaks and heatmaps cost O(days) instead of O(sessions).
+#
+# Creating a session adds a word_review_items row (correct = 0) for every
+# word in it before anything is answered, so only items with an answer in
+# review_events count as reviews.
+#
+# Archiving (see lib/archive.py) moves sessions out of study_sessions but not
+# out of the rollup: their counts are kept in the archived_* columns, which
+# refresh and rebuild add to whatever is still in the hot tables.
+
+# Join condition keeping only the word_review_items (wri) answered so far
+ANSWERED = '''
+  EXISTS (SELECT 1 FROM review_events re
+          WHERE re.study_session_id = wri.study_session_id AND re.word_id = wri.word_id)
+'''
+
+def counts(where):
+  # (day, group_id, sessions, reviews, correct) of the hot sessions matching where
+  return f'''
+    SELECT date(ss.created_at) AS day, ss.group_id,
+           COUNT(DISTINCT ss.id) AS sessions,
+           COUNT(wri.id) AS reviews,
+           COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0) AS correct
+    FROM study_sessions ss
+    LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id AND {ANSWERED}
+    WHERE {where}
+    GROUP BY date(ss.created_at), ss.group_id
+  '''
+
+def refresh(cursor, day, group_id):
+  # Recompute a single (day, group) row from the base tables; the
+  # (group_id, created_at) and study_session_id indexes keep this cheap
+  cursor.execute('''
+    UPDATE daily_activity
+    SET sessions = archived_sessions, reviews = archived_reviews, correct = archived_correct
+    WHERE day = ? AND group_id = ?
+  ''', (day, group_id))
+  # WHERE true tells the parser ON CONFLICT belongs to the upsert
+  cursor.execute(f'''
+    INSERT INTO daily_activity (day, group_id, sessions, reviews, correct)
+    SELECT * FROM ({counts("ss.group_id = ? AND ss.created_at >= ? AND ss.created_at < date(?, '+1 day')")})
+    WHERE true
+    ON CONFLICT (day, group_id) DO UPDATE SET
+      sessions = sessions + excluded.sessions,
+      reviews = reviews + excluded.reviews,
+      correct = correct + excluded.correct
+  ''', (group_id, day, day))
+  cursor.execute('''
+    DELETE FROM daily_activity
+    WHERE day = ? AND group_id = ? AND sessions = 0
+  ''', (day, group_id))
+
+def refresh_sessions(cursor, session_ids):
+  # Refresh the rows for the days/groups the given sessions belong to
+  session_ids = list(session_ids)
+  if not session_ids:
+    return
+  placeholders = ','.join('?' * len(session_ids))
+  cursor.execute(f'''
+    SELECT DISTINCT date(created_at) as day, group_id
+    FROM study_sessions
+    WHERE id IN ({placeholders})
+  ''', session_ids)
+  for day, group_id in cursor.fetchall():
+    refresh(cursor, day, group_id)
+
+def rebuild(cursor):
+  # Recompute the rollup, e.g. after importing history; archived counts are
+  # kept as they are
+  cursor.execute('DELETE FROM daily_activity WHERE archived_sessions = 0')
+  cursor.execute('''
+    UPDATE daily_activity
+    SET sessions = archived_sessions, reviews = archived_reviews, correct = archived_correct
+  ''')
+  cursor.execute(f'''
+    INSERT INTO daily_activity (day, group_id, sessions, reviews, correct)
+    SELECT * FROM ({counts('true')})
+    WHERE true
+    ON CONFLICT (day, group_id) DO UPDATE SET
+      sessions = sessions + excluded.sessions,
+      reviews = reviews + excluded.reviews,
+      correct = correct + excluded.correct
+  ''')
+
+def archive(cursor, ids_json):
+  # Called before the sessions in ids_json (a JSON array) leave study_sessions:
+  # moves their counts to the archived_* columns, leaving the totals alone
+  cursor.execute(f'''
+    INSERT INTO daily_activity (day, group_id, sessions, reviews, correct,
+                                archived_sessions, archived_reviews, archived_correct)
+    SELECT day, group_id, sessions, reviews, correct, sessions, reviews, correct
+    FROM ({counts('ss.id IN (SELECT value FROM json_each(?))')})
+    WHERE true
+    ON CONFLICT (day, group_id) DO UPDATE SET
+      archived_sessions = archived_sessions + excluded.archived_sessions,
+      archived_reviews = archived_reviews + excluded.archived_reviews,
+      archived_correct = archived_correct + excluded.archived_correct
+  ''', (ids_json,))
+
+def backfill_archived(cursor):
+  # For databases whose rollup predates the archived_* columns: whatever a
+  # row counts beyond the hot tables was archived
+  cursor.execute('''
+    UPDATE daily_activity
+    SET archived_sessions = sessions, archived_reviews = reviews, archived_correct = correct
+  ''')
+  cursor.execute(f'''
+    UPDATE daily_activity
+    SET archived_sessions = MAX(0, daily_activity.sessions - hot.sessions),
+        archived_reviews = MAX(0, daily_activity.reviews - hot.reviews),
+        archived_correct = MAX(0, daily_activity.correct - hot.correct)
+    FROM ({counts('true')}) AS hot
+    WHERE hot.day = daily_activity.day AND hot.group_id = daily_activity.group_id
+  ''')
+
+def current_streak(cursor, today=None):
+  # Consecutive study days ending today (or yesterday, so the streak is not
+  # lost before today's session); walks the rollup newest day first
+  # study_sessions.created_at is UTC
+  today = today or datetime.now(timezone.utc).date()
+  cursor.execute('SELECT DISTINCT day FROM daily_activity ORDER BY day DESC')
+  streak = 0
+  expected = None
+  for (day,) in cursor:
+    day = date.fromisoformat(day)
+    if expected is None:
+      if day < today - timedelta(days=1):
+        return 0
+    elif day != expected:
+      break
+    streak += 1
+    expected = day - timedelta(days=1)
+  return streak
@@ -1,30 +1,170 @@
 import sqlite3
 import json
+from pathlib import Path
 from flask import g
 
+# Every schema file in sql/setup, in the order they must be created
+SETUP_FILES = [
+  'setup/create_table_words.sql',
+  'setup/create_table_word_reviews.sql',
+  'setup/create_table_word_review_items.sql',
+  'setup/create_table_groups.sql',
+  'setup/create_table_word_groups.sql',
+  'setup/create_table_study_activities.sql',
+  'setup/create_table_study_sessions.sql',
+  'setup/create_table_review_events.sql',
+  'setup/create_table_daily_activity.sql',
+  'setup/create_table_word_scores.sql',
+  'setup/create_table_kana_stats.sql',
+  'setup/create_table_word_stats.sql',
+  'setup/create_table_word_parts.sql',
+  # Indexes
+  'setup/create_index_study_sessions_group_id.sql',
+  'setup/create_index_word_review_items_study_session_id.sql',
+  'setup/create_index_review_events_study_session_id.sql',
+  'setup/create_index_word_scores_difficulty.sql',
+  'setup/create_index_word_reviews_word_id.sql',
+  'setup/create_index_word_groups_group_id.sql',
+  'setup/create_index_word_stats_correct_count.sql',
+  'setup/create_index_word_stats_wrong_count.sql',
+  'setup/create_index_word_stats_accuracy.sql',
+  'setup/create_index_word_stats_last_reviewed.sql',
+  'setup/create_index_word_parts_kanji.sql',
+  # Triggers keeping the counter caches (see lib/counters.py)
+  'setup/create_trigger_word_groups_insert.sql',
+  'setup/create_trigger_word_groups_delete.sql',
+  'setup/create_trigger_word_groups_update.sql',
+  'setup/create_trigger_review_events_word_reviews.sql',
+  'setup/create_trigger_words_insert.sql',
+  'setup/create_trigger_words_delete.sql',
+  'setup/create_trigger_words_insert_word_parts.sql',
+  'setup/create_trigger_words_update_word_parts.sql',
+  'setup/create_trigger_words_delete_word_parts.sql',
+  # Backfills
+  'setup/insert_word_stats.sql',
+  'setup/insert_word_parts.sql'
+]
+
+# Columns added to tables after they were first created. CREATE TABLE IF NOT
+# EXISTS leaves an older words.db without them, so setup adds the missing ones.
+ADDED_COLUMNS = {
+  'study_sessions': [('updated_at', 'DATETIME'), ('completed', 'BOOLEAN NOT NULL DEFAULT 0')],
+  'daily_activity': [('archived_sessions', 'INTEGER NOT NULL DEFAULT 0'),
+                     ('archived_reviews', 'INTEGER NOT NULL DEFAULT 0'),
+                     ('archived_correct', 'INTEGER NOT NULL DEFAULT 0')]
+}
+
+def add_columns(cursor):
+  from lib import daily_activity
+  for table, added in ADDED_COLUMNS.items():
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    missing = [(name, definition) for name, definition in added if name not in existing]
+    for name, definition in missing:
+      cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+    if table == 'daily_activity' and missing:
+      daily_activity.backfill_archived(cursor)
+
+def connect(database, readonly=False, **kwargs):
+  if readonly:
+    # Dashboard and listing queries use their own read-only connection so a
+    # long aggregate never shares a transaction with review writes
+    uri = Path(database).resolve().as_uri() + '?mode=ro'
+    connection = sqlite3.connect(uri, uri=True, isolation_level=None, **kwargs)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA query_only = ON')
+    return connection
+  connection = sqlite3.connect(database, **kwargs)
+  connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+  # Only takes effect while the database is still empty: lets maintenance
+  # reclaim freed pages with incremental_vacuum (see lib/maintenance.py)
+  connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+  # WAL lets readers keep a consistent snapshot while a writer commits
+  connection.execute('PRAGMA journal_mode=WAL')
+  return connection
+
 class Db:
-  def __init__(self, database='words.db'):
+  # With tenants (see lib/tenants.py) each request's connections come from
+  # the learner's own database, selected into g.tenant before the request
+  def __init__(self, database='words.db', tenants=None):
     self.database = database
+    self.tenants = tenants
     self.connection = None
 
   def get(self):
     if 'db' not in g:
-      g.db = sqlite3.connect(self.database)
-      g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
+      tenant = g.get('tenant')
+      if tenant is not None:
+        g.db = self.tenants.acquire(tenant)
+      else:
+        g.db = connect(self.database)
     return g.db
 
+  def get_readonly(self):
+    tenant = g.get('tenant')
+    if tenant is None and self.database == ':memory:':
+      return self.get()
+    if 'db_ro' not in g:
+      if tenant is not None:
+        g.db_ro = self.tenants.acquire(tenant, readonly=True)
+      else:
+        g.db_ro = connect(self.database, readonly=True)
+    return g.db_ro
+
+  def path(self):
+    # Database file the current request reads and writes
+    tenant = g.get('tenant')
+    if tenant is not None:
+      return self.tenants.path(tenant)
+    return self.database
+
+  def read_cursor(self):
+    # All reads in a request share one WAL snapshot; the transaction ends
+    # when close() drops the connection at teardown
+    connection = self.get_readonly()
+    cursor = connection.cursor()
+    if connection is not g.get('db') and not connection.in_transaction:
+      cursor.execute('BEGIN')
+    return cursor
+
+  def detach(self, connection):
+    # Hands the request's read-only connection to the caller (e.g. a streamed
+    # response that outlives teardown). Returns the function to call once the
+    # caller is done, which closes the connection or, with tenants, returns it
+    # to the cache as close() would; None if the connection isn't one that can
+    # be detached.
+    if connection is not g.get('db_ro'):
+      return None
+    g.pop('db_ro')
+    tenant = g.get('tenant')
+    if tenant is None:
+      return connection.close
+    return lambda: self.tenants.release(tenant, connection, readonly=True)
+
   def commit(self):
     self.get().commit()
 
+  def rollback(self):
+    # Nothing to undo if the request never opened its write connection
+    if 'db' in g:
+      g.db.rollback()
+
   def cursor(self):
     # Ensure the connection is valid before getting a cursor
     connection = self.get()
     return connection.cursor()
 
   def close(self):
-    db = g.pop('db', None)
-    if db is not None:
-      db.close()
+    tenant = g.get('tenant')
+    for key, readonly in [('db', False), ('db_ro', True)]:
+      connection = g.pop(key, None)
+      if connection is None:
+        continue
+      if tenant is not None:
+        # Back to the cache, open, for the learner's next request
+        self.tenants.release(tenant, connection, readonly)
+      else:
+        connection.close()
 
   # Function to load SQL from a file
   def sql(self, filepath):
@@ -38,25 +178,9 @@ class Db:
 
   def setup_tables(self,cursor):
     # Create the necessary tables
-    cursor.execute(self.sql('setup/create_table_words.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_reviews.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_review_items.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_groups.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_groups.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_study_activities.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
+    for setup_file in SETUP_FILES:
+      cursor.execute(self.sql(setup_file))
+    add_columns(cursor)
     self.get().commit()
 
   def import_study_activities_json(self,cursor,data_json_path):
@@ -94,17 +218,7 @@ class Db:
         cursor.execute('''
           INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)
         ''', (word_id, core_verbs_group_id))
-      self.get().commit()
-
-      # Update the words_count in the groups table by counting all words in the group
-      cursor.execute('''
-        UPDATE groups
-        SET words_count = (
-          SELECT COUNT(*) FROM word_groups WHERE group_id = ?
-        )
-        WHERE id = ?
-      ''', (core_verbs_group_id, core_verbs_group_id))
-
+      # groups.words_count is kept by the word_groups triggers
       self.get().commit()
 
       print(f"Successfully added {len(words)} verbs to the '{group_name}' group.")
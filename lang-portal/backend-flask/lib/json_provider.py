@@ -0,0 +1,53 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+  import orjson
+except ImportError:  # orjson is optional, the stdlib provider is the fallback
+  orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+  # Drop-in replacement for Flask's provider: jsonify() and request.get_json()
+  # go through orjson, which serializes our row-built dicts several times
+  # faster than the json module and writes UTF-8 directly
+  def options(self, indent=False):
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if self.sort_keys:
+      option |= orjson.OPT_SORT_KEYS
+    if indent:
+      option |= orjson.OPT_INDENT_2
+    return option
+
+  def dumps(self, obj, **kwargs):
+    # Callers asking for json.dumps-specific formatting get the stdlib path
+    if kwargs:
+      return super().dumps(obj, **kwargs)
+    return orjson.dumps(obj, default=self.default, option=self.options()).decode()
+
+  def loads(self, s, **kwargs):
+    if kwargs:
+      return super().loads(s, **kwargs)
+    return orjson.loads(s)
+
+  def response(self, *args, **kwargs):
+    obj = self._prepare_response_obj(args, kwargs)
+    indent = (self.compact is None and self._app.debug) or self.compact is False
+    body = orjson.dumps(obj, default=self.default, option=self.options(indent) | orjson.OPT_APPEND_NEWLINE)
+    return self._app.response_class(body, mimetype=self.mimetype)
+
+PROVIDERS = {
+  'default': DefaultJSONProvider,
+  'orjson': OrjsonProvider
+}
+
+def init_app(app):
+  # JSON_PROVIDER: "auto" (orjson when installed), "orjson" or "default"
+  app.config.setdefault('JSON_PROVIDER', 'auto')
+  name = app.config['JSON_PROVIDER']
+  if name == 'auto':
+    name = 'orjson' if orjson is not None else 'default'
+  if name not in PROVIDERS:
+    raise ValueError(f"Unknown JSON_PROVIDER: {name}")
+  if name == 'orjson' and orjson is None:
+    raise ImportError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+  app.json = PROVIDERS[name](app)
+  return app.json
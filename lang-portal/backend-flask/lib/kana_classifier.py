@@ -0,0 +1,167 @@
+from functools import lru_cache
+import numpy as np
+
+# Nearest-neighbour classifier for single drawn kana. Drawings are cropped to
+# their ink, scaled to SIZE x SIZE, blurred a little and compared by cosine
+# similarity against every training template, in a COMPONENTS-dimensional
+# PCA subspace so the templates stay in cache. It only answers when the best
+# kana is both similar enough and clearly ahead of the runner-up; anything
+# else is left to manga_ocr.
+
+SIZE = 32
+COMPONENTS = 64
+# Pixels darker than this are ink, here and wherever else a drawing's strokes
+# are looked for (verify-kana, lib/kana_dataset.py)
+INK_THRESHOLD = 200
+
+MIN_SIMILARITY = 0.8
+MIN_MARGIN = 0.05
+
+@lru_cache(maxsize=256)
+def resample_matrix(side, size=SIZE, blur=True):
+  # (size, side) matrix taking one axis of a side x side drawing down to
+  # size pixels (area average, or nearest neighbour for tiny drawings),
+  # followed by a 3-tap box blur so strokes a pixel or two off still overlap
+  if side >= size:
+    bins = (np.arange(side) * size) // side
+    matrix = (bins[np.newaxis, :] == np.arange(size)[:, np.newaxis]).astype(np.float32)
+    matrix /= matrix.sum(axis=1, keepdims=True)
+  else:
+    matrix = np.zeros((size, side), dtype=np.float32)
+    matrix[np.arange(size), (np.arange(size) * side) // size] = 1
+  if blur:
+    matrix = (np.abs(np.subtract.outer(np.arange(size), np.arange(size))) <= 1).astype(np.float32) @ matrix
+  matrix.flags.writeable = False
+  return matrix
+
+def has_ink(image_array):
+  return bool((image_array < INK_THRESHOLD).any())
+
+def ink_square(image_array, size=SIZE, blur=True):
+  # Grayscale uint8 drawing (dark ink on white) -> size x size float32 ink
+  # darkness (0 is paper), cropped to the ink and scaled to fill the square,
+  # or None if nothing was drawn
+  ink = image_array < INK_THRESHOLD
+  rows = np.flatnonzero(ink.any(axis=1))
+  cols = np.flatnonzero(ink.any(axis=0))
+  if rows.size == 0:
+    return None
+  crop = 255 - image_array[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1].astype(np.float32)
+
+  # The ink is centred in a side x side square (keeping its aspect ratio),
+  # then resampled (and blurred) as two small matrix products; the columns of
+  # the square that would be blank are simply left out
+  height, width = crop.shape
+  side = max(height, width)
+  y, x = (side - height) // 2, (side - width) // 2
+  matrix = resample_matrix(side, size, blur)
+  return matrix[:, y:y + height] @ crop @ matrix[:, x:x + width].T
+
+def normalize(image_array, size=SIZE):
+  # Grayscale uint8 drawing -> zero-mean, unit-length float32 vector of
+  # size*size, or None if nothing was drawn
+  small = ink_square(image_array, size)
+  if small is None:
+    return None
+  vector = small.ravel()
+  vector -= vector.mean()
+  norm = np.linalg.norm(vector)
+  if norm == 0:
+    return None
+  return vector / norm
+
+def unit_rows(vectors):
+  norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+  return vectors / np.where(norms == 0, 1, norms)
+
+class KanaClassifier:
+  def __init__(self, templates, labels, basis, min_similarity=MIN_SIMILARITY, min_margin=MIN_MARGIN):
+    # templates: (n, components) projected training drawings, basis:
+    # (SIZE*SIZE, components). Templates are grouped by label so the best
+    # match per kana is a single np.maximum.reduceat over the similarities.
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind='stable')
+    self.basis = np.ascontiguousarray(basis, dtype=np.float32)
+    self.templates = np.ascontiguousarray(unit_rows(templates[order]).T, dtype=np.float32)
+    self.template_labels = labels[order]
+    self.labels, self.starts = np.unique(self.template_labels, return_index=True)
+    self.min_similarity = min_similarity
+    self.min_margin = min_margin
+    self.masks = {}
+
+  @classmethod
+  def fit(cls, images, labels, components=COMPONENTS, **kwargs):
+    # images: grayscale uint8 arrays; drawings with no ink are skipped
+    vectors, kept = [], []
+    for image, label in zip(images, labels):
+      vector = normalize(np.asarray(image, dtype=np.uint8))
+      if vector is not None:
+        vectors.append(vector)
+        kept.append(label)
+    if not vectors:
+      raise ValueError("No usable training images")
+    vectors = np.stack(vectors)
+    # Top right singular vectors: the subspace keeping most of the templates'
+    # energy, so dot products (and similarities) change little
+    _, _, vt = np.linalg.svd(vectors, full_matrices=False)
+    basis = vt[:components].T
+    return cls(vectors @ basis, kept, basis, **kwargs)
+
+  @classmethod
+  def load(cls, path, **kwargs):
+    with np.load(path) as data:
+      return cls(data['templates'], data['labels'], data['basis'], **kwargs)
+
+  def save(self, path):
+    np.savez_compressed(path, templates=self.templates.T, labels=self.template_labels, basis=self.basis)
+
+  def candidate_mask(self, candidates):
+    # Cached per candidate set (hiragana / katakana)
+    key = frozenset(candidates)
+    if key not in self.masks:
+      self.masks[key] = np.isin(self.labels, list(key))
+    return self.masks[key]
+
+  def classify_batch(self, vectors, candidates=None):
+    # vectors: (n, SIZE*SIZE) from normalize(). Returns a list of
+    # (label, similarity, margin, confident) per vector.
+    projected = unit_rows(np.asarray(vectors, dtype=np.float32) @ self.basis)
+    similarities = projected @ self.templates
+    best = np.maximum.reduceat(similarities, self.starts, axis=1)
+    if candidates is not None:
+      best[:, ~self.candidate_mask(candidates)] = -np.inf
+    if best.shape[1] > 1:
+      top2 = np.argpartition(-best, 1, axis=1)[:, :2]
+    else:
+      top2 = np.zeros((len(best), 2), dtype=np.intp)
+    results = []
+    for row, (first, second) in zip(best, top2):
+      if row[second] > row[first]:
+        first, second = second, first
+      similarity = float(row[first])
+      margin = similarity - float(row[second]) if second != first else similarity
+      confident = similarity >= self.min_similarity and margin >= self.min_margin
+      results.append((str(self.labels[first]), similarity, margin, confident))
+    return results
+
+  def classify(self, vector, candidates=None):
+    return self.classify_batch(vector[np.newaxis], candidates)[0]
+
+def render_samples(font_path, kana, variants=12, size=128, seed=0):
+  # Renders each kana variants times with random size, offset, rotation and
+  # stroke weight, as training data from a font with kana glyphs
+  from PIL import Image, ImageDraw, ImageFilter, ImageFont
+  rng = np.random.default_rng(seed)
+  images, labels = [], []
+  for character in kana:
+    for _ in range(variants):
+      font = ImageFont.truetype(font_path, int(size * rng.uniform(0.55, 0.8)))
+      image = Image.new('L', (size, size), 255)
+      offset = tuple(int(v) for v in rng.integers(0, size // 5, 2))
+      ImageDraw.Draw(image).text(offset, character, fill=0, font=font)
+      image = image.rotate(rng.uniform(-8, 8), fillcolor=255)
+      if rng.random() < 0.5:
+        image = image.filter(ImageFilter.MinFilter(3))  # Thicker, pen-like strokes
+      images.append(np.array(image))
+      labels.append(character)
+  return images, labels
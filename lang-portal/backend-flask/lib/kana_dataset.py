@@ -0,0 +1,107 @@
+import os
+import struct
+import threading
+import time
+import numpy as np
+from lib.kana_classifier import ink_square
+
+# Drawings sent to verify-kana, kept for offline evaluation of preprocessing
+# and recognition changes (benchmarks/kana_replay.py). Each drawing is cropped
+# to its ink, centred and scaled to SIZE x SIZE grayscale, and stored with
+# the kana the learner was asked for and what the app answered.
+#
+# The file is an ordinary .npy array of RECORD structs, so np.load(path,
+# mmap_mode='r') reads it without loading it into memory. Its header is
+# padded to HEADER_BYTES, which leaves room to rewrite the record count in
+# place: an append writes the new records after the last counted one and
+# then the header, so a crash part-way through leaves at most a torn tail
+# that the next append overwrites.
+
+SIZE = 64
+# Space around the ink, in pixels of the SIZE x SIZE bitmap
+MARGIN = 4
+
+RECORD = np.dtype([
+  ('image', np.uint8, (SIZE, SIZE)),
+  ('label', '<U2'),        # Kana the learner was asked to draw
+  ('kana_type', '<U8'),
+  ('recognized', '<U2'),   # What verify-kana answered
+  ('engine', '<U10'),      # classifier, manga_ocr or none
+  ('captured_at', '<f8')   # Unix time
+])
+
+HEADER_BYTES = 256
+MAGIC = np.lib.format.magic(1, 0)
+
+def header(count):
+  fields = {'descr': np.lib.format.dtype_to_descr(RECORD), 'fortran_order': False, 'shape': (count,)}
+  length = HEADER_BYTES - len(MAGIC) - 2
+  text = repr(fields).ljust(length - 1) + '\n'
+  if len(text) > length:
+    raise ValueError('RECORD is too wide for HEADER_BYTES')
+  return MAGIC + struct.pack('<H', length) + text.encode('latin1')
+
+def bitmap(image_array, size=SIZE, margin=MARGIN):
+  # Grayscale uint8 drawing (dark ink on white) -> uint8 size x size bitmap
+  # with the ink centred and scaled to fill it, or None if nothing was drawn.
+  # Same crop and resampling as the classifier's input, without its blur.
+  inner = size - 2 * margin
+  small = ink_square(image_array, inner, blur=False)
+  if small is None:
+    return None
+  result = np.full((size, size), 255, dtype=np.uint8)
+  result[margin:margin + inner, margin:margin + inner] = 255 - np.clip(np.rint(small), 0, 255).astype(np.uint8)
+  return result
+
+def records(drawings):
+  # drawings: iterable of (image_array, label, kana_type, recognized, engine);
+  # blank drawings are left out
+  rows = []
+  now = time.time()
+  for image_array, label, kana_type, recognized, engine in drawings:
+    image = bitmap(np.asarray(image_array, dtype=np.uint8))
+    if image is not None:
+      rows.append((image, label, kana_type, recognized, engine, now))
+  return np.array(rows, dtype=RECORD)
+
+def count(handle):
+  handle.seek(0)
+  np.lib.format.read_magic(handle)
+  shape, _, _ = np.lib.format.read_array_header_1_0(handle)
+  return shape[0]
+
+def append(path, new_records):
+  # Appends RECORD rows to the dataset at path, creating it if needed.
+  # Returns the number of records in the file afterwards.
+  new_records = np.asarray(new_records, dtype=RECORD)
+  directory = os.path.dirname(os.path.abspath(path))
+  os.makedirs(directory, exist_ok=True)
+  with open(path, 'r+b' if os.path.exists(path) else 'w+b') as handle:
+    handle.seek(0, os.SEEK_END)
+    existing = count(handle) if handle.tell() else 0
+    handle.seek(HEADER_BYTES + existing * RECORD.itemsize)
+    handle.write(new_records.tobytes())
+    handle.truncate()
+    handle.flush()
+    total = existing + len(new_records)
+    handle.seek(0)
+    handle.write(header(total))
+  return total
+
+def load(path):
+  # Memory-mapped, read-only view of the dataset
+  return np.load(path, mmap_mode='r')
+
+class DatasetWriter:
+  # Appends from request threads, one at a time. One process should write a
+  # given dataset file.
+  def __init__(self, path):
+    self.path = path
+    self.lock = threading.Lock()
+
+  def capture(self, drawings):
+    batch = records(drawings)
+    if len(batch) == 0:
+      return
+    with self.lock:
+      append(self.path, batch)
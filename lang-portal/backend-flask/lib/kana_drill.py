@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+
+# Adaptive kana drills. Each kana is drawn with probability proportional to
+# its smoothed error rate, so the characters a learner gets wrong come up more
+# often. Draws use Walker/Vose alias tables: O(n) to build, O(1) per kana.
+# Tables are cached per database and kana type, and every recorded answer
+# updates the cached counts in place instead of reloading kana_stats.
+
+# Beta prior: an unseen kana counts as PRIOR_ERRORS wrong out of
+# PRIOR_ATTEMPTS, so it gets the weight of a 25% error rate
+PRIOR_ERRORS = 1.0
+PRIOR_ATTEMPTS = 4.0
+# Mastered kana still come up now and then
+MIN_WEIGHT = 0.05
+
+def build_alias(weights):
+  # Vose's alias method: returns (probability, alias) lists such that picking
+  # a uniform column i and keeping it with probability[i] (else alias[i])
+  # samples proportionally to weights
+  count = len(weights)
+  total = sum(weights)
+  scaled = [weight * count / total for weight in weights]
+  probability = [1.0] * count
+  alias = list(range(count))
+  small = [i for i, p in enumerate(scaled) if p < 1]
+  large = [i for i, p in enumerate(scaled) if p >= 1]
+  while small and large:
+    less, more = small.pop(), large.pop()
+    probability[less] = scaled[less]
+    alias[less] = more
+    scaled[more] -= 1 - scaled[less]
+    (small if scaled[more] < 1 else large).append(more)
+  return probability, alias
+
+def record(cursor, results):
+  # results: iterable of (kana, kana_type, correct)
+  cursor.executemany('''
+    INSERT INTO kana_stats (kana, kana_type, attempts, errors, updated_at)
+    VALUES (?, ?, 1, ?, datetime('now'))
+    ON CONFLICT(kana) DO UPDATE SET
+      attempts = attempts + 1,
+      errors = errors + excluded.errors,
+      updated_at = excluded.updated_at
+  ''', [(kana, kana_type, 0 if correct else 1) for kana, kana_type, correct in results])
+
+class KanaWeights:
+  def __init__(self, kana, attempts, errors):
+    self.kana = list(kana)
+    self.index = {character: i for i, character in enumerate(self.kana)}
+    self.attempts = list(attempts)
+    self.errors = list(errors)
+    self.loaded_at = time.monotonic()
+    self.lock = threading.Lock()
+    self.table = None
+
+  @classmethod
+  def load(cls, cursor, kana_type, kana):
+    cursor.execute('SELECT kana, attempts, errors FROM kana_stats WHERE kana_type = ?', (kana_type,))
+    stats = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    return cls(kana, [stats.get(k, (0, 0))[0] for k in kana], [stats.get(k, (0, 0))[1] for k in kana])
+
+  def weight(self, i):
+    return max((self.errors[i] + PRIOR_ERRORS) / (self.attempts[i] + PRIOR_ATTEMPTS), MIN_WEIGHT)
+
+  def record(self, kana, correct):
+    i = self.index.get(kana)
+    if i is None:
+      return
+    with self.lock:
+      self.attempts[i] += 1
+      if not correct:
+        self.errors[i] += 1
+      # Rebuilt on the next draw; cheap for ~46 kana, and only when needed
+      self.table = None
+
+  def draw(self, n, rng=random):
+    with self.lock:
+      if self.table is None:
+        self.table = build_alias([self.weight(i) for i in range(len(self.kana))])
+      probability, alias = self.table
+    drawn = []
+    for _ in range(n):
+      # A couple of retries keep the same kana from coming up twice in a row
+      for _ in range(3):
+        column = rng.randrange(len(probability))
+        i = column if rng.random() < probability[column] else alias[column]
+        if not drawn or drawn[-1] != i or len(self.kana) == 1:
+          break
+      drawn.append(i)
+    return [self.kana[i] for i in drawn]
+
+class DrillCache:
+  # KanaWeights per (database, kana type), least recently used evicted past
+  # max_entries; reloaded from kana_stats after max_age seconds so answers
+  # recorded by other processes are picked up eventually
+  def __init__(self, max_entries=256, max_age=300):
+    self.max_entries = max_entries
+    self.max_age = max_age
+    self.entries = OrderedDict()
+    self.lock = threading.Lock()
+
+  def get(self, key, loader):
+    with self.lock:
+      weights = self.entries.get(key)
+      if weights is not None and time.monotonic() - weights.loaded_at < self.max_age:
+        self.entries.move_to_end(key)
+        return weights
+    weights = loader()
+    with self.lock:
+      self.entries[key] = weights
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+    return weights
+
+  def record(self, database, results):
+    # Keeps cached tables in step with what record() just wrote
+    with self.lock:
+      cached = {key: weights for key, weights in self.entries.items() if key[0] == database}
+    for kana, kana_type, correct in results:
+      weights = cached.get((database, kana_type))
+      if weights is not None:
+        weights.record(kana, correct)
+
+  def discard(self, database):
+    # After database's contents were replaced (e.g. a snapshot restore)
+    with self.lock:
+      for key in [key for key in self.entries if key[0] == database]:
+        del self.entries[key]
@@ -0,0 +1,126 @@
+import logging
+import math
+import threading
+import time
+from functools import wraps
+from flask import jsonify
+
+# Bounded concurrency for expensive endpoints (kana recognition, LLM calls).
+# Each limited endpoint runs at most `concurrency` requests at once; up to
+# `queue` more wait up to `timeout` seconds for a slot, and anything beyond
+# that is turned away at once with 429 and a Retry-After estimate, so a burst
+# of heavy requests can't tie up every worker thread and slow down the cheap
+# endpoints as well.
+
+class ConcurrencyLimiter:
+  def __init__(self, name, concurrency, queue=0, timeout=1.0):
+    self.name = name
+    self.concurrency = concurrency
+    self.queue = queue
+    self.timeout = timeout
+    self.active = 0
+    self.waiting = 0
+    self.condition = threading.Condition()
+    # Metrics
+    self.admitted = 0
+    self.rejected = 0
+    self.timed_out = 0
+    self.queued = 0
+    self.queue_seconds = 0.0
+    self.max_queue_seconds = 0.0
+    self.service_seconds = 0.0
+    self.completed = 0
+
+  def acquire(self):
+    # Returns the seconds spent queued, or None if the request is turned away
+    with self.condition:
+      if self.active < self.concurrency and self.waiting == 0:
+        self.active += 1
+        self.admitted += 1
+        return 0.0
+      if self.waiting >= self.queue:
+        self.rejected += 1
+        return None
+      self.waiting += 1
+      self.queued += 1
+      start = time.perf_counter()
+      deadline = start + self.timeout
+      try:
+        while self.active >= self.concurrency:
+          remaining = deadline - time.perf_counter()
+          if remaining <= 0:
+            self.timed_out += 1
+            return None
+          self.condition.wait(remaining)
+      finally:
+        self.waiting -= 1
+      waited = time.perf_counter() - start
+      self.active += 1
+      self.admitted += 1
+      self.queue_seconds += waited
+      self.max_queue_seconds = max(self.max_queue_seconds, waited)
+      return waited
+
+  def release(self, service_seconds):
+    with self.condition:
+      self.active -= 1
+      self.completed += 1
+      self.service_seconds += service_seconds
+      self.condition.notify()
+
+  def retry_after(self):
+    # Seconds until a slot is likely free: everyone queued ahead, at the
+    # average service time, shared across the slots
+    with self.condition:
+      average = self.service_seconds / self.completed if self.completed else 1.0
+      return max(1, math.ceil(average * (self.waiting + 1) / self.concurrency))
+
+  def metrics(self):
+    with self.condition:
+      return {
+        'concurrency': self.concurrency,
+        'queue': self.queue,
+        'active': self.active,
+        'waiting': self.waiting,
+        'admitted': self.admitted,
+        'rejected': self.rejected,
+        'timed_out': self.timed_out,
+        'queued': self.queued,
+        'avg_queue_ms': round(self.queue_seconds / self.queued * 1000, 2) if self.queued else 0.0,
+        'max_queue_ms': round(self.max_queue_seconds * 1000, 2),
+        'avg_service_ms': round(self.service_seconds / self.completed * 1000, 2) if self.completed else 0.0
+      }
+
+class Limits:
+  # The app's limiters by name, configured from CONCURRENCY_LIMITS
+  def __init__(self, config):
+    self.limiters = {
+      name: ConcurrencyLimiter(name, settings['concurrency'], settings.get('queue', 0), settings.get('timeout', 1.0))
+      for name, settings in config.items()
+    }
+
+  def limit(self, name):
+    # Decorator for a view; endpoints without a configured limit run as before
+    def decorator(view):
+      @wraps(view)
+      def wrapper(*args, **kwargs):
+        limiter = self.limiters.get(name)
+        if limiter is None:
+          return view(*args, **kwargs)
+        if limiter.acquire() is None:
+          retry_after = limiter.retry_after()
+          logging.warning(f"{name} is saturated, asking the client to retry in {retry_after} s")
+          response = jsonify({"error": f"Too many concurrent {name} requests, try again later"})
+          response.status_code = 429
+          response.headers['Retry-After'] = str(retry_after)
+          return response
+        start = time.perf_counter()
+        try:
+          return view(*args, **kwargs)
+        finally:
+          limiter.release(time.perf_counter() - start)
+      return wrapper
+    return decorator
+
+  def metrics(self):
+    return {name: limiter.metrics() for name, limiter in self.limiters.items()}
@@ -0,0 +1,100 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Routine upkeep for words.db: reclaim pages freed by resets and archiving,
+# refresh the query planner's statistics and fold the WAL back into the main
+# file so it doesn't grow without bound.
+
+def file_sizes(database):
+  sizes = {}
+  for suffix in ['', '-wal']:
+    path = database + suffix
+    sizes['database' if not suffix else 'wal'] = os.path.getsize(path) if os.path.exists(path) else 0
+  return sizes
+
+def enable_incremental_vacuum(connection):
+  # auto_vacuum can only be switched on an existing database by a full VACUUM
+  connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+  connection.execute('VACUUM')
+
+def run(connection, database, vacuum_pages=None):
+  # Returns a report with per-step timings (seconds) and sizes before/after
+  report = {
+    'before': file_sizes(database),
+    'freelist_before': connection.execute('PRAGMA freelist_count').fetchone()[0],
+    'auto_vacuum': connection.execute('PRAGMA auto_vacuum').fetchone()[0] == 2,
+    'steps': []
+  }
+
+  steps = [
+    ('incremental_vacuum', f'PRAGMA incremental_vacuum({int(vacuum_pages)})' if vacuum_pages else 'PRAGMA incremental_vacuum'),
+    ('analyze', 'ANALYZE'),
+    ('optimize', 'PRAGMA optimize'),
+    # Last, so it also folds in the pages written by the steps above
+    ('wal_checkpoint', 'PRAGMA wal_checkpoint(TRUNCATE)')
+  ]
+  for name, statement in steps:
+    if name == 'incremental_vacuum' and not report['auto_vacuum']:
+      continue
+    start = time.perf_counter()
+    if name == 'incremental_vacuum':
+      # Each step of this pragma frees a single page; executescript() runs it
+      # to completion where execute() would stop after the first one
+      connection.executescript(statement + ';')
+      result = []
+    else:
+      result = connection.execute(statement).fetchall()
+    connection.commit()
+    report['steps'].append((name, time.perf_counter() - start))
+    if name == 'wal_checkpoint':
+      # (busy, wal pages, pages checkpointed); busy means readers held it back
+      report['checkpoint'] = tuple(result[0])
+
+  report['after'] = file_sizes(database)
+  report['freelist_after'] = connection.execute('PRAGMA freelist_count').fetchone()[0]
+  return report
+
+def format_report(report):
+  lines = [f"{name:<20} {seconds * 1000:10.1f} ms" for name, seconds in report['steps']]
+  if not report['auto_vacuum']:
+    lines.append("incremental_vacuum   skipped (auto_vacuum is not INCREMENTAL, see --enable-incremental-vacuum)")
+  for kind in ['database', 'wal']:
+    lines.append(f"{kind + ' size':<20} {report['before'][kind]:>10,} -> {report['after'][kind]:,} bytes")
+  lines.append(f"{'free pages':<20} {report['freelist_before']:>10,} -> {report['freelist_after']:,}")
+  if report.get('checkpoint', (0,))[0]:
+    lines.append("wal_checkpoint was blocked by active readers, the WAL was not fully truncated")
+  return '\n'.join(lines)
+
+class MaintenanceScheduler:
+  # Runs maintenance every interval seconds on a background thread with its
+  # own connection; enabled by MAINTENANCE_INTERVAL_SECONDS in create_app()
+  def __init__(self, database, interval, vacuum_pages=None):
+    self.database = database
+    self.interval = interval
+    self.vacuum_pages = vacuum_pages
+    self.stopped = threading.Event()
+    self.thread = None
+
+  def start(self):
+    self.thread = threading.Thread(target=self._run, name='db-maintenance', daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    self.stopped.set()
+    if self.thread is not None:
+      self.thread.join()
+
+  def _run(self):
+    while not self.stopped.wait(self.interval):
+      try:
+        connection = sqlite3.connect(self.database)
+        try:
+          report = run(connection, self.database, self.vacuum_pages)
+        finally:
+          connection.close()
+        logging.info(f"Database maintenance finished:\n{format_report(report)}")
+      except Exception as e:
+        logging.error(f"Database maintenance failed: {str(e)}", exc_info=True)
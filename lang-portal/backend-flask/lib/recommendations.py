@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Next-word recommendations for /api/recommendations. Per-word features come
+# from word_stats (kept current by triggers) and word_groups, held in NumPy
+# arrays so scoring a group is a few vector operations and top-N is an
+# argpartition. Recency is computed at scoring time from the stored Julian
+# day of the last review, so a cached model doesn't go stale as time passes.
+
+# Smoothed like word_scores: few answers are pulled towards the average
+PRIOR_STRENGTH = 5.0
+# A reviewed word is half "due" again after this many days
+HALF_LIFE_DAYS = 3.0
+# How much each feature counts: getting it wrong, being due, being new
+NEED_WEIGHT = 0.5
+DUE_WEIGHT = 0.3
+NEW_WEIGHT = 0.2
+
+# The model is reused while this is unchanged. Every answer is written to
+# review_events (see create_trigger_review_events_word_reviews.sql), so its
+# largest id moves on each review write, from this process or any other.
+# Group membership is summed up by its row count and SUM(word_id * group_id),
+# which also moves when a word changes groups without any count changing.
+VERSION_QUERY = '''
+  SELECT (SELECT MAX(id) FROM review_events),
+         (SELECT MAX(id) FROM words),
+         (SELECT COUNT(*) FROM word_groups),
+         (SELECT SUM(word_id * group_id) FROM word_groups)
+'''
+
+def julian_now():
+  return time.time() / 86400 + 2440587.5
+
+class RecommendationModel:
+  def __init__(self, word_ids, correct, wrong, last_reviewed, groups):
+    # word_ids sorted; last_reviewed in Julian days (NaN if never); groups:
+    # {group_id: indexes into word_ids}
+    import numpy as np
+    self.word_ids = word_ids
+    attempts = correct + wrong
+    total = attempts.sum()
+    prior_rate = correct.sum() / total if total else 0.5
+    accuracy = (correct + prior_rate * PRIOR_STRENGTH) / (attempts + PRIOR_STRENGTH)
+    # Parts of the score that don't depend on the time of the request
+    self.static = NEED_WEIGHT * (1 - accuracy) + NEW_WEIGHT / (1 + attempts)
+    self.last_reviewed = last_reviewed
+    self.never_reviewed = np.isnan(last_reviewed)
+    self.groups = groups
+
+  @classmethod
+  def load(cls, cursor):
+    import numpy as np
+    cursor.execute('''
+      SELECT word_id, correct_count, wrong_count, julianday(last_reviewed)
+      FROM word_stats
+      ORDER BY word_id
+    ''')
+    stats = np.array([tuple(row) for row in cursor.fetchall()], dtype=np.float64).reshape(-1, 4)
+    word_ids = stats[:, 0].astype(np.int64)
+
+    cursor.execute('SELECT group_id, word_id FROM word_groups ORDER BY group_id')
+    pairs = np.array([tuple(row) for row in cursor.fetchall()], dtype=np.int64).reshape(-1, 2)
+    index = np.searchsorted(word_ids, pairs[:, 1])
+    known = index < len(word_ids)
+    known[known] = word_ids[index[known]] == pairs[known, 1]
+    group_ids, starts = np.unique(pairs[known, 0], return_index=True)
+    groups = dict(zip(group_ids.tolist(), np.split(index[known], starts[1:])))
+
+    return cls(word_ids, stats[:, 1], stats[:, 2], stats[:, 3], groups)
+
+  def top(self, n, group_id=None, now=None):
+    # Returns (word ids, scores) of the n best candidates, best first
+    import numpy as np
+    if group_id is None:
+      candidates = np.arange(len(self.word_ids))
+    else:
+      candidates = self.groups.get(group_id, np.empty(0, dtype=np.int64))
+    if len(candidates) == 0:
+      return [], []
+
+    now = julian_now() if now is None else now
+    days = np.maximum(now - self.last_reviewed[candidates], 0)
+    due = np.where(self.never_reviewed[candidates], 1.0, 1 - np.power(0.5, days / HALF_LIFE_DAYS))
+    scores = self.static[candidates] + DUE_WEIGHT * due
+
+    n = min(n, len(candidates))
+    best = np.argpartition(-scores, n - 1)[:n] if n < len(candidates) else np.arange(len(candidates))
+    best = best[np.lexsort((self.word_ids[candidates[best]], -scores[best]))]
+    return self.word_ids[candidates[best]].tolist(), scores[best].tolist()
+
+class ModelCache:
+  # One model per database (learner, in multi-tenant mode), rebuilt when its
+  # version changes; least recently used dropped past max_entries
+  def __init__(self, max_entries=64):
+    self.max_entries = max_entries
+    self.entries = OrderedDict()
+    self.lock = threading.Lock()
+
+  def get(self, database, cursor):
+    cursor.execute(VERSION_QUERY)
+    version = tuple(cursor.fetchone())
+    with self.lock:
+      entry = self.entries.get(database)
+      if entry is not None and entry[0] == version:
+        self.entries.move_to_end(database)
+        return entry[1]
+    # Built from the same read snapshot the version came from
+    model = RecommendationModel.load(cursor)
+    with self.lock:
+      self.entries[database] = (version, model)
+      self.entries.move_to_end(database)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+    return model
+
+  def discard(self, database):
+    with self.lock:
+      self.entries.pop(database, None)
@@ -0,0 +1,168 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from lib import daily_activity
+
+class ReviewEventTicket:
+  # Handed back to callers that want to wait until their events are on disk
+  def __init__(self, count):
+    self.count = count
+    self.error = None
+    self.done = threading.Event()
+
+  def wait(self, timeout=None):
+    if not self.done.wait(timeout):
+      raise TimeoutError('Timed out waiting for review events to be written')
+    if self.error is not None:
+      raise self.error
+
+class ReviewEventQueue:
+  # Buffers review events in memory and writes them from a single background
+  # thread, committing up to batch_size events per transaction or whatever
+  # arrived within flush_interval_ms, so one fsync covers many answers
+  def __init__(self, database, batch_size=100, flush_interval_ms=50, synchronous='NORMAL'):
+    self.database = database
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval_ms / 1000
+    self.synchronous = synchronous
+    self.pending = deque()  # (database, rows, ticket) in arrival order
+    self.pending_count = 0
+    self.condition = threading.Condition()
+    self.thread = None
+    self.closed = False
+
+  def put(self, events, database=None):
+    # events: iterable of (study_session_id, word_id, correct); database
+    # defaults to the queue's own (a learner's file in multi-tenant mode)
+    created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    rows = [(session_id, word_id, 1 if correct else 0, created_at)
+            for session_id, word_id, correct in events]
+    ticket = ReviewEventTicket(len(rows))
+    with self.condition:
+      if self.closed:
+        raise RuntimeError('Review event queue is closed')
+      self.pending.append((database or self.database, rows, ticket))
+      self.pending_count += len(rows)
+      if self.thread is None:
+        self.thread = threading.Thread(target=self._run, name='review-events-writer', daemon=True)
+        self.thread.start()
+      self.condition.notify_all()
+    return ticket
+
+  def close(self, timeout=None):
+    # Flush whatever is still buffered and stop the writer thread
+    with self.condition:
+      self.closed = True
+      self.condition.notify_all()
+      thread = self.thread
+    if thread is not None:
+      thread.join(timeout)
+
+  def _take_batch(self):
+    with self.condition:
+      while not self.pending and not self.closed:
+        self.condition.wait()
+      deadline = time.monotonic() + self.flush_interval
+      while self.pending_count < self.batch_size and not self.closed:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        self.condition.wait(remaining)
+
+      batch = []
+      count = 0
+      while self.pending and (not batch or count + len(self.pending[0][1]) <= self.batch_size):
+        database, rows, ticket = self.pending.popleft()
+        batch.append((database, rows, ticket))
+        count += len(rows)
+      self.pending_count -= count
+      return batch
+
+  def _connect(self, database):
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(f'PRAGMA synchronous={self.synchronous}')
+    return connection
+
+  def _run(self):
+    connection = self._connect(self.database)
+    try:
+      while True:
+        batch = self._take_batch()
+        if not batch:
+          return
+        # One transaction per database in the batch; learner databases other
+        # than the default are only opened for as long as their write takes
+        by_database = defaultdict(list)
+        for database, rows, ticket in batch:
+          by_database[database].append((rows, ticket))
+        for database, entries in by_database.items():
+          try:
+            target = connection if database == self.database else self._connect(database)
+          except Exception as e:
+            errors = [e] * len(entries)
+          else:
+            try:
+              errors = self._write_entries(target, entries)
+            finally:
+              if target is not connection:
+                target.close()
+          for (rows, ticket), error in zip(entries, errors):
+            if error is not None:
+              # Async callers have already been answered; the log is all that's left
+              logging.error(f"Error writing review events {rows} to {database}: {str(error)}", exc_info=error)
+            ticket.error = error
+            ticket.done.set()
+    finally:
+      connection.close()
+
+  def _write_entries(self, connection, entries):
+    # Writes every caller's rows in one transaction. If that fails, each
+    # caller's rows are retried in a transaction of their own, so a bad event
+    # only fails the ticket it came with. Returns an error (or None) per entry.
+    try:
+      with connection:
+        self._write(connection.cursor(), [row for rows, _ in entries for row in rows])
+      return [None] * len(entries)
+    except Exception as e:
+      if len(entries) == 1:
+        return [e]
+    errors = []
+    for rows, _ in entries:
+      try:
+        with connection:
+          self._write(connection.cursor(), rows)
+        errors.append(None)
+      except Exception as e:
+        errors.append(e)
+    return errors
+
+  def _write(self, cursor, rows):
+    # Append the raw events (the review_events_word_reviews trigger adds each
+    # one to its word's totals), then fold them into the per-session review
+    # items and daily rollups with one statement per distinct key
+    cursor.executemany('''
+      INSERT INTO review_events (study_session_id, word_id, correct, created_at)
+      VALUES (?, ?, ?, ?)
+    ''', rows)
+
+    latest_answer = {}
+    for session_id, word_id, correct, created_at in rows:
+      latest_answer[(session_id, word_id)] = (correct, created_at)
+
+    for (session_id, word_id), (correct, created_at) in latest_answer.items():
+      cursor.execute('''
+        UPDATE word_review_items
+        SET correct = ?
+        WHERE study_session_id = ? AND word_id = ?
+      ''', (correct, session_id, word_id))
+      if cursor.rowcount == 0:
+        cursor.execute('''
+          INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+          VALUES (?, ?, ?, ?)
+        ''', (word_id, session_id, correct, created_at))
+
+    daily_activity.refresh_sessions(cursor, {session_id for session_id, _ in latest_answer})
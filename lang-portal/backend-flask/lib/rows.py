@@ -0,0 +1,77 @@
+import logging
+from itertools import islice
+from operator import itemgetter
+from flask import current_app
+
+# Rows are fetched and serialized this many at a time when streaming
+CHUNK_SIZE = 200
+
+class Projection:
+  # Maps cursor columns to output keys. Column positions are resolved once per
+  # query from cursor.description, so building each dict is a single
+  # itemgetter call instead of one sqlite3.Row lookup per field.
+  #
+  #   Projection('id', 'kanji', group_name='name')
+  #   -> {"id": row["id"], "kanji": row["kanji"], "group_name": row["name"]}
+  def __init__(self, *columns, **renamed):
+    self.fields = [(column, column) for column in columns] + list(renamed.items())
+
+  def compile(self, description):
+    positions = {column[0]: i for i, column in enumerate(description)}
+    keys = tuple(key for key, _ in self.fields)
+    getter = itemgetter(*(positions[column] for _, column in self.fields))
+    if len(keys) == 1:
+      return lambda row: {keys[0]: getter(row)}
+    return lambda row: dict(zip(keys, getter(row)))
+
+  def map(self, cursor):
+    to_dict = self.compile(cursor.description)
+    return [to_dict(row) for row in cursor]
+
+def stream_json(cursor, projection, key, **fields):
+  # Response for {key: [...rows], **fields} that serializes the cursor's rows
+  # in chunks while they are read, so no page is ever held in memory twice.
+  # The cursor must already have executed its query.
+  #
+  # The first chunk is read before the response is returned, so a failing
+  # query still raises in the route (and gets its error status). Once rows are
+  # being sent the status can't change: an error then is logged and ends the
+  # stream before the closing brackets, so the client gets a body that doesn't
+  # parse rather than a shorter list that does.
+  to_dict = projection.compile(cursor.description)
+  dumps = current_app.json.dumps
+  first = list(islice(cursor, CHUNK_SIZE))
+
+  # Teardown runs before the body is sent, so the response takes over the
+  # read connection and releases it when the server closes the response,
+  # whether or not the body was ever iterated (HEAD, client gone). Cursors on
+  # any other connection are read up front.
+  release = None
+  if len(first) == CHUNK_SIZE:
+    release = current_app.db.detach(cursor.connection)
+    if release is None:
+      first.extend(cursor.fetchall())
+  rows = cursor if release else iter(())
+
+  def generate():
+    yield '{' + dumps(key) + ':['
+    chunk = first
+    separator = ''
+    while chunk:
+      # One dumps() call per chunk; strip the list brackets to splice it in
+      yield separator + dumps([to_dict(row) for row in chunk])[1:-1]
+      separator = ','
+      try:
+        chunk = list(islice(rows, CHUNK_SIZE))
+      except Exception as e:
+        logging.error(f"Error streaming {key}, response cut short: {str(e)}", exc_info=True)
+        return
+    yield ']'
+    for name, value in fields.items():
+      yield ',' + dumps(name) + ':' + dumps(value)
+    yield '}\n'
+
+  response = current_app.response_class(generate(), mimetype='application/json')
+  if release is not None:
+    response.call_on_close(release)
+  return response
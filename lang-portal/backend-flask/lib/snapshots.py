@@ -0,0 +1,121 @@
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime, timezone
+from lib.db import connect
+
+# Hot backups and restores with SQLite's online backup API, so words.db (or a
+# learner's database) can be copied or rolled back without stopping the app.
+#
+# backup() copies a few pages per step and sleeps between steps so writers
+# keep getting the lock. The source connection holds one read transaction
+# for the whole copy: in WAL mode that pins a snapshot (writers aren't
+# blocked), where an unpinned stepped backup restarts every time another
+# connection commits and may never finish on a busy database.
+#
+# restore() copies the snapshot back into the live file in a single step,
+# which SQLite applies as one write transaction. Connections that are
+# already open (pooled tenant connections, the review event writer) see the
+# restored data on their next transaction, with no file to swap underneath
+# them and no stale -wal/-shm files left behind.
+
+PAGES_PER_STEP = 256
+PAUSE_MS = 5
+
+# Snapshot file names are generated by snapshot_name(); anything else is
+# refused so a name can never point outside the snapshot directory
+SNAPSHOT_NAME = re.compile(r'^[A-Za-z0-9_-]+-\d{8}T\d{6}(\d{6})?Z\.db$')
+
+def readonly_uri(path):
+  return Path(path).resolve().as_uri() + '?mode=ro'
+
+def stem(database):
+  return os.path.splitext(os.path.basename(database))[0]
+
+def snapshot_name(database):
+  stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+  return f'{stem(database)}-{stamp}.db'
+
+def backup(database, target, pages=PAGES_PER_STEP, pause_ms=PAUSE_MS):
+  # Writes a consistent copy of database to target, which appears
+  # atomically once complete. Returns {'pages', 'steps', 'seconds', 'bytes'}.
+  start = time.perf_counter()
+  directory = os.path.dirname(os.path.abspath(target))
+  os.makedirs(directory, exist_ok=True)
+  handle, partial = tempfile.mkstemp(suffix='.partial', dir=directory)
+  os.close(handle)
+  source = connect(database, readonly=True)
+  steps = [0, 0]
+  def progress(status, remaining, total):
+    steps[0] += 1
+    steps[1] = total
+    if remaining and pause_ms:
+      time.sleep(pause_ms / 1000)
+  try:
+    source.execute('BEGIN')
+    source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+    destination = sqlite3.connect(partial)
+    try:
+      source.backup(destination, pages=pages, progress=progress)
+    finally:
+      destination.close()
+    os.replace(partial, target)
+  except Exception:
+    if os.path.exists(partial):
+      os.remove(partial)
+    raise
+  finally:
+    source.close()
+  return {
+    'pages': steps[1],
+    'steps': steps[0],
+    'seconds': round(time.perf_counter() - start, 3),
+    'bytes': os.path.getsize(target)
+  }
+
+def verify(snapshot):
+  # Refuses files that aren't healthy SQLite databases before they replace
+  # anything
+  connection = sqlite3.connect(readonly_uri(snapshot), uri=True)
+  try:
+    result = connection.execute('PRAGMA quick_check').fetchone()[0]
+  except sqlite3.DatabaseError as e:
+    raise ValueError(f'{snapshot} is not a usable database: {e}') from e
+  finally:
+    connection.close()
+  if result != 'ok':
+    raise ValueError(f'{snapshot} failed quick_check: {result}')
+
+def restore(snapshot, database):
+  # Replaces database's contents with snapshot's. Returns
+  # {'pages', 'seconds'}.
+  start = time.perf_counter()
+  verify(snapshot)
+  source = sqlite3.connect(readonly_uri(snapshot), uri=True)
+  destination = sqlite3.connect(database, timeout=30)
+  pages = [0]
+  def progress(status, remaining, total):
+    pages[0] = total
+  try:
+    source.backup(destination, progress=progress)
+  finally:
+    destination.close()
+    source.close()
+  return {'pages': pages[0], 'seconds': round(time.perf_counter() - start, 3)}
+
+def is_snapshot_of(name, database):
+  return bool(SNAPSHOT_NAME.match(name)) and name.rsplit('-', 1)[0] == stem(database)
+
+def list_snapshots(directory, database):
+  # database's snapshots, newest first (the names sort by their timestamps)
+  if not os.path.isdir(directory):
+    return []
+  snapshots = []
+  for name in os.listdir(directory):
+    if is_snapshot_of(name, database):
+      path = os.path.join(directory, name)
+      snapshots.append({'name': name, 'bytes': os.path.getsize(path)})
+  return sorted(snapshots, key=lambda snapshot: snapshot['name'], reverse=True)
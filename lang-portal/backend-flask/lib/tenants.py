@@ -0,0 +1,212 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from flask import g, jsonify, request
+from lib.archive import columns
+from lib.db import SETUP_FILES, add_columns, connect, db
+
+# Multi-tenant mode: every learner gets their own SQLite file under
+# TENANT_DIR, so one learner's review writes never wait on another's write
+# lock and each database stays small. The learner is picked per request from
+# the TENANT_HEADER header or a /learners/<id>/... path prefix.
+
+TENANT_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Shared study content copied from the template database into a new learner's
+# file; everything else (sessions, reviews, rollups) starts empty
+CONTENT_TABLES = ['words', 'groups', 'word_groups', 'study_activities']
+# Counter caches filled in by triggers as the rows they count are copied
+DERIVED_COLUMNS = {'groups': {'words_count'}}
+
+class Tenants:
+  # Opens learner databases on demand and keeps up to cache_size idle
+  # connections across requests, evicting the least recently used ones
+  def __init__(self, directory, template=None, cache_size=64):
+    self.directory = directory
+    self.template = template
+    self.cache_size = cache_size
+    self.idle = OrderedDict()  # (tenant, readonly) -> [connection, ...]
+    self.idle_count = 0
+    self.ready = set()
+    self.lock = threading.Lock()
+    self.setup_lock = threading.Lock()
+
+  def path(self, tenant):
+    if not TENANT_ID.match(tenant):
+      raise ValueError(f"Invalid learner id: {tenant!r}")
+    return os.path.join(self.directory, tenant + '.db')
+
+  def ensure(self, tenant):
+    # Creates the learner's database from sql/setup the first time it is used
+    if tenant in self.ready:
+      return
+    with self.setup_lock:
+      if tenant in self.ready:
+        return
+      path = self.path(tenant)
+      os.makedirs(self.directory, exist_ok=True)
+      created = not os.path.exists(path)
+      connection = connect(path)
+      try:
+        cursor = connection.cursor()
+        for setup_file in SETUP_FILES:
+          cursor.execute(db.sql(setup_file))
+        add_columns(cursor)
+        connection.commit()
+        if created and self.template and os.path.exists(self.template):
+          self.copy_content(cursor)
+      finally:
+        connection.close()
+      if created:
+        logging.info(f"Created database for learner {tenant}")
+      self.ready.add(tenant)
+
+  def copy_content(self, cursor):
+    cursor.execute('ATTACH DATABASE ? AS template', (self.template,))
+    try:
+      for table in CONTENT_TABLES:
+        available = {name for name, _ in columns(cursor, 'template', table)}
+        column_list = ', '.join(name for name, _ in columns(cursor, 'main', table)
+                                if name in available and name not in DERIVED_COLUMNS.get(table, ()))
+        if column_list:
+          cursor.execute(f'INSERT INTO main.{table} ({column_list}) SELECT {column_list} FROM template.{table}')
+      # DETACH is refused while the copy's transaction is still open
+      cursor.connection.commit()
+    except Exception:
+      cursor.connection.rollback()
+      raise
+    finally:
+      cursor.execute('DETACH DATABASE template')
+
+  def acquire(self, tenant, readonly=False):
+    with self.lock:
+      connections = self.idle.get((tenant, readonly))
+      if connections:
+        self.idle_count -= 1
+        connection = connections.pop()
+        if not connections:
+          del self.idle[(tenant, readonly)]
+        return connection
+    self.ensure(tenant)
+    # Cached connections move between request threads, one at a time
+    return connect(self.path(tenant), readonly=readonly, check_same_thread=False)
+
+  def release(self, tenant, connection, readonly=False):
+    # Whatever the request left uncommitted is discarded, as close() would
+    if connection.in_transaction:
+      connection.rollback()
+    evicted = []
+    with self.lock:
+      key = (tenant, readonly)
+      self.idle.setdefault(key, []).append(connection)
+      self.idle.move_to_end(key)
+      self.idle_count += 1
+      while self.idle_count > self.cache_size:
+        oldest_key, connections = next(iter(self.idle.items()))
+        evicted.append(connections.pop(0))
+        self.idle_count -= 1
+        if not connections:
+          del self.idle[oldest_key]
+    for connection in evicted:
+      connection.close()
+
+  def close(self):
+    with self.lock:
+      connections = [connection for idle in self.idle.values() for connection in idle]
+      self.idle.clear()
+      self.idle_count = 0
+    for connection in connections:
+      connection.close()
+
+  def list(self):
+    if not os.path.isdir(self.directory):
+      return []
+    return sorted(name[:-3] for name in os.listdir(self.directory)
+                  if name.endswith('.db') and TENANT_ID.match(name[:-3]))
+
+def aggregate(tenants, since=None):
+  # Cross-tenant admin report from each learner's daily_activity rollup,
+  # optionally limited to days >= since (YYYY-MM-DD). Databases are opened
+  # read-only one at a time, so this never holds a learner's write lock.
+  rows = []
+  for tenant in tenants.list():
+    connection = connect(tenants.path(tenant), readonly=True)
+    try:
+      row = connection.execute('''
+        SELECT COUNT(DISTINCT day) as active_days,
+               COALESCE(SUM(sessions), 0) as sessions,
+               COALESCE(SUM(reviews), 0) as reviews,
+               COALESCE(SUM(correct), 0) as correct,
+               MAX(day) as last_active
+        FROM daily_activity
+        WHERE ? IS NULL OR day >= ?
+      ''', (since, since)).fetchone()
+    except sqlite3.Error as e:
+      logging.warning(f"Skipping learner {tenant}: {str(e)}")
+      continue
+    finally:
+      connection.close()
+    rows.append({
+      "learner": tenant,
+      "active_days": row['active_days'],
+      "sessions": row['sessions'],
+      "reviews": row['reviews'],
+      "correct": row['correct'],
+      "accuracy": round(row['correct'] / row['reviews'] * 100, 1) if row['reviews'] else 0.0,
+      "last_active": row['last_active']
+    })
+  return rows
+
+class TenantPathMiddleware:
+  # Moves a /learners/<id> prefix from PATH_INFO to SCRIPT_NAME, so
+  # /learners/ana/api/study-sessions is routed like /api/study-sessions
+  def __init__(self, wsgi_app, prefix='/learners'):
+    self.wsgi_app = wsgi_app
+    self.prefix = prefix.rstrip('/')
+
+  def __call__(self, environ, start_response):
+    path = environ.get('PATH_INFO', '')
+    if path.startswith(self.prefix + '/'):
+      tenant, _, rest = path[len(self.prefix) + 1:].partition('/')
+      if tenant:
+        environ['lang_portal.tenant'] = tenant
+        environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + f'{self.prefix}/{tenant}'
+        environ['PATH_INFO'] = '/' + rest
+    return self.wsgi_app(environ, start_response)
+
+def init_app(app):
+  # Multi-tenant mode is on when TENANT_DIR is set; DATABASE then only serves
+  # as the template new learner databases copy their words and groups from
+  app.config.setdefault('TENANT_DIR', None)
+  app.config.setdefault('TENANT_HEADER', 'X-Learner-Id')
+  app.config.setdefault('TENANT_PATH_PREFIX', '/learners')
+  app.config.setdefault('TENANT_CACHE_SIZE', 64)
+
+  app.tenants = None
+  if not app.config['TENANT_DIR']:
+    return None
+
+  app.tenants = Tenants(
+    directory=app.config['TENANT_DIR'],
+    template=app.config['DATABASE'],
+    cache_size=app.config['TENANT_CACHE_SIZE']
+  )
+  app.wsgi_app = TenantPathMiddleware(app.wsgi_app, app.config['TENANT_PATH_PREFIX'])
+
+  @app.before_request
+  def select_tenant():
+    tenant = request.environ.get('lang_portal.tenant') or request.headers.get(app.config['TENANT_HEADER'])
+    if tenant is None:
+      # CORS preflights carry no custom headers
+      if request.method == 'OPTIONS':
+        return None
+      return jsonify({"error": f"Missing learner id ({app.config['TENANT_HEADER']} header or {app.config['TENANT_PATH_PREFIX']}/<id> prefix)"}), 400
+    if not TENANT_ID.match(tenant):
+      return jsonify({"error": "Invalid learner id"}), 400
+    app.tenants.ensure(tenant)
+    g.tenant = tenant
+
+  return app.tenants
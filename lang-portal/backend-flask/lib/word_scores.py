@@ -0,0 +1,77 @@
+import numpy as np
+from lib.counters import review_events
+
+# Offline scoring for /words?sort_by=difficulty. The whole review history is
+# pulled in two queries and scored per word with array operations, so the
+# request path only reads the precomputed word_scores table.
+
+MASTERY_MIN_ATTEMPTS = 5
+MASTERY_MIN_SUCCESS_RATE = 0.8
+
+def load_history(cursor, archive=False):
+  cursor.execute('SELECT id FROM words ORDER BY id')
+  word_ids = np.fromiter((row[0] for row in cursor), dtype=np.int64)
+
+  # One row per answer actually given. word_review_items is not used: it
+  # holds a correct=0 placeholder per word from the moment a session starts
+  # and only the latest answer afterwards. Age in days is computed by SQLite
+  # so no timestamps are parsed in Python.
+  cursor.execute(f'''
+    SELECT word_id, correct, julianday('now') - julianday(created_at)
+    FROM ({review_events(archive)})
+    WHERE created_at IS NOT NULL
+  ''')
+  history = np.fromiter((tuple(row) for row in cursor), dtype=np.dtype((np.float64, 3))).reshape(-1, 3)
+  return word_ids, history[:, 0].astype(np.int64), history[:, 1], history[:, 2]
+
+def score(word_ids, review_word_ids, correct, age_days, half_life_days=30.0, prior_strength=5.0):
+  # Reviews of words that no longer exist are dropped
+  index = np.searchsorted(word_ids, review_word_ids)
+  known = index < len(word_ids)
+  known[known] = word_ids[index[known]] == review_word_ids[known]
+  index, correct, age_days = index[known], correct[known], age_days[known]
+
+  n = len(word_ids)
+  attempts = np.bincount(index, minlength=n).astype(np.float64)
+  successes = np.bincount(index, weights=correct, minlength=n)
+
+  # Beta prior centred on the global success rate: words with few reviews
+  # are pulled towards the average instead of jumping to 0% or 100%
+  prior_rate = correct.mean() if len(correct) else 0.5
+  alpha = prior_rate * prior_strength
+  beta = (1 - prior_rate) * prior_strength
+  success_rate = (successes + alpha) / (attempts + alpha + beta)
+
+  # Recent answers count more: each review's weight halves every half_life_days
+  weights = np.power(0.5, np.maximum(age_days, 0) / half_life_days)
+  weighted_attempts = np.bincount(index, weights=weights, minlength=n)
+  weighted_successes = np.bincount(index, weights=weights * correct, minlength=n)
+  difficulty = 1 - (weighted_successes + alpha) / (weighted_attempts + alpha + beta)
+
+  confidence = attempts / (attempts + MASTERY_MIN_ATTEMPTS)
+  mastery = success_rate * confidence
+
+  raw_rate = np.divide(successes, attempts, out=np.zeros(n), where=attempts > 0)
+  mastered = (attempts >= MASTERY_MIN_ATTEMPTS) & (raw_rate >= MASTERY_MIN_SUCCESS_RATE)
+
+  return {
+    'attempts': attempts.astype(np.int64),
+    'success_rate': success_rate,
+    'difficulty': difficulty,
+    'mastery': mastery,
+    'mastered': mastered
+  }
+
+def write_scores(cursor, word_ids, scores):
+  cursor.execute('DELETE FROM word_scores')
+  cursor.executemany('''
+    INSERT INTO word_scores (word_id, attempts, success_rate, difficulty, mastery, mastered, scored_at)
+    VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
+  ''', zip(
+    word_ids.tolist(),
+    scores['attempts'].tolist(),
+    scores['success_rate'].tolist(),
+    scores['difficulty'].tolist(),
+    scores['mastery'].tolist(),
+    scores['mastered'].astype(int).tolist()
+  ))
@@ -1,13 +1,12 @@
-from flask import jsonify
-from flask_cors import cross_origin
-from datetime import datetime, timedelta
+from flask import jsonify, request
+from datetime import datetime, timedelta, timezone
+from lib import daily_activity
 
 def load(app):
     @app.route('/dashboard/recent-session', methods=['GET'])
-    @cross_origin()
     def get_recent_session():
         try:
-            cursor = app.db.cursor()
+            cursor = app.db.read_cursor()
             
             # Get the most recent study session with activity name and results
             cursor.execute('''
@@ -44,10 +43,9 @@ def load(app):
             return jsonify({"error": str(e)}), 500
 
     @app.route('/dashboard/stats', methods=['GET'])
-    @cross_origin()
     def get_study_stats():
         try:
-            cursor = app.db.cursor()
+            cursor = app.db.read_cursor()
             
             # Get total vocabulary count
             cursor.execute('SELECT COUNT(*) as total_vocabulary FROM words')
@@ -61,21 +59,12 @@ def load(app):
             ''')
             total_words = cursor.fetchone()["total_words"]
             
-            # Get mastered words (words with >80% success rate and at least 5 attempts)
+            # Get mastered words (at least 80% correct over at least 5 answers)
+            # from the word_stats counter cache, walking its accuracy index
             cursor.execute('''
-                WITH word_stats AS (
-                    SELECT 
-                        word_id,
-                        COUNT(*) as total_attempts,
-                        SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                    FROM word_review_items wri
-                    JOIN study_sessions ss ON wri.study_session_id = ss.id
-                    GROUP BY word_id
-                    HAVING total_attempts >= 5
-                )
                 SELECT COUNT(*) as mastered_words
                 FROM word_stats
-                WHERE success_rate >= 0.8
+                WHERE accuracy >= 0.8 AND correct_count + wrong_count >= 5
             ''')
             mastered_words = cursor.fetchone()["mastered_words"]
             
@@ -95,35 +84,13 @@ def load(app):
             # Get number of groups with activity in the last 30 days
             cursor.execute('''
                 SELECT COUNT(DISTINCT group_id) as active_groups
-                FROM study_sessions
-                WHERE created_at >= date('now', '-30 days')
+                FROM daily_activity
+                WHERE day >= date('now', '-30 days')
             ''')
             active_groups = cursor.fetchone()["active_groups"]
             
             # Calculate current streak (consecutive days with at least one study session)
-            cursor.execute('''
-                WITH daily_sessions AS (
-                    SELECT 
-                        date(created_at) as study_date,
-                        COUNT(*) as session_count
-                    FROM study_sessions
-                    GROUP BY date(created_at)
-                ),
-                streak_calc AS (
-                    SELECT 
-                        study_date,
-                        julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
-                    FROM daily_sessions
-                )
-                SELECT COUNT(*) as streak
-                FROM (
-                    SELECT study_date
-                    FROM streak_calc
-                    WHERE days_diff = 1 OR days_diff IS NULL
-                    ORDER BY study_date DESC
-                )
-            ''')
-            current_streak = cursor.fetchone()["streak"]
+            current_streak = daily_activity.current_streak(cursor)
             
             return jsonify({
                 "total_vocabulary": total_vocabulary,
@@ -137,3 +104,48 @@ def load(app):
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
+
+    @app.route('/dashboard/activity', methods=['GET'])
+    def get_study_activity_heatmap():
+        try:
+            # Defaults to the last year, ending today (UTC, like created_at)
+            today = datetime.now(timezone.utc).date()
+            try:
+                to_day = datetime.strptime(request.args.get('to', today.isoformat()), '%Y-%m-%d').date()
+                from_day = request.args.get('from')
+                if from_day:
+                    from_day = datetime.strptime(from_day, '%Y-%m-%d').date()
+                else:
+                    from_day = to_day - timedelta(days=364)
+            except ValueError:
+                return jsonify({"error": "from and to must be dates in YYYY-MM-DD format"}), 400
+
+            if from_day > to_day:
+                return jsonify({"error": "from must not be after to"}), 400
+
+            cursor = app.db.read_cursor()
+            cursor.execute('''
+                SELECT 
+                    day,
+                    SUM(sessions) as sessions,
+                    SUM(reviews) as reviews,
+                    SUM(correct) as correct
+                FROM daily_activity
+                WHERE day BETWEEN ? AND ?
+                GROUP BY day
+                ORDER BY day
+            ''', (from_day.isoformat(), to_day.isoformat()))
+
+            return jsonify({
+                "from": from_day.isoformat(),
+                "to": to_day.isoformat(),
+                "days": [{
+                    "date": row["day"],
+                    "sessions": row["sessions"],
+                    "reviews": row["reviews"],
+                    "correct": row["correct"]
+                } for row in cursor.fetchall()]
+            })
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
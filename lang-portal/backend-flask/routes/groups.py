@@ -1,13 +1,19 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
 import json
+from lib.rows import Projection, stream_json
+
+GROUP_FIELDS = Projection('id', group_name='name', word_count='words_count')
+WORD_FIELDS = Projection('id', 'kanji', 'romaji', 'english', 'correct_count', 'wrong_count', 'accuracy', 'last_reviewed')
+GROUP_SESSION_FIELDS = Projection(
+  'id', 'group_id', 'group_name', 'study_activity_id', 'activity_name', 'start_time', 'end_time',
+  review_items_count='review_count'
+)
 
 def load(app):
   @app.route('/groups', methods=['GET'])
-  @cross_origin()
   def get_groups():
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
 
       # Get the current page number from query parameters (default is 1)
       page = int(request.args.get('page', 1))
@@ -25,6 +31,11 @@ def load(app):
       if order not in ['asc', 'desc']:
         order = 'asc'
 
+      # Query the total number of groups
+      cursor.execute('SELECT COUNT(*) FROM groups')
+      total_groups = cursor.fetchone()[0]
+      total_pages = (total_groups + groups_per_page - 1) // groups_per_page
+
       # Query to fetch groups with sorting and the cached word count
       cursor.execute(f'''
         SELECT id, name, words_count
@@ -33,36 +44,18 @@ def load(app):
         LIMIT ? OFFSET ?
       ''', (groups_per_page, offset))
 
-      groups = cursor.fetchall()
-
-      # Query the total number of groups
-      cursor.execute('SELECT COUNT(*) FROM groups')
-      total_groups = cursor.fetchone()[0]
-      total_pages = (total_groups + groups_per_page - 1) // groups_per_page
-
-      # Format the response
-      groups_data = []
-      for group in groups:
-        groups_data.append({
-          "id": group["id"],
-          "group_name": group["name"],
-          "word_count": group["words_count"]
-        })
-
       # Return groups and pagination metadata
-      return jsonify({
-        'groups': groups_data,
-        'total_pages': total_pages,
-        'current_page': page
-      })
+      return stream_json(cursor, GROUP_FIELDS, 'groups',
+        total_pages=total_pages,
+        current_page=page
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   @app.route('/groups/<int:id>', methods=['GET'])
-  @cross_origin()
   def get_group(id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
 
       # Get group details
       cursor.execute('''
@@ -84,10 +77,9 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/groups/<int:id>/words', methods=['GET'])
-  @cross_origin()
   def get_group_words(id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
       
       # Get pagination parameters
       page = int(request.args.get('page', 1))
@@ -99,69 +91,47 @@ def load(app):
       order = request.args.get('order', 'asc')
 
       # Validate sort parameters
-      valid_columns = ['kanji', 'romaji', 'english', 'correct_count', 'wrong_count']
+      valid_columns = ['kanji', 'romaji', 'english', 'correct_count', 'wrong_count', 'accuracy', 'last_reviewed']
       if sort_by not in valid_columns:
         sort_by = 'kanji'
       if order not in ['asc', 'desc']:
         order = 'asc'
 
-      # First, check if the group exists
-      cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
+      # First, check if the group exists; its words_count (kept by triggers)
+      # is the total for pagination
+      cursor.execute('SELECT name, words_count FROM groups WHERE id = ?', (id,))
       group = cursor.fetchone()
       if not group:
         return jsonify({"error": "Group not found"}), 404
 
+      total_words = group['words_count']
+      total_pages = (total_words + words_per_page - 1) // words_per_page
+
       # Query to fetch words with pagination and sorting
       cursor.execute(f'''
-        SELECT w.*, 
-               COALESCE(wr.correct_count, 0) as correct_count,
-               COALESCE(wr.wrong_count, 0) as wrong_count
-        FROM words w
-        JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN word_reviews wr ON w.id = wr.word_id
+        SELECT w.id, w.kanji, w.romaji, w.english,
+               ws.correct_count, ws.wrong_count, ws.accuracy, ws.last_reviewed
+        FROM word_groups wg
+        JOIN words w ON w.id = wg.word_id
+        JOIN word_stats ws ON ws.word_id = wg.word_id
         WHERE wg.group_id = ?
-        ORDER BY {sort_by} {order}
+        ORDER BY {sort_by} {order}, w.id {order}
         LIMIT ? OFFSET ?
       ''', (id, words_per_page, offset))
-      
-      words = cursor.fetchall()
-
-      # Get total words count for pagination
-      cursor.execute('''
-        SELECT COUNT(*) 
-        FROM word_groups 
-        WHERE group_id = ?
-      ''', (id,))
-      total_words = cursor.fetchone()[0]
-      total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "kanji": word["kanji"],
-          "romaji": word["romaji"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
-
-      return jsonify({
-        'words': words_data,
-        'total_pages': total_pages,
-        'current_page': page
-      })
+      return stream_json(cursor, WORD_FIELDS, 'words',
+        total_pages=total_pages,
+        current_page=page
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   # todo GET /groups/:id/words/raw
 
   @app.route('/groups/<int:id>/study_sessions', methods=['GET'])
-  @cross_origin()
   def get_group_study_sessions(id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
       
       # Get pagination parameters
       page = int(request.args.get('page', 1))
@@ -193,7 +163,8 @@ def load(app):
       total_sessions = cursor.fetchone()[0]
       total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
 
-      # Get study sessions for this group with dynamic calculations
+      # Get study sessions for this group with dynamic calculations.
+      # Sessions without review activity end 30 minutes after they started.
       cursor.execute(f'''
         SELECT 
           s.id,
@@ -205,6 +176,14 @@ def load(app):
             FROM word_review_items
             WHERE study_session_id = s.id
           ) as last_activity_time,
+          COALESCE(
+            (
+              SELECT MAX(created_at)
+              FROM word_review_items
+              WHERE study_session_id = s.id
+            ),
+            datetime(s.created_at, '+30 minutes')
+          ) as end_time,
           a.name as activity_name,
           g.name as group_name,
           (
@@ -219,31 +198,10 @@ def load(app):
         ORDER BY {sort_column} {order}
         LIMIT ? OFFSET ?
       ''', (id, sessions_per_page, offset))
-      
-      sessions = cursor.fetchall()
-      sessions_data = []
-      
-      for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
-        
-        sessions_data.append({
-          "id": session["id"],
-          "group_id": session["group_id"],
-          "group_name": session["group_name"],
-          "study_activity_id": session["study_activity_id"],
-          "activity_name": session["activity_name"],
-          "start_time": session["start_time"],
-          "end_time": end_time,
-          "review_items_count": session["review_count"]
-        })
 
-      return jsonify({
-        'study_sessions': sessions_data,
-        'total_pages': total_pages,
-        'current_page': page
-      })
+      return stream_json(cursor, GROUP_SESSION_FIELDS, 'study_sessions',
+        total_pages=total_pages,
+        current_page=page
+      )
     except Exception as e:
-      return jsonify({"error": str(e)}), 500
\ No newline at end of file
+      return jsonify({"error": str(e)}), 500
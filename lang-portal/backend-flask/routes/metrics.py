@@ -0,0 +1,8 @@
+from flask import jsonify
+
+def load(app):
+  # Endpoint: GET /api/metrics/limits reports each concurrency limiter's
+  # slots, queue and rejections (see lib/limits.py)
+  @app.route('/api/metrics/limits', methods=['GET'])
+  def get_limit_metrics():
+    return jsonify(app.limits.metrics())
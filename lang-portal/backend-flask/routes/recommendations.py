@@ -0,0 +1,56 @@
+from flask import request, jsonify
+import json
+import logging
+
+def load(app):
+  # Endpoint: GET /api/recommendations?group_id=&n=10 picks the words to study
+  # next (from one group, or all words without group_id): the ones answered
+  # wrong most, due for review, or not studied yet. See lib/recommendations.py.
+  @app.route('/api/recommendations', methods=['GET'])
+  def get_recommendations():
+    try:
+      try:
+        n = int(request.args.get('n', 10))
+        group_id = request.args.get('group_id')
+        group_id = int(group_id) if group_id not in (None, '') else None
+      except ValueError:
+        return jsonify({"error": "group_id and n must be integers"}), 400
+      limit = app.config['RECOMMENDATIONS_LIMIT']
+      if n < 1 or n > limit:
+        return jsonify({"error": f"n must be between 1 and {limit}"}), 400
+
+      cursor = app.db.read_cursor()
+
+      if group_id is not None:
+        cursor.execute('SELECT 1 FROM groups WHERE id = ?', (group_id,))
+        if not cursor.fetchone():
+          return jsonify({"error": "Group not found"}), 404
+
+      model = app.recommendations.get(app.db.path(), cursor)
+      word_ids, scores = model.top(n, group_id)
+
+      cursor.execute('''
+        SELECT w.id, w.kanji, w.romaji, w.english, ws.correct_count, ws.wrong_count, ws.last_reviewed
+        FROM words w
+        JOIN word_stats ws ON ws.word_id = w.id
+        WHERE w.id IN (SELECT value FROM json_each(?))
+      ''', (json.dumps(word_ids),))
+      words = {word['id']: word for word in cursor.fetchall()}
+
+      return jsonify({
+        "group_id": group_id,
+        "words": [{
+          "id": word_id,
+          "kanji": words[word_id]["kanji"],
+          "romaji": words[word_id]["romaji"],
+          "english": words[word_id]["english"],
+          "correct_count": words[word_id]["correct_count"],
+          "wrong_count": words[word_id]["wrong_count"],
+          "last_reviewed": words[word_id]["last_reviewed"],
+          "score": round(score, 4)
+        } for word_id, score in zip(word_ids, scores) if word_id in words]
+      })
+
+    except Exception as e:
+      logging.error(f"Error recommending words: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
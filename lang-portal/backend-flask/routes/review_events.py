@@ -0,0 +1,71 @@
+from flask import request, jsonify
+import json
+import logging
+
+def load(app):
+  # Endpoint: POST /api/review-events for fine-grained, per-answer logging.
+  # Events are buffered and group-committed by app.review_events; with
+  # durability "sync" the response waits until the batch is on disk.
+  @app.route('/api/review-events', methods=['POST'])
+  def post_review_events():
+    try:
+      if not request.is_json:
+        logging.warning("Request missing JSON data")
+        return jsonify({"error": "Request must be JSON"}), 400
+
+      data = request.get_json(silent=True)
+      if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+
+      if 'events' not in data:
+        logging.warning("Missing events array in request")
+        return jsonify({"error": "Missing events array"}), 400
+
+      events = data['events']
+      if not isinstance(events, list):
+        logging.warning(f"Invalid events format: {type(events)}")
+        return jsonify({"error": "Events must be an array"}), 400
+      if len(events) == 0:
+        return jsonify({"error": "events cannot be empty"}), 400
+
+      durability = data.get('durability', app.config['REVIEW_EVENTS_DURABILITY'])
+      if durability not in ['async', 'sync']:
+        return jsonify({"error": "durability must be 'async' or 'sync'"}), 400
+
+      rows = []
+      for event in events:
+        if not isinstance(event, dict):
+          return jsonify({"error": "Each event must be an object"}), 400
+        if 'study_session_id' not in event or 'word_id' not in event or 'is_correct' not in event:
+          logging.warning(f"Missing required fields in event: {event}")
+          return jsonify({"error": "Each event must have study_session_id, word_id and is_correct"}), 400
+        # bool is a subclass of int, but true/false are not ids
+        for field in ['study_session_id', 'word_id']:
+          if not isinstance(event[field], int) or isinstance(event[field], bool):
+            return jsonify({"error": f"{field} must be an integer"}), 400
+        if not isinstance(event['is_correct'], bool):
+          return jsonify({"error": "is_correct must be a boolean"}), 400
+        rows.append((event['study_session_id'], event['word_id'], event['is_correct']))
+
+      # The writer adds a review item for a word new to its session, so both
+      # ids have to exist before the events are queued
+      cursor = app.db.read_cursor()
+      for table, index, field in [('study_sessions', 0, 'study_session_id'), ('words', 1, 'word_id')]:
+        ids = sorted({row[index] for row in rows})
+        cursor.execute(f'SELECT id FROM {table} WHERE id IN (SELECT value FROM json_each(?))', (json.dumps(ids),))
+        unknown = sorted(set(ids) - {row[0] for row in cursor.fetchall()})
+        if unknown:
+          logging.warning(f"Review events for unknown {field}: {unknown}")
+          return jsonify({"error": f"Unknown {field}: {', '.join(map(str, unknown))}"}), 400
+
+      ticket = app.review_events.put(rows, database=app.db.path())
+
+      if durability == 'sync':
+        ticket.wait(timeout=app.config['REVIEW_EVENTS_SYNC_TIMEOUT'])
+        return jsonify({"written": ticket.count}), 201
+
+      return jsonify({"queued": ticket.count}), 202
+
+    except Exception as e:
+      logging.error(f"Error ingesting review events: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
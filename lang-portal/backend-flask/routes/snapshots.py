@@ -0,0 +1,74 @@
+from flask import request, jsonify
+from functools import wraps
+import hmac
+import logging
+import os
+from lib import snapshots
+
+def load(app):
+  def admin_only(view):
+    # Snapshot endpoints don't exist unless ADMIN_TOKEN is set, and then need
+    # "Authorization: Bearer <ADMIN_TOKEN>"
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      token = app.config['ADMIN_TOKEN']
+      if not token:
+        return jsonify({"error": "Not found"}), 404
+      supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+      if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({"error": "Invalid admin token"}), 403
+      return view(*args, **kwargs)
+    return wrapper
+
+  # Endpoint: GET /api/admin/snapshots lists the current database's snapshots
+  # (a learner's, in multi-tenant mode)
+  @app.route('/api/admin/snapshots', methods=['GET'])
+  @admin_only
+  def get_snapshots():
+    return jsonify({"snapshots": snapshots.list_snapshots(app.config['SNAPSHOT_DIR'], app.db.path())})
+
+  # Endpoint: POST /api/admin/snapshots takes a hot backup of the current
+  # database into SNAPSHOT_DIR
+  @app.route('/api/admin/snapshots', methods=['POST'])
+  @admin_only
+  def create_snapshot():
+    try:
+      database = app.db.path()
+      name = snapshots.snapshot_name(database)
+      stats = snapshots.backup(
+        database, os.path.join(app.config['SNAPSHOT_DIR'], name),
+        pages=app.config['SNAPSHOT_PAGES_PER_STEP'],
+        pause_ms=app.config['SNAPSHOT_PAUSE_MS']
+      )
+      logging.info(f"Backed up {database} to {name}: {stats}")
+      return jsonify({"name": name, **stats}), 201
+    except Exception as e:
+      logging.error(f"Error backing up database: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: POST /api/admin/snapshots/<name>/restore replaces the current
+  # database's contents with one of its snapshots
+  @app.route('/api/admin/snapshots/<name>/restore', methods=['POST'])
+  @admin_only
+  def restore_snapshot(name):
+    database = app.db.path()
+    if not snapshots.is_snapshot_of(name, database):
+      return jsonify({"error": "Snapshot not found"}), 404
+    path = os.path.join(app.config['SNAPSHOT_DIR'], name)
+    if not os.path.exists(path):
+      return jsonify({"error": "Snapshot not found"}), 404
+    try:
+      # The request's own connections would otherwise hold the old snapshot
+      app.db.close()
+      stats = snapshots.restore(path, database)
+      # In-process caches built from the old contents
+      app.kana_drills.discard(database)
+      app.recommendations.discard(database)
+      app.cors.invalidate()
+      logging.info(f"Restored {database} from {name}: {stats}")
+      return jsonify({"name": name, **stats})
+    except ValueError as e:
+      return jsonify({"error": str(e)}), 400
+    except Exception as e:
+      logging.error(f"Error restoring {name}: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
@@ -1,12 +1,12 @@
 from flask import jsonify, request
-from flask_cors import cross_origin
 import math
+from lib.rows import stream_json
+from routes.study_sessions import SESSION_FIELDS
 
 def load(app):
     @app.route('/api/study-activities', methods=['GET'])
-    @cross_origin()
     def get_study_activities():
-        cursor = app.db.cursor()
+        cursor = app.db.read_cursor()
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities')
         activities = cursor.fetchall()
         
@@ -18,9 +18,8 @@ def load(app):
         } for activity in activities])
 
     @app.route('/api/study-activities/<int:id>', methods=['GET'])
-    @cross_origin()
     def get_study_activity(id):
-        cursor = app.db.cursor()
+        cursor = app.db.read_cursor()
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
         activity = cursor.fetchone()
         
@@ -35,9 +34,8 @@ def load(app):
         })
 
     @app.route('/api/study-activities/<int:id>/sessions', methods=['GET'])
-    @cross_origin()
     def get_study_activity_sessions(id):
-        cursor = app.db.cursor()
+        cursor = app.db.read_cursor()
         
         # Verify activity exists
         cursor.execute('SELECT id FROM study_activities WHERE id = ?', (id,))
@@ -77,29 +75,17 @@ def load(app):
             ORDER BY ss.created_at DESC
             LIMIT ? OFFSET ?
         ''', (id, per_page, offset))
-        sessions = cursor.fetchall()
 
-        return jsonify({
-            'items': [{
-                'id': session['id'],
-                'group_id': session['group_id'],
-                'group_name': session['group_name'],
-                'activity_id': session['activity_id'],
-                'activity_name': session['activity_name'],
-                'start_time': session['created_at'],
-                'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-                'review_items_count': session['review_items_count']
-            } for session in sessions],
-            'total': total_count,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': math.ceil(total_count / per_page)
-        })
+        return stream_json(cursor, SESSION_FIELDS, 'items',
+            total=total_count,
+            page=page,
+            per_page=per_page,
+            total_pages=math.ceil(total_count / per_page)
+        )
 
     @app.route('/api/study-activities/<int:id>/launch', methods=['GET'])
-    @cross_origin()
     def get_study_activity_launch_data(id):
-        cursor = app.db.cursor()
+        cursor = app.db.read_cursor()
         
         # Get activity details
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
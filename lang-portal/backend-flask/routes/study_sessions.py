@@ -1,12 +1,22 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
 from datetime import datetime
 import math
 import logging
+from lib import archive, daily_activity
+from lib.rows import Projection, stream_json
+
+# For now end_time is the start time since we don't track when sessions end
+SESSION_FIELDS = Projection(
+  'id', 'group_id', 'group_name', 'activity_id', 'activity_name', 'review_items_count',
+  start_time='created_at', end_time='created_at'
+)
+SESSION_WORD_FIELDS = Projection(
+  'id', 'kanji', 'romaji', 'english',
+  correct_count='session_correct_count', wrong_count='session_wrong_count'
+)
 
 def load(app):
   @app.route('/api/study-sessions', methods=['POST'])
-  @cross_origin()
   def create_study_session():
     try:
       # Log incoming request
@@ -85,6 +95,8 @@ def load(app):
           VALUES (?, ?, 0, datetime('now'))
         ''', (session_id, word_id))
 
+      daily_activity.refresh_sessions(cursor, [session_id])
+
       app.db.commit()
       logging.info("Successfully committed transaction")
 
@@ -126,10 +138,9 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study-sessions', methods=['GET'])
-  @cross_origin()
   def get_study_sessions():
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
       
       # Get pagination parameters
       page = request.args.get('page', 1, type=int)
@@ -163,32 +174,20 @@ def load(app):
         ORDER BY ss.created_at DESC
         LIMIT ? OFFSET ?
       ''', (per_page, offset))
-      sessions = cursor.fetchall()
 
-      return jsonify({
-        'items': [{
-          'id': session['id'],
-          'group_id': session['group_id'],
-          'group_name': session['group_name'],
-          'activity_id': session['activity_id'],
-          'activity_name': session['activity_name'],
-          'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-          'review_items_count': session['review_items_count']
-        } for session in sessions],
-        'total': total_count,
-        'page': page,
-        'per_page': per_page,
-        'total_pages': math.ceil(total_count / per_page)
-      })
+      return stream_json(cursor, SESSION_FIELDS, 'items',
+        total=total_count,
+        page=page,
+        per_page=per_page,
+        total_pages=math.ceil(total_count / per_page)
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study-sessions/<id>', methods=['GET'])
-  @cross_origin()
   def get_study_session(id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
       
       # Get session details
       cursor.execute('''
@@ -217,10 +216,23 @@ def load(app):
       per_page = request.args.get('per_page', 10, type=int)
       offset = (page - 1) * per_page
 
+      # Get total count of words
+      cursor.execute('''
+        SELECT COUNT(DISTINCT w.id) as count
+        FROM words w
+        JOIN word_review_items wri ON wri.word_id = w.id
+        WHERE wri.study_session_id = ?
+      ''', (id,))
+      
+      total_count = cursor.fetchone()['count']
+
       # Get the words reviewed in this session with their review status
       cursor.execute('''
         SELECT 
-          w.*,
+          w.id,
+          w.kanji,
+          w.romaji,
+          w.english,
           COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0) as session_correct_count,
           COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END), 0) as session_wrong_count
         FROM words w
@@ -230,21 +242,9 @@ def load(app):
         ORDER BY w.kanji
         LIMIT ? OFFSET ?
       ''', (id, per_page, offset))
-      
-      words = cursor.fetchall()
 
-      # Get total count of words
-      cursor.execute('''
-        SELECT COUNT(DISTINCT w.id) as count
-        FROM words w
-        JOIN word_review_items wri ON wri.word_id = w.id
-        WHERE wri.study_session_id = ?
-      ''', (id,))
-      
-      total_count = cursor.fetchone()['count']
-
-      return jsonify({
-        'session': {
+      return stream_json(cursor, SESSION_WORD_FIELDS, 'words',
+        session={
           'id': session['id'],
           'group_id': session['group_id'],
           'group_name': session['group_name'],
@@ -254,24 +254,15 @@ def load(app):
           'end_time': session['created_at'],  # For now, just use the same time
           'review_items_count': session['review_items_count']
         },
-        'words': [{
-          'id': word['id'],
-          'kanji': word['kanji'],
-          'romaji': word['romaji'],
-          'english': word['english'],
-          'correct_count': word['session_correct_count'],
-          'wrong_count': word['session_wrong_count']
-        } for word in words],
-        'total': total_count,
-        'page': page,
-        'per_page': per_page,
-        'total_pages': math.ceil(total_count / per_page)
-      })
+        total=total_count,
+        page=page,
+        per_page=per_page,
+        total_pages=math.ceil(total_count / per_page)
+      )
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study-sessions/<id>/review', methods=['POST'])
-  @cross_origin()
   def submit_study_session_review(id):
     try:
         # Validate JSON
@@ -368,17 +359,12 @@ def load(app):
                 AND word_id = ?
             ''', (1 if review['is_correct'] else 0, id, review['word_id']))
 
-            # Update the word's overall stats
+            # Record the answer; the review_events trigger updates the word's
+            # overall stats, as for answers sent to /review-events
             cursor.execute('''
-                UPDATE words
-                SET correct_count = correct_count + ?,
-                    wrong_count = wrong_count + ?
-                WHERE id = ?
-            ''', (
-                1 if review['is_correct'] else 0,
-                0 if review['is_correct'] else 1,
-                review['word_id']
-            ))
+                INSERT INTO review_events (study_session_id, word_id, correct, created_at)
+                VALUES (?, ?, ?, datetime('now'))
+            ''', (id, review['word_id'], 1 if review['is_correct'] else 0))
 
         # Update study session completion time
         cursor.execute('''
@@ -400,6 +386,8 @@ def load(app):
 
         stats = cursor.fetchone()
 
+        daily_activity.refresh_sessions(cursor, [id])
+
         app.db.commit()
 
         return jsonify({
@@ -417,18 +405,18 @@ def load(app):
         return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study-sessions/reset', methods=['POST'])
-  @cross_origin()
   def reset_study_sessions():
     try:
       cursor = app.db.cursor()
       
-      # First delete all word review items since they have foreign key constraints
-      cursor.execute('DELETE FROM word_review_items')
-      
-      # Then delete all study sessions
-      cursor.execute('DELETE FROM study_sessions')
+      # Swap in empty history tables (and the rollups derived from them)
+      # rather than deleting row by row
+      archive.reset_study_history(app.db, cursor)
       
       app.db.commit()
+      # Drill weights and recommendations were built from the old history
+      app.kana_drills.discard(app.db.path())
+      app.recommendations.discard(app.db.path())
       
       return jsonify({"message": "Study history cleared successfully"}), 200
     except Exception as e:
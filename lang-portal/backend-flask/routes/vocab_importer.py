@@ -1,12 +1,18 @@
 from flask import Blueprint, request, jsonify
-from flask_cors import cross_origin
-import requests
+from functools import cache
 import json
 import os
 
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_API_KEY = os.getenv('GROQ_API_KEY')  # Add to .env file
+
+@cache
+def groq_api_key():
+    # Read on first use rather than at import, so .env (and python-dotenv)
+    # only cost startup time once a word list is actually requested
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv('GROQ_API_KEY')  # Add to .env file
 
 def generate_llm_prompt(word_category):
     return {
@@ -35,20 +41,23 @@ def generate_llm_prompt(word_category):
 
 def load(app):
   @app.route('/get_new_words', methods=['POST'])
-  @cross_origin()
+  @app.limits.limit('get_new_words')
   def get_new_words():
       word_category = request.json.get('word_category')
       if not word_category:
           return jsonify({"error": "Word category is required"}), 400
       
       try:
+          import requests
           response = requests.post(
               GROQ_API_URL,
               headers={
-                  "Authorization": f"Bearer {GROQ_API_KEY}",
+                  "Authorization": f"Bearer {groq_api_key()}",
                   "Content-Type": "application/json"
               },
-              json=generate_llm_prompt(word_category)
+              json=generate_llm_prompt(word_category),
+              # A hung upstream would otherwise hold a limiter slot forever
+              timeout=app.config['GET_NEW_WORDS_TIMEOUT']
           )
           response.raise_for_status()
           
@@ -62,7 +71,6 @@ def load(app):
           return jsonify({"error": str(e)}), 500
 
   @app.route('/import_words', methods=['POST'])
-  @cross_origin()
   def import_words():
       words = request.json.get('words')
       if not words:
@@ -1,14 +1,23 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
 import json
+from lib.rows import Projection, stream_json
+
+WORD_FIELDS = Projection('id', 'kanji', 'romaji', 'english', 'correct_count', 'wrong_count', 'accuracy', 'last_reviewed', 'difficulty')
+
+# Sort keys read from word_stats, each with its own index
+STATS_COLUMNS = ['correct_count', 'wrong_count', 'accuracy', 'last_reviewed']
+
+# Parts starting with hiragana or katakana (okurigana like the る of 帰る) are
+# shared by too many words to relate them
+KANA_FIRST, KANA_LAST = 0x3040, 0x30FF
+RELATED_LIMIT = 100
 
 def load(app):
   # Endpoint: GET /words with pagination (50 words per page)
   @app.route('/words', methods=['GET'])
-  @cross_origin()
   def get_words():
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
 
       # Get the current page number from query parameters (default is 1)
       page = int(request.args.get('page', 1))
@@ -22,69 +31,61 @@ def load(app):
       order = request.args.get('order', 'asc')  # Default to ascending order
 
       # Validate sort_by and order
-      valid_columns = ['kanji', 'romaji', 'english', 'correct_count', 'wrong_count']
+      valid_columns = ['kanji', 'romaji', 'english', 'difficulty'] + STATS_COLUMNS
       if sort_by not in valid_columns:
         sort_by = 'kanji'
       if order not in ['asc', 'desc']:
         order = 'asc'
 
-      # Query to fetch words with sorting
-      cursor.execute(f'''
-        SELECT w.id, w.kanji, w.romaji, w.english, 
-            COALESCE(r.correct_count, 0) AS correct_count,
-            COALESCE(r.wrong_count, 0) AS wrong_count
-        FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (words_per_page, offset))
-
-      words = cursor.fetchall()
+      # difficulty is precomputed by `invoke score-words`; words added since
+      # the last run have no score yet and are listed after the scored ones
+      order_by = f'{sort_by} {order}'
+      if sort_by == 'difficulty':
+        order_by = f's.difficulty IS NULL, s.difficulty {order}, w.id'
+      elif sort_by in STATS_COLUMNS:
+        # Walks the word_stats index in order instead of sorting every word
+        order_by = f'ws.{sort_by} {order}, ws.word_id {order}'
 
       # Query the total number of words
       cursor.execute('SELECT COUNT(*) FROM words')
       total_words = cursor.fetchone()[0]
       total_pages = (total_words + words_per_page - 1) // words_per_page
 
-      # Format the response
-      words_data = []
-      for word in words:
-        words_data.append({
-          "id": word["id"],
-          "kanji": word["kanji"],
-          "romaji": word["romaji"],
-          "english": word["english"],
-          "correct_count": word["correct_count"],
-          "wrong_count": word["wrong_count"]
-        })
+      # Query to fetch words with sorting
+      cursor.execute(f'''
+        SELECT w.id, w.kanji, w.romaji, w.english,
+            ws.correct_count, ws.wrong_count, ws.accuracy, ws.last_reviewed,
+            s.difficulty
+        FROM words w
+        JOIN word_stats ws ON w.id = ws.word_id
+        LEFT JOIN word_scores s ON w.id = s.word_id
+        ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+      ''', (words_per_page, offset))
 
-      return jsonify({
-        "words": words_data,
-        "total_pages": total_pages,
-        "current_page": page,
-        "total_words": total_words
-      })
+      # Stream the rows straight into the response
+      return stream_json(cursor, WORD_FIELDS, 'words',
+        total_pages=total_pages,
+        current_page=page,
+        total_words=total_words
+      )
 
     except Exception as e:
       return jsonify({"error": str(e)}), 500
-    finally:
-      app.db.close()
 
   # Endpoint: GET /words/:id to get a single word with its details
   @app.route('/words/<int:word_id>', methods=['GET'])
-  @cross_origin()
   def get_word(word_id):
     try:
-      cursor = app.db.cursor()
+      cursor = app.db.read_cursor()
       
       # Query to fetch the word and its details
       cursor.execute('''
         SELECT w.id, w.kanji, w.romaji, w.english,
-               COALESCE(r.correct_count, 0) AS correct_count,
-               COALESCE(r.wrong_count, 0) AS wrong_count,
+               ws.correct_count, ws.wrong_count,
                GROUP_CONCAT(DISTINCT g.id || '::' || g.name) as groups
         FROM words w
-        LEFT JOIN word_reviews r ON w.id = r.word_id
+        JOIN word_stats ws ON w.id = ws.word_id
         LEFT JOIN word_groups wg ON w.id = wg.word_id
         LEFT JOIN groups g ON wg.group_id = g.id
         WHERE w.id = ?
@@ -119,4 +120,131 @@ def load(app):
       })
       
     except Exception as e:
-      return jsonify({"error": str(e)}), 500
\ No newline at end of file
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /words/:id/related?limit=20 for words sharing kanji with
+  # this one, most shared kanji first, via the word_parts index
+  @app.route('/words/<int:word_id>/related', methods=['GET'])
+  def get_related_words(word_id):
+    try:
+      try:
+        limit = int(request.args.get('limit', 20))
+      except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+      limit = max(1, min(limit, RELATED_LIMIT))
+
+      cursor = app.db.read_cursor()
+
+      cursor.execute('''
+        SELECT kanji FROM word_parts
+        WHERE word_id = ? AND unicode(kanji) NOT BETWEEN ? AND ?
+        ORDER BY position
+      ''', (word_id, KANA_FIRST, KANA_LAST))
+      components = list(dict.fromkeys(row['kanji'] for row in cursor.fetchall()))
+      if not components:
+        cursor.execute('SELECT 1 FROM words WHERE id = ?', (word_id,))
+        if not cursor.fetchone():
+          return jsonify({"error": "Word not found"}), 404
+        return jsonify({"components": [], "related": []})
+
+      cursor.execute('''
+        SELECT w.id, w.kanji, w.romaji, w.english,
+               GROUP_CONCAT(DISTINCT p.kanji) AS shared,
+               COUNT(DISTINCT p.kanji) AS shared_count
+        FROM word_parts p
+        JOIN words w ON w.id = p.word_id
+        WHERE p.kanji IN (SELECT value FROM json_each(?))
+          AND p.word_id != ?
+        GROUP BY w.id
+        ORDER BY shared_count DESC, w.id
+        LIMIT ?
+      ''', (json.dumps(components), word_id, limit))
+
+      return jsonify({
+        "components": components,
+        "related": [{
+          "id": word["id"],
+          "kanji": word["kanji"],
+          "romaji": word["romaji"],
+          "english": word["english"],
+          "shared": word["shared"].split(',')
+        } for word in cursor.fetchall()]
+      })
+
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
+
+  # Endpoint: GET /words/batch?ids=1,2,3 (or POST /words/batch with {"ids": [...]}
+  # for long lists) to fetch many words with their details in two queries
+  @app.route('/words/batch', methods=['GET', 'POST'])
+  def get_words_batch():
+    try:
+      if request.method == 'POST':
+        if not request.is_json:
+          return jsonify({"error": "Request must be JSON"}), 400
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+          return jsonify({"error": "Request body must be a JSON object"}), 400
+        word_ids = data.get('ids')
+        # bool is a subclass of int, but true/false are not ids
+        if not isinstance(word_ids, list) or not all(isinstance(x, int) and not isinstance(x, bool) for x in word_ids):
+          return jsonify({"error": "ids must be an array of integers"}), 400
+      else:
+        try:
+          word_ids = [int(x) for x in request.args.get('ids', '').split(',') if x.strip()]
+        except ValueError:
+          return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+
+      if len(word_ids) == 0:
+        return jsonify({"error": "ids cannot be empty"}), 400
+      limit = app.config['WORDS_BATCH_LIMIT']
+      if len(word_ids) > limit:
+        return jsonify({"error": f"At most {limit} ids per request"}), 400
+
+      # Keep the caller's order, drop duplicates
+      word_ids = list(dict.fromkeys(word_ids))
+      # Passed as one JSON parameter so long lists don't hit SQLite's
+      # bound-variable limit
+      ids_json = json.dumps(word_ids)
+
+      cursor = app.db.read_cursor()
+
+      cursor.execute('''
+        SELECT w.id, w.kanji, w.romaji, w.english,
+               ws.correct_count, ws.wrong_count
+        FROM words w
+        JOIN word_stats ws ON w.id = ws.word_id
+        WHERE w.id IN (SELECT value FROM json_each(?))
+      ''', (ids_json,))
+      words = {}
+      for word in cursor.fetchall():
+        words[word["id"]] = {
+          "id": word["id"],
+          "kanji": word["kanji"],
+          "romaji": word["romaji"],
+          "english": word["english"],
+          "correct_count": word["correct_count"],
+          "wrong_count": word["wrong_count"],
+          "groups": []
+        }
+
+      cursor.execute('''
+        SELECT wg.word_id, g.id, g.name
+        FROM word_groups wg
+        JOIN groups g ON wg.group_id = g.id
+        WHERE wg.word_id IN (SELECT value FROM json_each(?))
+        ORDER BY g.id
+      ''', (ids_json,))
+      for group in cursor.fetchall():
+        words[group["word_id"]]["groups"].append({
+          "id": group["id"],
+          "name": group["name"]
+        })
+
+      return jsonify({
+        "words": [words[word_id] for word_id in word_ids if word_id in words],
+        "missing": [word_id for word_id in word_ids if word_id not in words]
+      })
+
+    except Exception as e:
+      return jsonify({"error": str(e)}), 500
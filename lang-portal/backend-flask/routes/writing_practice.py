@@ -1,26 +1,310 @@
 from flask import request, jsonify
-from flask_cors import cross_origin
 import random
-from manga_ocr import MangaOcr
 import base64
+import binascii
 import io
-from PIL import Image
-import numpy as np
-from kana_dictionary import ROMAJI_TO_HIRAGANA, ROMAJI_TO_KATAKANA
+import logging
+import threading
+from kana_dictionary import ROMAJI_TO_HIRAGANA, ROMAJI_TO_KATAKANA, ALL_HIRAGANA_LIST, ALL_KATAKANA_LIST
 
-# Initialize manga_ocr outside the routes for efficiency
-mocr = MangaOcr()
+KANA_CANDIDATES = {'hiragana': ALL_HIRAGANA_LIST, 'katakana': ALL_KATAKANA_LIST}
+
+# manga_ocr pulls in torch and loads its model, which takes seconds; it is
+# created once, on the first verify request (or in the background at startup
+# with WRITING_PRACTICE_PRELOAD_OCR), so the rest of the app starts fast
+mocr = None
+mocr_lock = threading.Lock()
+
+def get_ocr():
+    global mocr
+    if mocr is None:
+        with mocr_lock:
+            if mocr is None:
+                from manga_ocr import MangaOcr
+                mocr = MangaOcr()
+    return mocr
+
+def preload_ocr():
+    try:
+        get_ocr()
+    except Exception as e:
+        logging.error(f"Error preloading manga_ocr: {str(e)}", exc_info=True)
+
+# The local classifier (lib/kana_classifier.py) answers clean drawings in a
+# fraction of a millisecond. Loaded once per KANA_CLASSIFIER_PATH; None when
+# no model has been trained, and everything then goes to manga_ocr.
+classifiers = {}
+classifier_lock = threading.Lock()
+
+def get_classifier(app):
+    path = app.config['KANA_CLASSIFIER_PATH']
+    if path not in classifiers:
+        with classifier_lock:
+            if path not in classifiers:
+                import os
+                from lib.kana_classifier import KanaClassifier
+                if path and os.path.exists(path):
+                    classifiers[path] = KanaClassifier.load(
+                        path,
+                        min_similarity=app.config['KANA_CLASSIFIER_MIN_SIMILARITY'],
+                        min_margin=app.config['KANA_CLASSIFIER_MIN_MARGIN']
+                    )
+                else:
+                    logging.info(f"No kana classifier at {path}, using manga_ocr only")
+                    classifiers[path] = None
+    return classifiers[path]
+
+class ImageTooLarge(ValueError):
+    pass
+
+def open_image(source, max_pixels):
+    """Decode an encoded image (bytes stream) into a grayscale NumPy array
+
+    Raises ValueError for unreadable images and for images over
+    max_pixels, checked from the header before any pixel data is
+    decompressed.
+    """
+    from PIL import Image
+    import numpy as np
+    try:
+        image = Image.open(source)
+        if image.width * image.height > max_pixels:
+            raise ImageTooLarge(f'Image must be at most {max_pixels} pixels')
+        return np.array(image.convert('L'))
+    except (OSError, Image.DecompressionBombError) as e:
+        # PIL's UnidentifiedImageError and truncated data are OSErrors
+        raise ValueError(f'Could not read image: {type(e).__name__}')
+
+def decode_image(data_url, max_pixels):
+    """Decode a base64 data: URL into a grayscale NumPy array
+
+    Raises ValueError for malformed URLs and images, see open_image.
+    """
+    if not isinstance(data_url, str) or ',' not in data_url:
+        raise ValueError('image must be a data: URL')
+    try:
+        image_bytes = base64.b64decode(data_url.split(',', 1)[1])
+    except binascii.Error:
+        raise ValueError('image is not valid base64')
+    return open_image(io.BytesIO(image_bytes), max_pixels)
+
+# Fields every verify-kana request carries, whatever the image format
+VERIFY_FIELDS = ['expectedKana', 'expectedRomaji', 'kanaType']
+
+def check_fields(data):
+    """Raise ValueError unless the kana fields are strings"""
+    for field in ['expectedKana', 'kanaType']:
+        if not isinstance(data[field], str):
+            raise ValueError(f'{field} must be a string')
+
+def read_raw_bitmap(stream, width, height):
+    """Read width*height 8-bit grayscale pixels straight from the request
+    stream into a NumPy array, without an intermediate bytes copy"""
+    import numpy as np
+    image_array = np.empty((height, width), dtype=np.uint8)
+    buffer = memoryview(image_array).cast('B')
+    filled = 0
+    while filled < len(buffer):
+        count = stream.readinto(buffer[filled:])
+        if not count:
+            raise ValueError(f'Expected {len(buffer)} bytes of bitmap, got {filled}')
+        filled += count
+    if stream.read(1):
+        raise ValueError(f'Bitmap is larger than {width}x{height}')
+    return image_array
+
+def read_drawing(max_pixels):
+    """Return (image_array, fields) from a verify-kana request
+
+    Accepted bodies:
+    - application/json: {"image": "data:image/png;base64,...", fields...}
+    - multipart/form-data: an "image" file plus the fields as form values
+    - image/png (or any image/*): the encoded image as the raw body
+    - application/octet-stream: 8-bit grayscale pixels, row by row, sized
+      by the X-Image-Width / X-Image-Height headers
+    The last two take the fields from the query string. Raises ValueError
+    for anything malformed.
+    """
+    mimetype = request.mimetype
+    if mimetype == 'application/json':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not all(k in data for k in ['image'] + VERIFY_FIELDS):
+            raise ValueError('Missing required fields')
+        check_fields(data)
+        return decode_image(data['image'], max_pixels), data
+
+    if mimetype == 'multipart/form-data':
+        fields = request.form
+        upload = request.files.get('image')
+        if upload is None:
+            raise ValueError('Missing image file')
+        source = upload.stream
+    elif mimetype.startswith('image/'):
+        fields = request.args
+        source = request.stream
+    elif mimetype == 'application/octet-stream':
+        fields = request.args
+        try:
+            width = int(request.headers['X-Image-Width'])
+            height = int(request.headers['X-Image-Height'])
+        except (KeyError, ValueError):
+            raise ValueError('Raw bitmaps need integer X-Image-Width and X-Image-Height headers')
+        if width <= 0 or height <= 0 or width * height > max_pixels:
+            raise ValueError(f'Bitmap must be at most {max_pixels} pixels')
+        source = None
+    else:
+        raise ValueError(f'Unsupported content type: {mimetype}')
+
+    if not all(k in fields for k in VERIFY_FIELDS):
+        raise ValueError('Missing required fields')
+    if source is None:
+        return read_raw_bitmap(request.stream, width, height), fields
+    return open_image(source, max_pixels), fields
+
+def prepare_for_ocr(image_array):
+    """Crop the strokes into a padded, high-contrast 200x200 square for manga-ocr
+
+    Returns the PIL image and the bounding box that was cropped.
+    """
+    from PIL import Image, ImageEnhance
+    import numpy as np
+    from lib.kana_classifier import INK_THRESHOLD
+
+    # Find the bounding box with more aggressive thresholding
+    rows = np.any(image_array < INK_THRESHOLD, axis=1)
+    cols = np.any(image_array < INK_THRESHOLD, axis=0)
+    ymin, ymax = np.where(rows)[0][[0, -1]]
+    xmin, xmax = np.where(cols)[0][[0, -1]]
+    
+    # Calculate center and make a square crop
+    center_y = (ymin + ymax) // 2
+    center_x = (xmin + xmax) // 2
+    size = max(ymax - ymin, xmax - xmin)
+    padding = size // 2  # Add 50% padding
+    
+    # Ensure square crop with padding
+    crop_size = size + 2 * padding
+    ymin = max(0, center_y - crop_size // 2)
+    ymax = min(image_array.shape[0], center_y + crop_size // 2)
+    xmin = max(0, center_x - crop_size // 2)
+    xmax = min(image_array.shape[1], center_x + crop_size // 2)
+    
+    # Crop and create square image
+    cropped_array = image_array[ymin:ymax, xmin:xmax]
+    
+    # Create white background square image
+    square_size = max(cropped_array.shape)
+    square_array = np.full((square_size, square_size), 255, dtype=np.uint8)
+    
+    # Center the cropped image in the square
+    y_offset = (square_size - cropped_array.shape[0]) // 2
+    x_offset = (square_size - cropped_array.shape[1]) // 2
+    square_array[
+        y_offset:y_offset + cropped_array.shape[0],
+        x_offset:x_offset + cropped_array.shape[1]
+    ] = cropped_array
+
+    # Convert to PIL and resize
+    processed_image = Image.fromarray(square_array)
+    processed_image = processed_image.resize((200, 200), Image.Resampling.LANCZOS)
+
+    # Enhance contrast
+    enhancer = ImageEnhance.Contrast(processed_image)
+    processed_image = enhancer.enhance(2.5)  # Increased contrast
+
+    return processed_image, {
+        'xmin': int(xmin),
+        'xmax': int(xmax),
+        'ymin': int(ymin),
+        'ymax': int(ymax)
+    }
+
+def first_kana(text):
+    """Post-process OCR output: drop punctuation/symbols, keep the first character"""
+    import unicodedata
+    text = ''.join(char for char in text if unicodedata.category(char).startswith('Lo'))
+    return text[:1]
+
+def recognize_batch(images):
+    """Run manga-ocr over several prepared images with one generate() call
+
+    Falls back to one call per image if this manga-ocr version doesn't expose
+    the model internals used for batching.
+    """
+    ocr = get_ocr()
+    model = getattr(ocr, 'model', None)
+    tokenizer = getattr(ocr, 'tokenizer', None)
+    preprocess = getattr(ocr, '_preprocess', None)
+    if model is None or tokenizer is None or preprocess is None:
+        return [ocr(image) for image in images]
+
+    import torch
+    from manga_ocr.ocr import post_process
+    pixel_values = torch.stack([preprocess(image.convert('L').convert('RGB')) for image in images])
+    with torch.no_grad():
+        # A single kana needs a handful of tokens, not manga-ocr's default 300
+        outputs = model.generate(pixel_values.to(model.device), max_length=16)
+    return [post_process(tokenizer.decode(output, skip_special_tokens=True)) for output in outputs.cpu()]
+
+# Inverted once here since we want kana->romaji mapping
+KANA_TO_ROMAJI = {
+    'hiragana': {v: k for k, v in ROMAJI_TO_HIRAGANA.items()},
+    'katakana': {v: k for k, v in ROMAJI_TO_KATAKANA.items()}
+}
+ROMAJI_TO_KANA = {'hiragana': ROMAJI_TO_HIRAGANA, 'katakana': ROMAJI_TO_KATAKANA}
 
 def get_kana_dict(kana_type):
     """Helper function to get the appropriate kana dictionary"""
-    # Invert the dictionaries since we want kana->romaji mapping
     if kana_type == 'hiragana':
-        return {v: k for k, v in ROMAJI_TO_HIRAGANA.items()}
-    return {v: k for k, v in ROMAJI_TO_KATAKANA.items()}
+        return KANA_TO_ROMAJI['hiragana']
+    return KANA_TO_ROMAJI['katakana']
+
+def record_results(app, results):
+    """Persist (kana, kana_type, correct) answers to kana_stats for drills
+
+    Never fails the request: grading matters more than the statistics.
+    """
+    from lib import kana_drill
+    results = [(kana, kana_type, correct) for kana, kana_type, correct in results
+               if kana_type in KANA_TO_ROMAJI and kana in KANA_TO_ROMAJI[kana_type]]
+    if not results:
+        return
+    try:
+        cursor = app.db.cursor()
+        kana_drill.record(cursor, results)
+        app.db.commit()
+        app.kana_drills.record(app.db.path(), results)
+    except Exception as e:
+        logging.warning(f"Could not record kana results: {str(e)}")
+
+# Opt-in capture of drawings for offline evaluation (see lib/kana_dataset.py),
+# one writer per KANA_DATASET_PATH
+datasets = {}
+dataset_lock = threading.Lock()
+
+def capture_drawings(app, drawings):
+    """Append (image_array, expected, kana_type, recognized, engine) drawings
+    to the KANA_DATASET_PATH dataset when it is set
+
+    Never fails the request, like record_results.
+    """
+    path = app.config['KANA_DATASET_PATH']
+    if not path:
+        return
+    try:
+        with dataset_lock:
+            if path not in datasets:
+                from lib.kana_dataset import DatasetWriter
+                datasets[path] = DatasetWriter(path)
+        datasets[path].capture(drawings)
+    except Exception as e:
+        logging.warning(f"Could not capture kana drawings: {str(e)}")
 
 def load(app):
+    if app.config.get('WRITING_PRACTICE_PRELOAD_OCR'):
+        threading.Thread(target=preload_ocr, name='ocr-preload', daemon=True).start()
+
     @app.route('/writing-practice/random-kana', methods=['GET'])
-    @cross_origin()
     def get_random_kana():
         """Get a random kana-romaji pair based on the specified type"""
         try:
@@ -48,101 +332,109 @@ def load(app):
             print(f"Error in get_random_kana: {str(e)}")  # Debug log
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/writing-practice/drill', methods=['GET'])
+    def get_kana_drill():
+        """Get n kana to practice, weighted towards the ones most often wrong"""
+        try:
+            from lib.kana_drill import KanaWeights
+
+            kana_type = request.args.get('type', 'hiragana').lower()
+            if kana_type not in KANA_CANDIDATES:
+                return jsonify({'error': 'Invalid kana type'}), 400
+            try:
+                n = int(request.args.get('n', 10))
+            except ValueError:
+                return jsonify({'error': 'n must be an integer'}), 400
+            limit = app.config['WRITING_PRACTICE_DRILL_LIMIT']
+            if n < 1 or n > limit:
+                return jsonify({'error': f'n must be between 1 and {limit}'}), 400
+
+            weights = app.kana_drills.get(
+                (app.db.path(), kana_type),
+                lambda: KanaWeights.load(app.db.read_cursor(), kana_type, KANA_CANDIDATES[kana_type])
+            )
+            romaji = KANA_TO_ROMAJI[kana_type]
+            return jsonify({
+                'type': kana_type,
+                'kana': [{'kana': kana, 'romaji': romaji[kana]} for kana in weights.draw(n)]
+            })
+        except Exception as e:
+            logging.error(f"Error building kana drill: {str(e)}", exc_info=True)
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/writing-practice/verify-kana', methods=['POST'])
-    @cross_origin()
+    @app.limits.limit('verify_kana')
     def verify_kana():
-        """Verify the drawn kana using manga-ocr"""
+        """Verify the drawn kana using manga-ocr
+
+        Takes the drawing as JSON with a data: URL, as a multipart or raw
+        image/png upload, or as a raw grayscale bitmap (see read_drawing)
+        """
         try:
-            data = request.json
-            if not all(k in data for k in ['image', 'expectedKana', 'expectedRomaji', 'kanaType']):
-                return jsonify({'error': 'Missing required fields'}), 400
+            try:
+                image_array, data = read_drawing(app.config['WRITING_PRACTICE_MAX_PIXELS'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
 
-            # Convert base64 image to PIL Image
-            image_data = data['image'].split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to grayscale
-            image = image.convert('L')
-            image_array = np.array(image)
-
-            # Find the bounding box with more aggressive thresholding
-            threshold = 200  # More aggressive threshold for better isolation
-            rows = np.any(image_array < threshold, axis=1)
-            cols = np.any(image_array < threshold, axis=0)
-            ymin, ymax = np.where(rows)[0][[0, -1]]
-            xmin, xmax = np.where(cols)[0][[0, -1]]
-            
-            # Calculate center and make a square crop
-            center_y = (ymin + ymax) // 2
-            center_x = (xmin + xmax) // 2
-            size = max(ymax - ymin, xmax - xmin)
-            padding = size // 2  # Add 50% padding
-            
-            # Ensure square crop with padding
-            crop_size = size + 2 * padding
-            ymin = max(0, center_y - crop_size // 2)
-            ymax = min(image_array.shape[0], center_y + crop_size // 2)
-            xmin = max(0, center_x - crop_size // 2)
-            xmax = min(image_array.shape[1], center_x + crop_size // 2)
-            
-            # Crop and create square image
-            cropped_array = image_array[ymin:ymax, xmin:xmax]
-            
-            # Create white background square image
-            square_size = max(cropped_array.shape)
-            square_array = np.full((square_size, square_size), 255, dtype=np.uint8)
-            
-            # Center the cropped image in the square
-            y_offset = (square_size - cropped_array.shape[0]) // 2
-            x_offset = (square_size - cropped_array.shape[1]) // 2
-            square_array[
-                y_offset:y_offset + cropped_array.shape[0],
-                x_offset:x_offset + cropped_array.shape[1]
-            ] = cropped_array
-
-            # Convert to PIL and resize
-            processed_image = Image.fromarray(square_array)
-            processed_image = processed_image.resize((200, 200), Image.Resampling.LANCZOS)
-
-            # Enhance contrast
-            from PIL import ImageEnhance
-            enhancer = ImageEnhance.Contrast(processed_image)
-            processed_image = enhancer.enhance(2.5)  # Increased contrast
+            # Confident matches from the local classifier skip manga_ocr
+            local = get_classifier(app)
+            if local is not None:
+                from lib.kana_classifier import normalize
+                vector = normalize(image_array)
+                if vector is not None:
+                    label, similarity, margin, confident = local.classify(
+                        vector, candidates=KANA_CANDIDATES.get(data['kanaType'].lower()))
+                    if confident:
+                        record_results(app, [(data['expectedKana'], data['kanaType'].lower(), label == data['expectedKana'])])
+                        capture_drawings(app, [(image_array, data['expectedKana'], data['kanaType'].lower(), label, 'classifier')])
+                        return jsonify({
+                            'success': label == data['expectedKana'],
+                            'recognized': label,
+                            'debug_info': {
+                                'engine': 'classifier',
+                                'similarity': round(similarity, 3),
+                                'margin': round(margin, 3)
+                            }
+                        })
+
+            # Nothing to crop or recognize; graded wrong, as in the batch
+            from lib.kana_classifier import has_ink
+            if not has_ink(image_array):
+                record_results(app, [(data['expectedKana'], data['kanaType'].lower(), False)])
+                return jsonify({
+                    'success': False,
+                    'recognized': '',
+                    'message': 'Nothing was drawn',
+                    'debug_info': {'engine': 'none'}
+                })
+
+            processed_image, bounding_box = prepare_for_ocr(image_array)
 
             # Debug: Save processed image
             processed_image.save('debug_image.png')
             print("Saved debug image to debug_image.png")
 
             # Use manga-ocr to recognize the character
-            recognized_text = mocr(processed_image)
+            recognized_text = get_ocr()(processed_image)
             print("Raw recognized text:", recognized_text)
 
-            # Post-process the recognized text:
-            # 1. Take only the first character if multiple are detected
-            # 2. Remove any punctuation or special characters
-            import unicodedata
-            recognized_text = ''.join(char for char in recognized_text if unicodedata.category(char).startswith('Lo'))
-            if len(recognized_text) > 0:
-                recognized_text = recognized_text[0]  # Take only the first character
+            recognized_text = first_kana(recognized_text)
             
             print("Processed recognized text:", recognized_text)
             print("Expected kana:", data['expectedKana'])
             
             # Compare with expected kana
             success = recognized_text == data['expectedKana']
+            record_results(app, [(data['expectedKana'], data['kanaType'].lower(), success)])
+            capture_drawings(app, [(image_array, data['expectedKana'], data['kanaType'].lower(), recognized_text, 'manga_ocr')])
 
             return jsonify({
                 'success': success,
                 'recognized': recognized_text,
                 'debug_info': {
+                    'engine': 'manga_ocr',
                     'image_size': processed_image.size,
-                    'bounding_box': {
-                        'xmin': int(xmin),
-                        'xmax': int(xmax),
-                        'ymin': int(ymin),
-                        'ymax': int(ymax)
-                    }
+                    'bounding_box': bounding_box
                 }
             })
 
@@ -152,8 +444,103 @@ def load(app):
             traceback.print_exc()
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/writing-practice/verify-kana/batch', methods=['POST'])
+    @app.limits.limit('verify_kana')
+    def verify_kana_batch():
+        """Verify a whole drill of drawn kana in one request
+
+        Body: {"items": [{"image", "expectedKana", "kanaType"}, ...]}. All
+        drawings are decoded and normalized in one pass, the local classifier
+        scores them in one matrix product, and whatever it is unsure about
+        goes to manga-ocr in a single batched generate() call.
+        """
+        try:
+            data = request.get_json(silent=True)
+            if not data or not isinstance(data.get('items'), list):
+                return jsonify({'error': 'Missing items array'}), 400
+            items = data['items']
+            if len(items) == 0:
+                return jsonify({'error': 'items cannot be empty'}), 400
+            limit = app.config['WRITING_PRACTICE_BATCH_LIMIT']
+            if len(items) > limit:
+                return jsonify({'error': f'At most {limit} items per batch'}), 400
+
+            results = [None] * len(items)
+            images = {}
+            for index, item in enumerate(items):
+                if not isinstance(item, dict) or not all(k in item for k in ['image', 'expectedKana', 'kanaType']):
+                    results[index] = {'index': index, 'error': 'Missing required fields'}
+                    continue
+                try:
+                    check_fields(item)
+                except ValueError as e:
+                    results[index] = {'index': index, 'error': str(e)}
+                    continue
+                try:
+                    images[index] = decode_image(item['image'], app.config['WRITING_PRACTICE_MAX_PIXELS'])
+                except ImageTooLarge as e:
+                    # Refused outright, like oversized single drawings
+                    return jsonify({'error': f'Item {index}: {str(e)}'}), 400
+                except Exception as e:
+                    results[index] = {'index': index, 'error': f'Invalid image: {str(e)}'}
+
+            def answer(index, recognized, engine):
+                results[index] = {
+                    'index': index,
+                    'success': recognized == items[index]['expectedKana'],
+                    'recognized': recognized,
+                    'engine': engine
+                }
+
+            # Local classifier, one batch per kana type
+            pending = list(images)
+            local = get_classifier(app)
+            if local is not None and pending:
+                from lib.kana_classifier import normalize
+                import numpy as np
+                vectors = {index: normalize(images[index]) for index in pending}
+                by_type = {}
+                for index, vector in vectors.items():
+                    if vector is not None:
+                        by_type.setdefault(items[index]['kanaType'].lower(), []).append(index)
+                for kana_type, indexes in by_type.items():
+                    batch = local.classify_batch(np.stack([vectors[i] for i in indexes]),
+                                                 candidates=KANA_CANDIDATES.get(kana_type))
+                    for index, (label, _, _, confident) in zip(indexes, batch):
+                        if confident:
+                            answer(index, label, 'classifier')
+                pending = [index for index in pending if results[index] is None]
+
+            # Everything else through manga-ocr in one call; blank drawings
+            # are simply wrong
+            from lib.kana_classifier import has_ink
+            prepared = []
+            for index in pending:
+                if not has_ink(images[index]):
+                    answer(index, '', 'none')
+                    continue
+                prepared.append((index, prepare_for_ocr(images[index])[0]))
+            if prepared:
+                texts = recognize_batch([image for _, image in prepared])
+                for (index, _), text in zip(prepared, texts):
+                    answer(index, first_kana(text), 'manga_ocr')
+
+            record_results(app, [(items[r['index']]['expectedKana'], items[r['index']]['kanaType'].lower(), r['success'])
+                                 for r in results if 'success' in r])
+            capture_drawings(app, [(images[r['index']], items[r['index']]['expectedKana'], items[r['index']]['kanaType'].lower(),
+                                    r['recognized'], r['engine']) for r in results if 'success' in r])
+
+            return jsonify({
+                'results': results,
+                'correct': sum(1 for result in results if result.get('success')),
+                'total': len(items)
+            })
+
+        except Exception as e:
+            logging.error(f"Error verifying kana batch: {str(e)}", exc_info=True)
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/writing-practice/verify-romaji', methods=['POST'])
-    @cross_origin()
     def verify_romaji():
         """Verify the romaji input for a given kana"""
         try:
@@ -163,9 +550,17 @@ def load(app):
 
             user_input = data['input'].lower()
             expected_romaji = data['expectedRomaji'].lower()
+            correct = user_input == expected_romaji
+
+            # The kana shown can be sent as "kana"; otherwise it is looked up
+            # from the expected romaji and kanaType (default hiragana)
+            kana_type = data.get('kanaType', 'hiragana').lower()
+            kana = data.get('kana') or ROMAJI_TO_KANA.get(kana_type, {}).get(expected_romaji)
+            if kana:
+                record_results(app, [(kana, kana_type, correct)])
 
             return jsonify({
-                'correct': user_input == expected_romaji
+                'correct': correct
             })
 
         except Exception as e:
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_review_events_study_session_id ON review_events (study_session_id, word_id);
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_id_created_at ON study_sessions (group_id, created_at);
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_reviews_word_id ON word_reviews (word_id);
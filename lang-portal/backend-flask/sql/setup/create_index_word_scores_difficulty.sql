@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_scores_difficulty ON word_scores (difficulty, word_id);
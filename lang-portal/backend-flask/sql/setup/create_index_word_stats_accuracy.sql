@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_stats_accuracy ON word_stats (accuracy);
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_stats_correct_count ON word_stats (correct_count);
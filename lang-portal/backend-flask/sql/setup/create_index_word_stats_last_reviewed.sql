@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_stats_last_reviewed ON word_stats (last_reviewed);
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS idx_word_stats_wrong_count ON word_stats (wrong_count);
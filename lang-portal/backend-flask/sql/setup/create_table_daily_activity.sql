@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS daily_activity (
+  day DATE NOT NULL,  -- YYYY-MM-DD the study sessions were started on
+  group_id INTEGER NOT NULL,
+  sessions INTEGER NOT NULL DEFAULT 0,  -- Rollup of study_sessions started that day
+  reviews INTEGER NOT NULL DEFAULT 0,  -- Rollup of their answered word_review_items
+  correct INTEGER NOT NULL DEFAULT 0,  -- ... of which answered correctly
+  archived_sessions INTEGER NOT NULL DEFAULT 0,  -- Part of sessions moved to the archive (see lib/archive.py)
+  archived_reviews INTEGER NOT NULL DEFAULT 0,  -- ... and of reviews
+  archived_correct INTEGER NOT NULL DEFAULT 0,  -- ... and of correct
+  PRIMARY KEY (day, group_id),
+  FOREIGN KEY (group_id) REFERENCES groups(id)
+) WITHOUT ROWID;
\ No newline at end of file
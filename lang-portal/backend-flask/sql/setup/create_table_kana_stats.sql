@@ -0,0 +1,7 @@
+CREATE TABLE IF NOT EXISTS kana_stats (
+  kana TEXT PRIMARY KEY,  -- A single hiragana or katakana character
+  kana_type TEXT NOT NULL,  -- "hiragana" or "katakana"
+  attempts INTEGER NOT NULL DEFAULT 0,  -- verify-kana / verify-romaji answers for this kana
+  errors INTEGER NOT NULL DEFAULT 0,  -- ... of which wrong
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP  -- Last answer recorded
+);
@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS review_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  study_session_id INTEGER NOT NULL,  -- Session the answer was given in
+  word_id INTEGER NOT NULL,
+  correct BOOLEAN NOT NULL,  -- Whether this individual answer was correct
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,  -- When the answer was given, not when it was written
+  FOREIGN KEY (word_id) REFERENCES words(id),
+  FOREIGN KEY (study_session_id) REFERENCES study_sessions(id)
+);
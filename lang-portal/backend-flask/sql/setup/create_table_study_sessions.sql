@@ -3,6 +3,8 @@ CREATE TABLE IF NOT EXISTS study_sessions (
   group_id INTEGER NOT NULL,  -- The group of words being studied
   study_activity_id INTEGER NOT NULL,  -- The activity performed
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,  -- Timestamp of the session
+  updated_at DATETIME,  -- When the review was submitted
+  completed BOOLEAN NOT NULL DEFAULT 0,  -- Set once the session's review is submitted
   FOREIGN KEY (group_id) REFERENCES groups(id),
   FOREIGN KEY (study_activity_id) REFERENCES study_activities(id)
 );
\ No newline at end of file
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS word_parts (
+  word_id INTEGER NOT NULL,
+  position INTEGER NOT NULL,  -- Index of the part in words.parts
+  kanji TEXT NOT NULL,  -- The part as written (a kanji, or kana such as okurigana)
+  romaji TEXT NOT NULL,  -- Its reading, syllables joined
+  PRIMARY KEY (word_id, position),
+  FOREIGN KEY (word_id) REFERENCES words(id)
+) WITHOUT ROWID;
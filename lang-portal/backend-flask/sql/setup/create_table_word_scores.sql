@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS word_scores (
+  word_id INTEGER PRIMARY KEY,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  success_rate REAL NOT NULL,  -- Bayesian-smoothed share of correct answers
+  difficulty REAL NOT NULL,  -- 1 - recency-weighted smoothed success rate
+  mastery REAL NOT NULL,  -- Smoothed success rate scaled by confidence in the attempt count
+  mastered BOOLEAN NOT NULL DEFAULT 0,  -- At least 5 attempts with >= 80% correct
+  scored_at DATETIME DEFAULT CURRENT_TIMESTAMP,  -- When the scoring job last ran
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
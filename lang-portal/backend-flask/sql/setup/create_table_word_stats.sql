@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS word_stats (
+  word_id INTEGER PRIMARY KEY,  -- One row per word, kept by triggers on words and word_reviews
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  wrong_count INTEGER NOT NULL DEFAULT 0,
+  accuracy REAL,  -- correct_count / (correct_count + wrong_count), NULL until reviewed
+  last_reviewed DATETIME,
+  FOREIGN KEY (word_id) REFERENCES words(id)
+);
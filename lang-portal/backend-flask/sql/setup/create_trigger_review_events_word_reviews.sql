@@ -0,0 +1,25 @@
+-- Every answer lands in review_events, so the per-word totals in word_reviews
+-- and word_stats are counted here, in the transaction that records the answer
+CREATE TRIGGER IF NOT EXISTS review_events_word_reviews
+AFTER INSERT ON review_events
+BEGIN
+  UPDATE word_reviews
+  SET correct_count = correct_count + (CASE WHEN NEW.correct THEN 1 ELSE 0 END),
+      wrong_count = wrong_count + (CASE WHEN NEW.correct THEN 0 ELSE 1 END),
+      last_reviewed = MAX(COALESCE(last_reviewed, ''), COALESCE(NEW.created_at, CURRENT_TIMESTAMP))
+  WHERE word_id = NEW.word_id;
+  INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  SELECT NEW.word_id,
+         CASE WHEN NEW.correct THEN 1 ELSE 0 END,
+         CASE WHEN NEW.correct THEN 0 ELSE 1 END,
+         COALESCE(NEW.created_at, CURRENT_TIMESTAMP)
+  WHERE NOT EXISTS (SELECT 1 FROM word_reviews WHERE word_id = NEW.word_id);
+  -- Every word has a word_stats row (see create_trigger_words_insert.sql);
+  -- SET expressions see the old values, hence the + 1 in accuracy
+  UPDATE word_stats
+  SET correct_count = correct_count + (CASE WHEN NEW.correct THEN 1 ELSE 0 END),
+      wrong_count = wrong_count + (CASE WHEN NEW.correct THEN 0 ELSE 1 END),
+      accuracy = (correct_count + (CASE WHEN NEW.correct THEN 1 ELSE 0 END)) * 1.0 / (correct_count + wrong_count + 1),
+      last_reviewed = MAX(COALESCE(last_reviewed, ''), COALESCE(NEW.created_at, CURRENT_TIMESTAMP))
+  WHERE word_id = NEW.word_id;
+END;
@@ -0,0 +1,5 @@
+CREATE TRIGGER IF NOT EXISTS word_groups_delete_words_count
+AFTER DELETE ON word_groups
+BEGIN
+  UPDATE groups SET words_count = words_count - 1 WHERE id = OLD.group_id;
+END;
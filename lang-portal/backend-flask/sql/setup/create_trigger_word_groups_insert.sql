@@ -0,0 +1,6 @@
+-- Keeps the groups.words_count counter cache in step with word_groups
+CREATE TRIGGER IF NOT EXISTS word_groups_insert_words_count
+AFTER INSERT ON word_groups
+BEGIN
+  UPDATE groups SET words_count = words_count + 1 WHERE id = NEW.group_id;
+END;
@@ -0,0 +1,7 @@
+CREATE TRIGGER IF NOT EXISTS word_groups_update_words_count
+AFTER UPDATE OF group_id ON word_groups
+WHEN NEW.group_id IS NOT OLD.group_id
+BEGIN
+  UPDATE groups SET words_count = words_count - 1 WHERE id = OLD.group_id;
+  UPDATE groups SET words_count = words_count + 1 WHERE id = NEW.group_id;
+END;
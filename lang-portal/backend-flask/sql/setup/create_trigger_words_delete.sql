@@ -0,0 +1,5 @@
+CREATE TRIGGER IF NOT EXISTS words_delete_word_stats
+AFTER DELETE ON words
+BEGIN
+  DELETE FROM word_stats WHERE word_id = OLD.id;
+END;
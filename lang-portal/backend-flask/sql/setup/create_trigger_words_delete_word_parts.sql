@@ -0,0 +1,5 @@
+CREATE TRIGGER IF NOT EXISTS words_delete_word_parts
+AFTER DELETE ON words
+BEGIN
+  DELETE FROM word_parts WHERE word_id = OLD.id;
+END;
@@ -0,0 +1,5 @@
+CREATE TRIGGER IF NOT EXISTS words_insert_word_stats
+AFTER INSERT ON words
+BEGIN
+  INSERT OR IGNORE INTO word_stats (word_id) VALUES (NEW.id);
+END;
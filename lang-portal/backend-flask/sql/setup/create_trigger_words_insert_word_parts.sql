@@ -0,0 +1,12 @@
+-- word_parts is words.parts (a JSON array of {"kanji", "romaji": [syllables]})
+-- split into rows, so words sharing a kanji are one index lookup apart
+CREATE TRIGGER IF NOT EXISTS words_insert_word_parts
+AFTER INSERT ON words
+BEGIN
+  INSERT OR REPLACE INTO word_parts (word_id, position, kanji, romaji)
+  SELECT NEW.id, p.key,
+         json_extract(p.value, '$.kanji'),
+         COALESCE((SELECT group_concat(r.value, '') FROM json_each(p.value, '$.romaji') r), '')
+  FROM json_each(NEW.parts) p
+  WHERE json_valid(NEW.parts) AND p.type = 'object' AND json_extract(p.value, '$.kanji') IS NOT NULL;
+END;
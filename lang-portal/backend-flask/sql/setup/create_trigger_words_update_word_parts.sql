@@ -0,0 +1,11 @@
+CREATE TRIGGER IF NOT EXISTS words_update_word_parts
+AFTER UPDATE OF parts ON words
+BEGIN
+  DELETE FROM word_parts WHERE word_id = OLD.id;
+  INSERT OR REPLACE INTO word_parts (word_id, position, kanji, romaji)
+  SELECT NEW.id, p.key,
+         json_extract(p.value, '$.kanji'),
+         COALESCE((SELECT group_concat(r.value, '') FROM json_each(p.value, '$.romaji') r), '')
+  FROM json_each(NEW.parts) p
+  WHERE json_valid(NEW.parts) AND p.type = 'object' AND json_extract(p.value, '$.kanji') IS NOT NULL;
+END;
@@ -0,0 +1,8 @@
+-- Backfills word_parts for words added before the table existed
+INSERT OR IGNORE INTO word_parts (word_id, position, kanji, romaji)
+SELECT w.id, p.key,
+       json_extract(p.value, '$.kanji'),
+       COALESCE((SELECT group_concat(r.value, '') FROM json_each(p.value, '$.romaji') r), '')
+FROM words w, json_each(w.parts) p
+WHERE json_valid(w.parts) AND p.type = 'object' AND json_extract(p.value, '$.kanji') IS NOT NULL
+  AND w.id NOT IN (SELECT word_id FROM word_parts);
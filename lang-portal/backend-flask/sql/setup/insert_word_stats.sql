@@ -0,0 +1,12 @@
+-- Backfills word_stats for words added before the table existed
+INSERT OR IGNORE INTO word_stats (word_id, correct_count, wrong_count, accuracy, last_reviewed)
+SELECT w.id,
+       COALESCE(SUM(r.correct_count), 0),
+       COALESCE(SUM(r.wrong_count), 0),
+       CASE WHEN SUM(r.correct_count) + SUM(r.wrong_count) > 0
+            THEN SUM(r.correct_count) * 1.0 / (SUM(r.correct_count) + SUM(r.wrong_count)) END,
+       MAX(r.last_reviewed)
+FROM words w
+LEFT JOIN word_reviews r ON r.word_id = w.id
+WHERE w.id NOT IN (SELECT word_id FROM word_stats)
+GROUP BY w.id;
@@ -6,4 +6,159 @@ def init_db(c):
   from flask import Flask
   app = Flask(__name__)
   db.init(app)
-  print("Database initialized successfully.")
\ No newline at end of file
+  print("Database initialized successfully.")
+
+@task
+def rebuild_daily_activity(c):
+  from flask import Flask
+  from lib import daily_activity
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    # Creates any tables/indexes missing from an older words.db
+    db.setup_tables(cursor)
+    daily_activity.rebuild(cursor)
+    db.commit()
+    cursor.execute('SELECT COUNT(*) FROM daily_activity')
+    print(f"Rebuilt daily_activity with {cursor.fetchone()[0]} rows.")
+    db.close()
+
+@task
+def score_words(c, half_life_days=30.0, prior_strength=5.0, archive=''):
+  # Scores every word from review_events (plus --archive, if sessions have
+  # been archived)
+  import os
+  from flask import Flask
+  from lib import word_scores
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    db.setup_tables(cursor)
+    attached = bool(archive) and os.path.exists(archive)
+    if attached:
+      cursor.execute('ATTACH DATABASE ? AS archive', (archive,))
+    try:
+      word_ids, review_word_ids, correct, age_days = word_scores.load_history(cursor, attached)
+    finally:
+      if attached:
+        cursor.execute('DETACH DATABASE archive')
+    scores = word_scores.score(
+      word_ids, review_word_ids, correct, age_days,
+      half_life_days=half_life_days,
+      prior_strength=prior_strength
+    )
+    word_scores.write_scores(cursor, word_ids, scores)
+    db.commit()
+    print(f"Scored {len(word_ids)} words from {len(review_word_ids)} reviews.")
+    db.close()
+
+@task
+def archive_sessions(c, older_than_days=90, archive='archive.db', batch_size=500):
+  import sqlite3
+  from lib import archive as history_archive
+  connection = sqlite3.connect(db.database)
+  try:
+    moved = history_archive.archive_sessions(
+      db, connection, archive,
+      older_than_days=older_than_days,
+      batch_size=batch_size
+    )
+  finally:
+    connection.close()
+  for table, count in moved.items():
+    print(f"Archived {count} rows from {table} into {archive}.")
+
+@task
+def maintain_db(c, vacuum_pages=0, enable_incremental_vacuum=False):
+  import sqlite3
+  from lib import maintenance
+  connection = sqlite3.connect(db.database)
+  try:
+    if enable_incremental_vacuum:
+      print("Switching to auto_vacuum=INCREMENTAL (full VACUUM)...")
+      maintenance.enable_incremental_vacuum(connection)
+    report = maintenance.run(connection, db.database, vacuum_pages or None)
+  finally:
+    connection.close()
+  print(maintenance.format_report(report))
+
+@task
+def verify_counters(c, repair=False, archive=''):
+  # Recounts groups.words_count and the word_reviews totals from word_groups
+  # and review_events (plus --archive, if sessions have been archived) and
+  # reports rows out of step; --repair rewrites them. A history reset zeroes
+  # the totals, so an archive from before the last reset doesn't belong here.
+  import os
+  from flask import Flask
+  from lib import counters
+  app = Flask(__name__)
+  with app.app_context():
+    cursor = db.cursor()
+    # Creates the triggers missing from an older words.db
+    db.setup_tables(cursor)
+    attached = bool(archive) and os.path.exists(archive)
+    if attached:
+      cursor.execute('ATTACH DATABASE ? AS archive', (archive,))
+    try:
+      stale = counters.repair(cursor, attached) if repair else counters.check(cursor, attached)
+      db.commit()
+    finally:
+      if attached:
+        cursor.execute('DETACH DATABASE archive')
+      db.close()
+  for counter, ids in stale.items():
+    print(f"{counter}: {len(ids)} {'repaired' if repair else 'out of step'}{': ' + ', '.join(map(str, ids[:20])) if ids else ''}")
+
+@task
+def backup_db(c, output='', snapshot_dir='snapshots', pages=256, pause_ms=5):
+  # Hot backup of words.db, safe while the app is running
+  import os
+  from lib import snapshots
+  target = output or os.path.join(snapshot_dir, snapshots.snapshot_name(db.database))
+  stats = snapshots.backup(db.database, target, pages=pages, pause_ms=pause_ms)
+  print(f"Backed up {db.database} to {target}: {stats['pages']} pages in {stats['steps']} steps, {stats['seconds']} s.")
+
+@task
+def restore_db(c, snapshot):
+  # Replaces words.db's contents with the snapshot; running app processes
+  # see the restored data on their next query
+  from lib import snapshots
+  stats = snapshots.restore(snapshot, db.database)
+  print(f"Restored {db.database} from {snapshot}: {stats['pages']} pages in {stats['seconds']} s.")
+
+@task
+def tenant_report(c, tenant_dir='tenants', since=None, as_json=False):
+  import json
+  from lib import tenants
+  rows = tenants.aggregate(tenants.Tenants(tenant_dir), since=since)
+  if as_json:
+    print(json.dumps(rows, indent=2))
+    return
+  print(f"{'learner':<24} {'days':>5} {'sessions':>9} {'reviews':>9} {'accuracy':>9}  last active")
+  for row in rows:
+    print(f"{row['learner']:<24} {row['active_days']:>5} {row['sessions']:>9} {row['reviews']:>9} {row['accuracy']:>8}%  {row['last_active'] or '-'}")
+  total_reviews = sum(row['reviews'] for row in rows)
+  total_correct = sum(row['correct'] for row in rows)
+  accuracy = round(total_correct / total_reviews * 100, 1) if total_reviews else 0.0
+  print(f"{len(rows)} learners, {sum(row['sessions'] for row in rows)} sessions, {total_reviews} reviews, {accuracy}% correct")
+
+@task
+def train_kana_classifier(c, font='', samples='', output='kana_classifier.npz', variants=12, seed=0):
+  # Templates from a font with kana glyphs (--font) and/or drawings collected
+  # from learners (--samples, an .npz with images and labels arrays)
+  import numpy as np
+  from kana_dictionary import ALL_HIRAGANA_LIST, ALL_KATAKANA_LIST
+  from lib.kana_classifier import KanaClassifier, render_samples
+  images, labels = [], []
+  if font:
+    images, labels = render_samples(font, ALL_HIRAGANA_LIST + ALL_KATAKANA_LIST, variants=variants, seed=seed)
+  if samples:
+    with np.load(samples) as data:
+      images.extend(data['images'])
+      labels.extend(str(label) for label in data['labels'])
+  if not images:
+    print("Nothing to train on: pass --font and/or --samples.")
+    return
+  classifier = KanaClassifier.fit(images, labels)
+  classifier.save(output)
+  print(f"Saved {len(classifier.template_labels)} templates for {len(classifier.labels)} kana to {output}.")
@@ -1,76 +1,67 @@
 import pytest
-import sqlite3
-import os
-from flask import Flask
-from routes import study_sessions
+from lib.db import Db, SETUP_FILES, add_columns, connect
 
 @pytest.fixture
-def app():
-    # Create a test Flask app
-    app = Flask(__name__)
-    
-    # Use an in-memory SQLite database for testing
-    app.db = sqlite3.connect(':memory:', check_same_thread=False)
-    app.db.row_factory = sqlite3.Row
-    
-    # Create test tables
-    cursor = app.db.cursor()
-    cursor.executescript('''
-        CREATE TABLE groups (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            created_at DATETIME NOT NULL
-        );
+def database(tmp_path):
+    # words.db built from sql/setup, as setup_tables does. Test modules that
+    # need rows in it before the app starts override this fixture.
+    path = str(tmp_path / 'words.db')
+    connection = connect(path)
+    cursor = connection.cursor()
+    for setup_file in SETUP_FILES:
+        cursor.execute(Db().sql(setup_file))
+    add_columns(cursor)
+    connection.commit()
+    connection.close()
+    return path
 
-        CREATE TABLE study_activities (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            created_at DATETIME NOT NULL
-        );
-
-        CREATE TABLE words (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            kanji TEXT NOT NULL,
-            romaji TEXT NOT NULL,
-            english TEXT NOT NULL,
-            created_at DATETIME NOT NULL,
-            correct_count INTEGER NOT NULL DEFAULT 0,
-            wrong_count INTEGER NOT NULL DEFAULT 0
-        );
+@pytest.fixture
+def config():
+    # Settings on top of the defaults for the app fixture; test modules
+    # override this, single tests call make_app instead
+    return {}
 
-        CREATE TABLE study_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            group_id INTEGER NOT NULL,
-            study_activity_id INTEGER NOT NULL,
-            created_at DATETIME NOT NULL,
-            updated_at DATETIME,
-            completed INTEGER NOT NULL DEFAULT 0,
-            FOREIGN KEY (group_id) REFERENCES groups(id),
-            FOREIGN KEY (study_activity_id) REFERENCES study_activities(id)
-        );
+@pytest.fixture
+def make_app(database):
+    # The real app, with every route, on the test's database
+    from app import create_app
+    def make(**settings):
+        return create_app({'DATABASE': database, 'TESTING': True, **settings})
+    return make
 
-        CREATE TABLE word_review_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            study_session_id INTEGER NOT NULL,
-            word_id INTEGER NOT NULL,
-            correct INTEGER NOT NULL DEFAULT 0,
-            created_at DATETIME NOT NULL,
-            updated_at DATETIME,
-            FOREIGN KEY (study_session_id) REFERENCES study_sessions(id),
-            FOREIGN KEY (word_id) REFERENCES words(id)
-        );
-    ''')
-    app.db.commit()
-    cursor.close()
+@pytest.fixture
+def app(make_app, config):
+    return make_app(**config)
 
-    # Load routes
-    study_sessions.load(app)
+@pytest.fixture
+def client(app):
+    return app.test_client()
 
-    yield app
+@pytest.fixture
+def db(database):
+    # A connection of the test's own for adding and checking rows; requests
+    # get theirs from app.db as usual
+    connection = connect(database)
+    yield connection
+    connection.close()
 
-    # Cleanup
-    app.db.close()
+@pytest.fixture
+def classifier():
+    # A KanaClassifier trained on a few variations of each drawing in
+    # tests/drawings.py; numpy and PIL are only needed by the tests using it
+    from lib.kana_classifier import KanaClassifier
+    from tests.drawings import STROKES, draw
+    images, labels = [], []
+    for kana in STROKES:
+        for scale in [0.8, 0.9, 1.0]:
+            for width in [6, 10]:
+                images.append(draw(kana, scale=scale, width=width))
+                labels.append(kana)
+    return KanaClassifier.fit(images, labels, components=8)
 
 @pytest.fixture
-def client(app):
-    return app.test_client() 
\ No newline at end of file
+def classifier_path(classifier, tmp_path):
+    # The classifier saved for KANA_CLASSIFIER_PATH
+    path = str(tmp_path / 'kana_classifier.npz')
+    classifier.save(path)
+    return path
@@ -0,0 +1,29 @@
+import base64
+import io
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Synthetic kana drawings shared by the classifier, writing practice and
+# dataset tests
+
+# Stand-in glyphs: each "kana" is a fixed set of strokes
+STROKES = {
+    'あ': [[(0.2, 0.3), (0.8, 0.3)], [(0.5, 0.1), (0.4, 0.9)], [(0.3, 0.6), (0.7, 0.8), (0.6, 0.5)]],
+    'い': [[(0.3, 0.2), (0.25, 0.8)], [(0.7, 0.3), (0.75, 0.6)]],
+    'ア': [[(0.2, 0.2), (0.8, 0.2), (0.6, 0.5)], [(0.5, 0.3), (0.3, 0.9)]],
+}
+
+def draw(kana, size=200, scale=1.0, shift=(0.0, 0.0), width=8):
+    image = Image.new('L', (size, size), 255)
+    canvas = ImageDraw.Draw(image)
+    for stroke in STROKES[kana]:
+        canvas.line([((x * scale + shift[0]) * size, (y * scale + shift[1]) * size) for x, y in stroke], fill=0, width=width)
+    return np.array(image)
+
+def png_bytes(image_array):
+    buffer = io.BytesIO()
+    Image.fromarray(image_array).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def data_url(image_array):
+    return 'data:image/png;base64,' + base64.b64encode(png_bytes(image_array)).decode()
@@ -0,0 +1,78 @@
+import sqlite3
+import pytest
+from lib import archive, daily_activity
+from lib.db import Db, add_columns
+
+@pytest.fixture
+def database(database):
+    conn = sqlite3.connect(database)
+    # Two old completed sessions, one old session still in progress (on the
+    # same day as one of them) and one from today, each with two answered
+    # review items
+    for age, completed in [('-200 days', 1), ('-100 days', 1), ('-100 days', 0), ('+0 days', 1)]:
+        cursor = conn.execute("INSERT INTO study_sessions (group_id, study_activity_id, created_at, completed) VALUES (1, 1, datetime('now', ?), ?)",
+                              (age, completed))
+        for word_id in [1, 2]:
+            for table in ['word_review_items', 'review_events']:
+                conn.execute(f"INSERT INTO {table} (word_id, study_session_id, correct, created_at) VALUES (?, ?, 1, datetime('now', ?))",
+                             (word_id, cursor.lastrowid, age))
+    daily_activity.rebuild(conn.cursor())
+    conn.commit()
+    conn.close()
+    return database
+
+def test_archive_moves_old_sessions_and_keeps_rollups(database, tmp_path):
+    archive_path = str(tmp_path / 'archive.db')
+    conn = sqlite3.connect(database)
+    moved = archive.archive_sessions(Db(database=database), conn, archive_path, older_than_days=90, batch_size=1)
+    assert moved == {'study_sessions': 2, 'word_review_items': 4, 'review_events': 4}
+
+    # The session still in progress stays with today's
+    assert conn.execute('SELECT id FROM study_sessions ORDER BY id').fetchall() == [(3,), (4,)]
+    assert conn.execute('SELECT COUNT(*) FROM word_review_items').fetchone()[0] == 4
+
+    # Rollups survive archiving, a rebuild and a refresh of a day that was
+    # partly archived
+    def rollup():
+        return conn.execute('SELECT SUM(sessions), SUM(reviews), SUM(archived_sessions) FROM daily_activity').fetchone()
+    assert rollup() == (4, 8, 2)
+    daily_activity.rebuild(conn.cursor())
+    assert rollup() == (4, 8, 2)
+    conn.execute('INSERT INTO review_events (word_id, study_session_id, correct) VALUES (1, 3, 0)')
+    daily_activity.refresh_sessions(conn.cursor(), [3])
+    assert rollup() == (4, 8, 2)
+    conn.close()
+
+    archived = sqlite3.connect(archive_path)
+    assert archived.execute('SELECT id FROM study_sessions ORDER BY id').fetchall() == [(1,), (2,)]
+    assert archived.execute('SELECT COUNT(*) FROM word_review_items').fetchone()[0] == 4
+    archived.close()
+
+def test_older_rollups_get_their_archived_counts_back(database, tmp_path):
+    # A rollup from before the archived_* columns, with sessions 1 and 2
+    # archived back then
+    conn = sqlite3.connect(database)
+    conn.execute('DELETE FROM study_sessions WHERE id IN (1, 2)')
+    conn.execute('ALTER TABLE daily_activity RENAME TO old_daily_activity')
+    conn.execute('CREATE TABLE daily_activity (day DATE NOT NULL, group_id INTEGER NOT NULL, sessions INTEGER NOT NULL DEFAULT 0, '
+                 'reviews INTEGER NOT NULL DEFAULT 0, correct INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (day, group_id)) WITHOUT ROWID')
+    conn.execute('INSERT INTO daily_activity SELECT day, group_id, sessions, reviews, correct FROM old_daily_activity')
+    conn.execute('DROP TABLE old_daily_activity')
+    add_columns(conn.cursor())
+    assert conn.execute('SELECT SUM(archived_sessions), SUM(archived_reviews) FROM daily_activity').fetchone() == (2, 4)
+    daily_activity.rebuild(conn.cursor())
+    assert conn.execute('SELECT SUM(sessions), SUM(reviews) FROM daily_activity').fetchone() == (4, 8)
+    conn.close()
+
+def test_reset_swaps_in_empty_tables_and_keeps_ids(database):
+    conn = sqlite3.connect(database)
+    archive.reset_study_history(Db(database=database), conn.cursor())
+    conn.commit()
+
+    for table in ['study_sessions', 'word_review_items', 'daily_activity']:
+        assert conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == 0
+
+    # New sessions continue after the old ids so they can't clash with the archive
+    cursor = conn.execute("INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)")
+    assert cursor.lastrowid == 5
+    conn.close()
@@ -0,0 +1,75 @@
+import os
+import pytest
+import lib.cors
+
+PREFLIGHT = {'Access-Control-Request-Method': 'POST', 'Access-Control-Request-Headers': 'content-type, x-other'}
+
+def test_origin_of():
+    assert lib.cors.origin_of('https://Example.com:8443/app?x=1') == 'https://example.com:8443'
+    assert lib.cors.origin_of('/assets/typing_tutor') is None
+
+@pytest.fixture
+def restricted(make_app, db, tmp_path, monkeypatch):
+    db.execute("INSERT INTO study_activities (name, url) VALUES ('Typing Tutor', 'http://localhost:8081/typing')")
+    db.commit()
+    app = make_app(CORS_ORIGINS=['https://portal.example'], TENANT_DIR=str(tmp_path / 'tenants'))
+    loads = []
+    load = lib.cors.OriginRegistry.load
+    def counted(self):
+        loads.append(1)
+        return load(self)
+    monkeypatch.setattr(lib.cors.OriginRegistry, 'load', counted)
+    app.loads = loads
+    return app
+
+def test_preflights_are_answered_from_memory(restricted, tmp_path):
+    client = restricted.test_client()
+    for _ in range(3):
+        response = client.options('/learners/alice/api/review-events',
+                                  headers={**PREFLIGHT, 'Origin': 'http://localhost:8081'})
+        assert response.status_code == 200
+        assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:8081'
+        assert response.headers['Access-Control-Allow-Headers'] == 'content-type'
+        assert 'POST' in response.headers['Access-Control-Allow-Methods']
+        assert response.headers['Access-Control-Max-Age'] == '600'
+        assert 'Origin' in response.headers['Vary']
+    assert len(restricted.loads) == 1
+    # No learner database was created for a preflight
+    assert not os.path.exists(tmp_path / 'tenants' / 'alice.db')
+
+    response = client.options('/groups', headers={**PREFLIGHT, 'Origin': 'https://portal.example'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'https://portal.example'
+    response = client.options('/groups', headers={**PREFLIGHT, 'Origin': 'https://elsewhere.example'})
+    assert response.status_code == 200
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+def test_new_activities_are_allowed_once_invalidated(restricted, db):
+    client = restricted.test_client()
+    headers = {'Origin': 'https://kana.example', 'X-Learner-Id': 'bob'}
+    assert 'Access-Control-Allow-Origin' not in client.get('/api/study-activities', headers=headers).headers
+
+    db.execute("INSERT INTO study_activities (name, url) VALUES ('Kana', 'https://kana.example/draw')")
+    db.commit()
+    restricted.cors.invalidate()
+
+    response = client.get('/api/study-activities', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['Access-Control-Allow-Origin'] == 'https://kana.example'
+    assert len(restricted.loads) == 2
+
+def test_any_origin_by_default(client):
+    response = client.options('/words', headers={**PREFLIGHT, 'Origin': 'https://anywhere.example'})
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
+    response = client.get('/words', headers={'Origin': 'https://anywhere.example'})
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
+    assert 'Access-Control-Allow-Origin' not in client.get('/words').headers
+
+def test_raw_bitmap_headers_are_allowed_and_retry_after_exposed(client):
+    response = client.options('/writing-practice/verify-kana', headers={
+        'Origin': 'https://anywhere.example',
+        'Access-Control-Request-Method': 'POST',
+        'Access-Control-Request-Headers': 'content-type, x-image-width, x-image-height'
+    })
+    assert response.headers['Access-Control-Allow-Headers'] == 'content-type, x-image-width, x-image-height'
+    response = client.get('/words', headers={'Origin': 'https://anywhere.example'})
+    assert response.headers['Access-Control-Expose-Headers'] == 'Retry-After'
@@ -0,0 +1,113 @@
+import sqlite3
+import pytest
+from lib import archive, counters
+from lib.db import Db
+
+@pytest.fixture
+def db(db):
+    db.executemany("INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, '[]')",
+                   [('犬', 'inu', 'dog'), ('猫', 'neko', 'cat'), ('鳥', 'tori', 'bird')])
+    db.executemany('INSERT INTO groups (name) VALUES (?)', [('Animals',), ('Pets',)])
+    db.commit()
+    return db
+
+def words_counts(db):
+    return [row[0] for row in db.execute('SELECT words_count FROM groups ORDER BY id')]
+
+def test_word_groups_triggers_keep_words_count(db):
+    db.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', [(1, 1), (2, 1), (3, 1), (1, 2)])
+    assert words_counts(db) == [3, 1]
+    db.execute('UPDATE word_groups SET group_id = 2 WHERE word_id = 2')
+    assert words_counts(db) == [2, 2]
+    db.execute('DELETE FROM word_groups WHERE word_id = 1')
+    assert words_counts(db) == [1, 1]
+    assert counters.check(db.cursor()) == {'groups': [], 'word_reviews': [], 'word_stats': []}
+
+def test_review_events_trigger_counts_every_answer(db):
+    db.executemany('INSERT INTO review_events (study_session_id, word_id, correct, created_at) VALUES (1, ?, ?, ?)',
+                     [(1, 1, '2024-01-01 10:00:00'), (1, 0, '2024-01-02 10:00:00'), (2, 0, '2024-01-01 09:00:00')])
+    totals = {row[0]: row[1:] for row in db.execute('SELECT word_id, correct_count, wrong_count, last_reviewed FROM word_reviews')}
+    assert totals == {1: (1, 1, '2024-01-02 10:00:00'), 2: (0, 1, '2024-01-01 09:00:00')}
+
+    stats = {row[0]: row[1:] for row in db.execute('SELECT word_id, correct_count, wrong_count, accuracy FROM word_stats')}
+    assert stats == {1: (1, 1, 0.5), 2: (0, 1, 0.0), 3: (0, 0, None)}
+
+    # Archiving deletes the events but the totals keep their history
+    db.execute('DELETE FROM review_events WHERE word_id = 2')
+    assert db.execute('SELECT wrong_count FROM word_reviews WHERE word_id = 2').fetchone()[0] == 1
+
+def test_repair_rewrites_stale_counters(db, tmp_path):
+    db.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, 1)', [(1,), (2,)])
+    db.executemany('INSERT INTO review_events (study_session_id, word_id, correct) VALUES (1, ?, ?)', [(1, 1), (1, 1), (2, 0)])
+    db.execute('UPDATE groups SET words_count = 7 WHERE id = 1')
+    db.execute('UPDATE word_reviews SET correct_count = 5 WHERE word_id = 1')
+    db.execute("INSERT INTO word_reviews (word_id, correct_count, wrong_count) VALUES (3, 4, 4)")
+
+    cursor = db.cursor()
+    db.execute('UPDATE word_stats SET accuracy = 0.5 WHERE word_id = 2')
+    assert counters.check(cursor) == {'groups': [1], 'word_reviews': [1, 3], 'word_stats': [1, 2, 3]}
+    counters.repair(cursor)
+    assert words_counts(db) == [2, 0]
+    totals = {row[0]: row[1:] for row in db.execute('SELECT word_id, correct_count, wrong_count FROM word_reviews')}
+    assert totals == {1: (2, 0), 2: (0, 1)}
+    stats = {row[0]: row[1:] for row in db.execute('SELECT word_id, correct_count, wrong_count, accuracy FROM word_stats')}
+    assert stats == {1: (2, 0, 1.0), 2: (0, 1, 0.0), 3: (0, 0, None)}
+    assert counters.check(cursor) == {'groups': [], 'word_reviews': [], 'word_stats': []}
+
+def test_repair_counts_archived_events(db, tmp_path):
+    archived = sqlite3.connect(str(tmp_path / 'archive.db'))
+    archived.execute(Db().sql('setup/create_table_review_events.sql'))
+    archived.execute('INSERT INTO review_events (study_session_id, word_id, correct) VALUES (1, 1, 0)')
+    archived.commit()
+    archived.close()
+    db.execute('INSERT INTO review_events (study_session_id, word_id, correct) VALUES (2, 1, 0)')
+    db.execute('UPDATE word_reviews SET wrong_count = 2 WHERE word_id = 1')
+
+    cursor = db.cursor()
+    assert counters.check(cursor)['word_reviews'] == [1]
+    cursor.execute('ATTACH DATABASE ? AS archive', (str(tmp_path / 'archive.db'),))
+    assert counters.check(cursor, archive=True)['word_reviews'] == []
+
+def test_reset_recreates_the_review_events_trigger(db):
+    archive.reset_study_history(Db(), db.cursor())
+    db.commit()
+    db.execute('INSERT INTO review_events (study_session_id, word_id, correct) VALUES (1, 3, 1)')
+    assert db.execute('SELECT correct_count FROM word_reviews WHERE word_id = 3').fetchone()[0] == 1
+
+def test_word_stats_rows_follow_words(db):
+    assert db.execute('SELECT COUNT(*) FROM word_stats').fetchone()[0] == 3
+    db.execute('DELETE FROM words WHERE id = 3')
+    assert [row[0] for row in db.execute('SELECT word_id FROM word_stats')] == [1, 2]
+
+def test_reset_leaves_counters_in_step(app, client, db):
+    db.execute("INSERT INTO review_events (study_session_id, word_id, correct) VALUES (1, 1, 1)")
+    db.execute("INSERT INTO word_scores (word_id, attempts, success_rate, difficulty, mastery) VALUES (1, 1, 0.6, 0.4, 0.3)")
+    db.commit()
+    assert db.execute('SELECT correct_count, accuracy FROM word_stats WHERE word_id = 1').fetchone()[:] == (1, 1.0)
+    client.post('/writing-practice/verify-romaji', json={'input': 'ka', 'expectedRomaji': 'shi'})
+    assert db.execute('SELECT errors FROM kana_stats').fetchall()[0][0] == 1
+    assert client.get('/writing-practice/drill?type=hiragana').status_code == 200
+    assert client.get('/words/1').get_json()['word']['correct_count'] == 1
+
+    assert client.post('/api/study-sessions/reset').status_code == 200
+
+    # Every view of the history starts again from nothing
+    for table in ['word_reviews', 'word_scores', 'kana_stats']:
+        assert db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == 0
+    assert not app.kana_drills.entries
+    word = client.get('/words/1').get_json()['word']
+    assert (word['correct_count'], word['wrong_count']) == (0, 0)
+    word = client.get('/words/batch?ids=1').get_json()['words'][0]
+    assert (word['correct_count'], word['wrong_count']) == (0, 0)
+
+    cursor = db.cursor()
+    assert counters.check(cursor) == {'groups': [], 'word_reviews': [], 'word_stats': []}
+    assert counters.repair(cursor) == {'groups': [], 'word_reviews': [], 'word_stats': []}
+    db.commit()
+    assert db.execute('SELECT correct_count, wrong_count, accuracy, last_reviewed FROM word_stats').fetchall()[0][:] == (0, 0, None, None)
+
+    # Answers after the reset are counted from zero
+    db.execute("INSERT INTO review_events (study_session_id, word_id, correct) VALUES (1, 1, 0)")
+    db.commit()
+    assert db.execute('SELECT correct_count, wrong_count FROM word_reviews').fetchall()[0][:] == (0, 1)
+    assert counters.check(cursor) == {'groups': [], 'word_reviews': [], 'word_stats': []}
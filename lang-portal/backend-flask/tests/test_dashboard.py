@@ -0,0 +1,8 @@
+def test_mastered_words_come_from_word_stats(client, db):
+    db.executemany("INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, '[]')",
+                   [('犬', 'inu', 'dog'), ('猫', 'neko', 'cat'), ('鳥', 'tori', 'bird')])
+    # 犬 4 of 5 right, 猫 4 of 4 (too few answers), 鳥 3 of 5
+    db.executemany('INSERT INTO review_events (study_session_id, word_id, correct) VALUES (1, ?, ?)',
+                   [(1, 1)] * 4 + [(1, 0)] + [(2, 1)] * 4 + [(3, 1)] * 3 + [(3, 0)] * 2)
+    db.commit()
+    assert client.get('/dashboard/stats').get_json()['mastered_words'] == 1
@@ -0,0 +1,48 @@
+import sqlite3
+import pytest
+
+def word_count(app):
+    cursor = app.db.read_cursor()
+    cursor.execute('SELECT COUNT(*) FROM words')
+    return cursor.fetchone()[0]
+
+def test_read_connection_refuses_writes(app):
+    with app.test_request_context():
+        cursor = app.db.read_cursor()
+        assert cursor.execute('PRAGMA query_only').fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            cursor.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+        # mode=ro holds even if query_only is switched off
+        cursor.execute('PRAGMA query_only = OFF')
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            cursor.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+        # The write connection is a different one
+        assert app.db.cursor().connection is not cursor.connection
+
+def test_reads_see_writes_committed_before_the_request(app, db):
+    with app.test_request_context():
+        assert word_count(app) == 0
+        # A request keeps one snapshot, even across another connection's commit
+        db.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+        db.commit()
+        assert word_count(app) == 0
+
+    with app.test_request_context():
+        assert word_count(app) == 1
+        # Including the request's own writes, once committed
+        app.db.cursor().execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('猫', 'neko', 'cat', '[]')")
+        app.db.commit()
+
+    with app.test_request_context():
+        assert word_count(app) == 2
+
+def test_routes_read_committed_writes_across_requests(client, db):
+    db.execute("INSERT INTO groups (name) VALUES ('Animals')")
+    db.execute("INSERT INTO study_activities (name, url) VALUES ('Flashcards', 'http://localhost:8081')")
+    db.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+    db.commit()
+    for expected in [1, 2]:
+        response = client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1, 'word_ids': [1]})
+        assert response.status_code == 201
+        # The next request's read snapshot includes the session just written
+        assert client.get('/api/study-sessions').get_json()['total'] == expected
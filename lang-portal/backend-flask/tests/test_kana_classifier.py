@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from lib.kana_classifier import KanaClassifier, normalize
+from tests.drawings import STROKES, data_url, draw
+
+def test_normalize_is_translation_and_scale_invariant():
+    a = normalize(draw('あ'))
+    b = normalize(draw('あ', size=400, scale=0.7, shift=(0.1, 0.05)))
+    assert a.shape == (32 * 32,)
+    assert float(a @ b) > 0.9
+    assert normalize(np.full((50, 50), 255, dtype=np.uint8)) is None
+
+def test_clean_drawings_are_classified_confidently(classifier):
+    label, similarity, margin, confident = classifier.classify(normalize(draw('い', scale=0.85, shift=(0.05, 0.0))))
+    assert (label, confident) == ('い', True)
+
+    # Restricted to katakana, a hiragana drawing can't win
+    label, _, _, _ = classifier.classify(normalize(draw('あ')), candidates=['ア'])
+    assert label == 'ア'
+
+def test_unfamiliar_drawings_are_left_to_ocr(classifier):
+    scribble = Image.new('L', (200, 200), 255)
+    ImageDraw.Draw(scribble).ellipse((40, 40, 160, 160), outline=0, width=8)
+    *_, confident = classifier.classify(normalize(np.array(scribble)))
+    assert not confident
+
+def test_save_and_load_round_trip(classifier, tmp_path):
+    path = str(tmp_path / 'kana_classifier.npz')
+    classifier.save(path)
+    vectors = np.stack([normalize(draw(kana)) for kana in STROKES])
+    loaded = KanaClassifier.load(path).classify_batch(vectors)
+    for (label, similarity, _, confident), expected in zip(loaded, classifier.classify_batch(vectors)):
+        assert (label, confident) == (expected[0], expected[3])
+        assert similarity == pytest.approx(expected[1], abs=1e-5)
+
+def test_verify_kana_answers_from_the_classifier(make_app, classifier_path):
+    response = make_app(KANA_CLASSIFIER_PATH=classifier_path).test_client().post('/writing-practice/verify-kana', json={
+        'image': data_url(draw('あ', scale=0.9)),
+        'expectedKana': 'あ',
+        'expectedRomaji': 'a',
+        'kanaType': 'hiragana'
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['success'], body['recognized'], body['debug_info']['engine']) == (True, 'あ', 'classifier')
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from lib import kana_dataset
+from tests.drawings import data_url, draw
+
+def test_bitmap_centres_and_scales_the_ink():
+    small = kana_dataset.bitmap(draw('あ', size=120, scale=0.5, shift=(0.3, 0.1)))
+    large = kana_dataset.bitmap(draw('あ', size=400, scale=0.5, shift=(0.3, 0.1), width=24))
+    assert small.shape == large.shape == (64, 64)
+    assert small.dtype == np.uint8
+    for image in [small, large]:
+        rows = np.flatnonzero((image < 200).any(axis=1))
+        cols = np.flatnonzero((image < 200).any(axis=0))
+        assert min(rows[0], cols[0]) == kana_dataset.MARGIN
+        assert max(rows[-1], cols[-1]) == 63 - kana_dataset.MARGIN
+    assert kana_dataset.bitmap(np.full((50, 50), 255, dtype=np.uint8)) is None
+
+def test_appends_are_memory_mappable_and_survive_a_torn_tail(tmp_path):
+    path = str(tmp_path / 'drawings.npy')
+    blank = np.full((50, 50), 255, dtype=np.uint8)
+    first = kana_dataset.records([(draw('あ'), 'あ', 'hiragana', 'あ', 'classifier'),
+                                  (blank, 'い', 'hiragana', '', 'none')])
+    assert len(first) == 1
+    assert kana_dataset.append(path, first) == 1
+
+    # An append interrupted after part of a record was written
+    with open(path, 'ab') as handle:
+        handle.write(b'\x01' * 100)
+    second = kana_dataset.records([(draw('い'), 'い', 'hiragana', 'り', 'manga_ocr'),
+                                   (draw('ア'), 'ア', 'katakana', 'ア', 'classifier')])
+    assert kana_dataset.append(path, second) == 3
+
+    dataset = kana_dataset.load(path)
+    assert isinstance(dataset, np.memmap)
+    assert list(dataset['label']) == ['あ', 'い', 'ア']
+    assert list(dataset['recognized']) == ['あ', 'り', 'ア']
+    assert np.array_equal(dataset['image'][1], second['image'][0])
+
+@pytest.fixture
+def config(classifier_path, tmp_path):
+    return {'KANA_CLASSIFIER_PATH': classifier_path, 'KANA_DATASET_PATH': str(tmp_path / 'drawings.npy')}
+
+def test_verify_kana_captures_graded_drawings_for_replay(client, classifier, tmp_path):
+    from benchmarks.kana_replay import replay
+    for kana, kana_type in [('あ', 'hiragana'), ('ア', 'katakana')]:
+        response = client.post('/writing-practice/verify-kana', json={
+            'image': data_url(draw(kana)), 'expectedKana': kana, 'expectedRomaji': 'a', 'kanaType': kana_type})
+        assert response.get_json()['success']
+    response = client.post('/writing-practice/verify-kana/batch', json={'items': [
+        {'image': data_url(draw('い', scale=0.9)), 'expectedKana': 'あ', 'kanaType': 'hiragana'}]})
+    assert response.get_json()['results'][0]['recognized'] == 'い'
+
+    dataset = kana_dataset.load(str(tmp_path / 'drawings.npy'))
+    assert list(zip(dataset['label'], dataset['kana_type'], dataset['recognized'], dataset['engine'])) == [
+        ('あ', 'hiragana', 'あ', 'classifier'),
+        ('ア', 'katakana', 'ア', 'classifier'),
+        ('あ', 'hiragana', 'い', 'classifier'),
+    ]
+
+    # The stored bitmaps go through the same pipeline to the same answers
+    answers, engines, seconds = replay(dataset, classifier, batch_size=2)
+    assert answers == ['あ', 'ア', 'い']
+    assert engines == ['classifier'] * 3
@@ -0,0 +1,65 @@
+import random
+import sqlite3
+from collections import Counter
+import pytest
+from lib import kana_drill
+from lib.kana_drill import KanaWeights, DrillCache, build_alias
+
+def test_alias_table_samples_in_proportion_to_weights():
+    probability, alias = build_alias([1.0, 2.0, 7.0])
+    rng = random.Random(0)
+    counts = Counter()
+    for _ in range(20000):
+        column = rng.randrange(3)
+        counts[column if rng.random() < probability[column] else alias[column]] += 1
+    assert counts[0] / 20000 == pytest.approx(0.1, abs=0.01)
+    assert counts[1] / 20000 == pytest.approx(0.2, abs=0.01)
+    assert counts[2] / 20000 == pytest.approx(0.7, abs=0.01)
+
+def test_draw_avoids_immediate_repeats():
+    # Half of the draws would repeat the previous kana without the retries
+    drawn = KanaWeights(['a', 'b'], [0, 0], [0, 0]).draw(200, random.Random(1))
+    assert len(drawn) == 200
+    assert sum(a == b for a, b in zip(drawn, drawn[1:])) < 30
+
+def test_record_upserts_counts():
+    db = sqlite3.connect(':memory:')
+    with open('sql/setup/create_table_kana_stats.sql') as f:
+        db.executescript(f.read())
+    cursor = db.cursor()
+    kana_drill.record(cursor, [('あ', 'hiragana', True), ('あ', 'hiragana', False), ('い', 'hiragana', False)])
+    weights = KanaWeights.load(cursor, 'hiragana', ['あ', 'い', 'う'])
+    assert weights.attempts == [2, 1, 0]
+    assert weights.errors == [1, 1, 0]
+
+def test_cache_updates_weights_in_place():
+    loads = []
+    def loader():
+        loads.append(1)
+        return KanaWeights(['あ', 'い'], [0, 0], [0, 0])
+    cache = DrillCache()
+    weights = cache.get(('words.db', 'hiragana'), loader)
+    cache.record('words.db', [('い', 'hiragana', False)])
+    assert cache.get(('words.db', 'hiragana'), loader) is weights
+    assert weights.errors == [0, 1]
+    assert weights.weight(1) > weights.weight(0)
+    assert len(loads) == 1
+
+def test_drill_favours_kana_answered_wrong(client):
+    response = client.get('/writing-practice/drill?type=hiragana&n=100')
+    assert response.status_code == 200
+    assert len(response.get_json()['kana']) == 100
+
+    for _ in range(30):
+        client.post('/writing-practice/verify-romaji', json={'input': 'ka', 'expectedRomaji': 'shi'})
+        client.post('/writing-practice/verify-romaji', json={'input': 'a', 'expectedRomaji': 'a'})
+
+    random.seed(0)
+    drawn = Counter(item['kana'] for _ in range(5) for item in
+                    client.get('/writing-practice/drill?type=hiragana&n=100').get_json()['kana'])
+    # Unseen kana get ~2% of the draws each, し (always wrong) over 7%
+    assert drawn['し'] > 25
+    assert drawn['あ'] < drawn['か']
+
+    assert client.get('/writing-practice/drill?n=1000').status_code == 400
+    assert client.get('/writing-practice/drill?type=kanji').status_code == 400
@@ -0,0 +1,59 @@
+import threading
+import time
+import pytest
+from lib.limits import ConcurrencyLimiter
+
+def test_waiters_get_a_slot_and_overflow_is_rejected():
+  limiter = ConcurrencyLimiter('test', concurrency=1, queue=1, timeout=2.0)
+  assert limiter.acquire() == 0.0
+  waited = []
+  waiter = threading.Thread(target=lambda: waited.append(limiter.acquire()))
+  waiter.start()
+  while limiter.metrics()['waiting'] == 0:
+    time.sleep(0.001)
+  # Slot taken and queue full
+  assert limiter.acquire() is None
+  time.sleep(0.02)
+  limiter.release(0.02)
+  waiter.join()
+  assert waited[0] >= 0.02
+  limiter.release(0.01)
+  metrics = limiter.metrics()
+  assert (metrics['admitted'], metrics['rejected'], metrics['queued'], metrics['active']) == (2, 1, 1, 0)
+
+def test_queued_requests_time_out():
+  limiter = ConcurrencyLimiter('test', concurrency=1, queue=1, timeout=0.01)
+  limiter.acquire()
+  assert limiter.acquire() is None
+  assert limiter.metrics()['timed_out'] == 1
+  assert limiter.metrics()['waiting'] == 0
+
+def test_retry_after_follows_service_time():
+  limiter = ConcurrencyLimiter('test', concurrency=2)
+  assert limiter.retry_after() == 1
+  for _ in range(2):
+    limiter.acquire()
+    limiter.release(3.0)
+  assert limiter.retry_after() == 2
+
+@pytest.fixture
+def config():
+  return {'CONCURRENCY_LIMITS': {'verify_kana': {'concurrency': 1, 'queue': 0}}}
+
+def test_saturated_endpoint_answers_429_and_others_keep_working(app, client):
+  limiter = app.limits.limiters['verify_kana']
+  limiter.acquire()
+  try:
+    response = client.post('/writing-practice/verify-kana', json={})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert client.post('/writing-practice/verify-kana/batch', json={}).status_code == 429
+    assert client.get('/writing-practice/random-kana').status_code == 200
+  finally:
+    limiter.release(0.0)
+  assert client.post('/writing-practice/verify-kana', json={}).status_code == 400
+
+  metrics = client.get('/api/metrics/limits').get_json()
+  assert metrics['verify_kana']['rejected'] == 2
+  assert metrics['verify_kana']['active'] == 0
+  assert 'get_new_words' not in metrics
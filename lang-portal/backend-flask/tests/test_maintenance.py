@@ -0,0 +1,75 @@
+import sqlite3
+import pytest
+from lib import maintenance
+from lib.db import connect
+
+@pytest.fixture
+def database(database):
+    # words.db with freed pages and an un-checkpointed WAL. The writer stays
+    # open, as the app's would: closing the last connection checkpoints too.
+    writer = connect(database)
+    writer.executemany("INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, '[]')",
+                       [(f'字{i}', f'ji{i}', 'x' * 200) for i in range(2000)])
+    writer.commit()
+    writer.execute('DELETE FROM words WHERE id > 100')
+    writer.commit()
+    yield database
+    writer.close()
+
+def test_run_reclaims_pages_analyzes_and_truncates_the_wal(database):
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()[0] == 0
+    report = maintenance.run(connection, database)
+
+    assert [name for name, _ in report['steps']] == ['incremental_vacuum', 'analyze', 'optimize', 'wal_checkpoint']
+    assert report['auto_vacuum']
+    assert report['freelist_before'] > 0
+    assert report['freelist_after'] == 0
+    # Planner statistics for the tables with indexes
+    tables = {row[0] for row in connection.execute('SELECT tbl FROM sqlite_stat1')}
+    assert {'words', 'word_stats'} <= tables
+    # Not blocked, and the WAL is folded back into the database file
+    assert report['checkpoint'][0] == 0
+    assert report['before']['wal'] > 0
+    assert report['after']['wal'] == 0
+    assert report['after']['database'] < report['before']['database'] + report['before']['wal']
+    assert connection.execute('SELECT COUNT(*) FROM words').fetchone()[0] == 100
+    connection.close()
+
+    text = maintenance.format_report(report)
+    assert 'incremental_vacuum' in text and 'blocked' not in text
+
+def test_run_reports_a_checkpoint_blocked_by_a_reader(database):
+    reader = sqlite3.connect(database, isolation_level=None)
+    reader.execute('BEGIN')
+    reader.execute('SELECT COUNT(*) FROM words').fetchone()
+    connection = sqlite3.connect(database, timeout=0.1)
+    # Written after the reader's snapshot, so the checkpoint can't get past it
+    connection.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+    connection.commit()
+    report = maintenance.run(connection, database)
+    reader.close()
+    connection.close()
+
+    assert report['checkpoint'][0] == 1
+    assert 'blocked by active readers' in maintenance.format_report(report)
+
+def test_incremental_vacuum_is_skipped_until_enabled(tmp_path):
+    path = str(tmp_path / 'old.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE notes (body TEXT)')
+    connection.executemany('INSERT INTO notes VALUES (?)', [('x' * 500,) for _ in range(500)])
+    connection.commit()
+    connection.execute('DELETE FROM notes')
+    connection.commit()
+
+    report = maintenance.run(connection, path)
+    assert not report['auto_vacuum']
+    assert 'incremental_vacuum' not in [name for name, _ in report['steps']]
+    assert 'skipped' in maintenance.format_report(report)
+
+    maintenance.enable_incremental_vacuum(connection)
+    report = maintenance.run(connection, path)
+    assert report['auto_vacuum']
+    assert report['freelist_after'] == 0
+    connection.close()
@@ -0,0 +1,118 @@
+import json
+import os
+import random
+import statistics
+import time
+import pytest
+import lib.db
+from lib import daily_activity
+
+# Regression budgets for the read endpoints on a medium-sized synthetic
+# database: how many SQL statements each request may run (catches N+1
+# queries and lost caches) and its median time. The time budgets leave
+# plenty of room for a slow CI runner; PERF_BUDGET_SCALE stretches them
+# further.
+BUDGET_SCALE = float(os.environ.get('PERF_BUDGET_SCALE', 1.0))
+RUNS = 5
+
+WORDS = 5000
+GROUPS = 50
+SESSIONS = 500
+WORDS_PER_SESSION = 20
+
+# (url, most statements, median budget in ms); the counts include the BEGIN
+# that opens each request's read snapshot
+ENDPOINTS = [
+    ('/words?page=3', 3, 50),
+    ('/words?sort_by=wrong_count&order=desc', 3, 50),
+    ('/words/42', 2, 50),
+    ('/words/42/related', 3, 50),
+    ('/words/batch?ids=1,2,3,4,5', 3, 50),
+    ('/groups', 3, 50),
+    ('/groups/7', 2, 50),
+    ('/groups/7/words?sort_by=correct_count&order=desc', 3, 50),
+    ('/groups/7/study_sessions', 3, 50),
+    ('/api/study-sessions', 3, 50),
+    ('/api/study-sessions/42', 4, 50),
+    ('/api/study-activities', 2, 50),
+    ('/api/study-activities/1/sessions', 4, 50),
+    ('/dashboard/recent-session', 2, 75),
+    ('/dashboard/stats', 8, 150),
+    ('/dashboard/activity', 2, 50),
+    # Served from the cached model / kana weights after the first request
+    ('/api/recommendations?group_id=7&n=20', 4, 50),
+    ('/writing-practice/drill?n=20', 0, 50),
+]
+
+def populate(connection):
+    rng = random.Random(0)
+    cursor = connection.cursor()
+    cursor.executemany('INSERT INTO study_activities (name, url) VALUES (?, ?)',
+                       [(f'Activity {i}', f'http://localhost:{8080 + i}') for i in range(3)])
+    cursor.executemany('INSERT INTO groups (name) VALUES (?)', [(f'Group {i}',) for i in range(GROUPS)])
+    cursor.executemany('INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, ?)', [
+        (f'語{i}', f'go{i}', f'word {i}',
+         json.dumps([{'kanji': f'語{i % 300}', 'romaji': [f'go{i % 300}']}, {'kanji': f'字{i % 70}', 'romaji': ['ji']}]))
+        for i in range(WORDS)
+    ])
+    cursor.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)',
+                       [(word_id, word_id % GROUPS + 1) for word_id in range(1, WORDS + 1)])
+    for session in range(SESSIONS):
+        group_id = session % GROUPS + 1
+        cursor.execute('''
+            INSERT INTO study_sessions (group_id, study_activity_id, created_at, completed)
+            VALUES (?, ?, datetime('now', ?), 1)
+        ''', (group_id, session % 3 + 1, f'-{SESSIONS - session} hours'))
+        session_id = cursor.lastrowid
+        word_ids = rng.sample(range(group_id, WORDS + 1, GROUPS), WORDS_PER_SESSION)
+        answers = [(session_id, word_id, rng.random() < 0.7) for word_id in word_ids]
+        cursor.executemany('''
+            INSERT INTO word_review_items (study_session_id, word_id, correct, created_at)
+            VALUES (?, ?, ?, datetime('now'))
+        ''', answers)
+        cursor.executemany('''
+            INSERT INTO review_events (study_session_id, word_id, correct, created_at)
+            VALUES (?, ?, ?, datetime('now'))
+        ''', answers)
+    daily_activity.rebuild(cursor)
+    connection.commit()
+
+@pytest.fixture(scope='module')
+def perf_app(tmp_path_factory):
+    from app import create_app
+    app = create_app({'DATABASE': str(tmp_path_factory.mktemp('perf') / 'words.db'), 'TESTING': True})
+    with app.app_context():
+        app.db.setup_tables(app.db.cursor())
+        populate(app.db.get())
+        app.db.close()
+    return app
+
+@pytest.fixture
+def statements(monkeypatch):
+    # Every statement run on the connections requests open through lib.db;
+    # statements run by triggers are reported with a leading comment and left out
+    executed = []
+    connect = lib.db.connect
+    def traced(*args, **kwargs):
+        connection = connect(*args, **kwargs)
+        connection.set_trace_callback(lambda sql: executed.append(sql) if not sql.startswith('--') else None)
+        return connection
+    monkeypatch.setattr(lib.db, 'connect', traced)
+    return executed
+
+@pytest.mark.parametrize('url, max_statements, budget_ms', ENDPOINTS)
+def test_endpoint_budget(perf_app, statements, url, max_statements, budget_ms):
+    client = perf_app.test_client()
+    # Warms caches (recommendation model, kana weights) the way a second
+    # request would find them
+    assert client.get(url).status_code == 200
+    timings = []
+    for _ in range(RUNS):
+        del statements[:]
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    assert len(statements) <= max_statements, statements
+    assert statistics.median(timings) < budget_ms * BUDGET_SCALE
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from lib.recommendations import RecommendationModel
+
+def model(correct, wrong, last_reviewed, groups=None):
+    word_ids = np.arange(1, len(correct) + 1)
+    return RecommendationModel(word_ids, np.array(correct, dtype=float), np.array(wrong, dtype=float),
+                               np.array(last_reviewed, dtype=float), groups or {})
+
+def test_new_wrong_and_due_words_come_first():
+    now = 2460000.0
+    # 1: always right, just reviewed; 2: mostly wrong; 3: never seen;
+    # 4: always right but not seen for a month
+    recommendations = model([10, 1, 0, 10], [0, 9, 0, 0], [now, now, np.nan, now - 30])
+    word_ids, scores = recommendations.top(4, now=now)
+    assert word_ids == [3, 2, 4, 1]
+    assert scores == sorted(scores, reverse=True)
+    assert recommendations.top(2, now=now)[0] == word_ids[:2]
+
+def test_candidates_are_limited_to_the_group():
+    recommendations = model([0, 0, 0], [5, 0, 0], [np.nan] * 3, {7: np.array([1, 2])})
+    assert recommendations.top(10, group_id=7, now=0)[0] == [2, 3]
+    assert recommendations.top(10, group_id=8, now=0) == ([], [])
+
+@pytest.fixture
+def app(app, db):
+    db.executemany("INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, '[]')",
+                   [('犬', 'inu', 'dog'), ('猫', 'neko', 'cat'), ('鳥', 'tori', 'bird')])
+    db.execute("INSERT INTO groups (name) VALUES ('Pets')")
+    db.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, 1)', [(1,), (2,)])
+    db.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+    db.commit()
+    return app
+
+def test_model_is_cached_until_a_review_is_written(app):
+    client = app.test_client()
+    response = client.get('/api/recommendations?group_id=1&n=2')
+    assert response.status_code == 200
+    assert {word['id'] for word in response.get_json()['words']} == {1, 2}
+    cached = app.recommendations.entries[app.config['DATABASE']][1]
+    client.get('/api/recommendations?n=3')
+    assert app.recommendations.entries[app.config['DATABASE']][1] is cached
+
+    for _ in range(5):
+        client.post('/api/review-events', json={'durability': 'sync', 'events': [
+            {'study_session_id': 1, 'word_id': 1, 'is_correct': True},
+            {'study_session_id': 1, 'word_id': 2, 'is_correct': False}
+        ]})
+    words = client.get('/api/recommendations?group_id=1&n=2').get_json()['words']
+    assert app.recommendations.entries[app.config['DATABASE']][1] is not cached
+    assert [(word['id'], word['wrong_count']) for word in words] == [(2, 5), (1, 0)]
+
+def test_model_is_rebuilt_when_a_word_changes_groups(app, db):
+    client = app.test_client()
+    db.execute("INSERT INTO groups (name) VALUES ('Birds')")
+    db.commit()
+    assert client.get('/api/recommendations?group_id=2').get_json()['words'] == []
+
+    # The number of words in groups stays the same
+    db.execute('UPDATE word_groups SET group_id = 2 WHERE word_id = 2')
+    db.commit()
+    assert [word['id'] for word in client.get('/api/recommendations?group_id=2').get_json()['words']] == [2]
+    assert [word['id'] for word in client.get('/api/recommendations?group_id=1').get_json()['words']] == [1]
+
+def test_recommendations_validate_arguments(app):
+    client = app.test_client()
+    assert client.get('/api/recommendations?group_id=9').status_code == 404
+    assert client.get('/api/recommendations?n=0').status_code == 400
+    assert client.get('/api/recommendations?n=x').status_code == 400
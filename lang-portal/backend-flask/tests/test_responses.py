@@ -0,0 +1,41 @@
+import gzip
+import pytest
+from flask import jsonify
+from lib import json_provider
+
+@pytest.fixture
+def config():
+    return {'COMPRESS_MIN_SIZE': 100}
+
+@pytest.fixture
+def app(app):
+    @app.route('/test/small')
+    def small():
+        return jsonify({"id": 1})
+
+    @app.route('/test/large')
+    def large():
+        return jsonify({"words": [{"id": i, "kanji": "犬"} for i in range(100)]})
+
+    return app
+
+def test_json_provider_round_trip(app):
+    with app.app_context():
+        body = app.json.dumps({"b": 1, "a": "犬", 2: [1.5, None]})
+        assert app.json.loads(body) == {"a": "犬", "b": 1, "2": [1.5, None]}
+
+@pytest.mark.skipif(json_provider.orjson is None, reason="orjson not installed")
+def test_orjson_is_used_when_installed(app):
+    assert isinstance(app.json, json_provider.OrjsonProvider)
+
+def test_large_responses_are_compressed(client):
+    response = client.get('/test/large', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(gzip.decompress(response.data)) > len(response.data)
+
+def test_small_or_unaccepted_responses_are_not_compressed(client):
+    assert 'Content-Encoding' not in client.get('/test/small', headers={'Accept-Encoding': 'gzip'}).headers
+    response = client.get('/test/large')
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.get_json()['words']) == 100
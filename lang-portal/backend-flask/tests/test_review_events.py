@@ -0,0 +1,96 @@
+import pytest
+import sqlite3
+from lib.review_events import ReviewEventQueue
+
+@pytest.fixture
+def database(database):
+    conn = sqlite3.connect(database)
+    conn.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+    conn.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('猫', 'neko', 'cat', '[]')")
+    conn.execute("INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)")
+    conn.execute("INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (1, 1, 0)")
+    conn.commit()
+    conn.close()
+    return database
+
+def test_events_are_group_committed(database):
+    queue = ReviewEventQueue(database, batch_size=3, flush_interval_ms=1000)
+    tickets = [
+        queue.put([(1, 1, True)]),
+        queue.put([(1, 1, False), (1, 2, True)]),
+    ]
+    for ticket in tickets:
+        ticket.wait(timeout=5)
+    queue.close()
+
+    conn = sqlite3.connect(database)
+    assert conn.execute('SELECT COUNT(*) FROM review_events').fetchone()[0] == 3
+
+    # The latest answer wins for the session's review item, new words get one
+    items = dict(conn.execute('SELECT word_id, correct FROM word_review_items WHERE study_session_id = 1'))
+    assert items == {1: 0, 2: 1}
+
+    totals = {row[0]: row[1:] for row in conn.execute('SELECT word_id, correct_count, wrong_count FROM word_reviews')}
+    assert totals == {1: (1, 1), 2: (1, 0)}
+    conn.close()
+
+def test_close_flushes_pending_events(database):
+    queue = ReviewEventQueue(database, batch_size=1000, flush_interval_ms=60000)
+    ticket = queue.put([(1, 1, True)] * 5)
+    queue.close(timeout=5)
+    assert ticket.done.is_set()
+
+    conn = sqlite3.connect(database)
+    assert conn.execute('SELECT COUNT(*) FROM review_events').fetchone()[0] == 5
+    assert conn.execute('SELECT correct_count FROM word_reviews WHERE word_id = 1').fetchone()[0] == 5
+    conn.close()
+
+    with pytest.raises(RuntimeError):
+        queue.put([(1, 1, True)])
+
+def test_write_errors_are_reported_to_waiters(tmp_path):
+    queue = ReviewEventQueue(str(tmp_path / 'empty.db'), flush_interval_ms=1)
+    ticket = queue.put([(1, 1, True)])
+    with pytest.raises(sqlite3.OperationalError):
+        ticket.wait(timeout=5)
+    queue.close()
+
+def test_a_failing_event_only_fails_its_own_ticket(database):
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TRIGGER reject_word_99 BEFORE INSERT ON review_events WHEN NEW.word_id = 99 "
+                 "BEGIN SELECT RAISE(ABORT, 'bad word'); END")
+    conn.commit()
+    conn.close()
+
+    queue = ReviewEventQueue(database, batch_size=100, flush_interval_ms=200)
+    good = queue.put([(1, 1, True)])
+    bad = queue.put([(1, 2, True), (1, 99, True)])
+    later = queue.put([(1, 2, False)])
+    good.wait(timeout=5)
+    later.wait(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError, match='bad word'):
+        bad.wait(timeout=5)
+    queue.close()
+
+    conn = sqlite3.connect(database)
+    # All of the bad ticket's events are rolled back, nobody else's
+    assert conn.execute('SELECT word_id, correct FROM review_events ORDER BY id').fetchall() == [(1, 1), (2, 0)]
+    conn.close()
+
+def test_events_must_name_an_existing_session_and_word(client, db):
+    def post(*events):
+        return client.post('/api/review-events', json={'durability': 'sync', 'events': [
+            {'study_session_id': session_id, 'word_id': word_id, 'is_correct': correct}
+            for session_id, word_id, correct in events]})
+
+    for events in [[(True, 1, True)], [(1, False, True)], [(1, 1, 1)], [(1, '1', True)]]:
+        assert post(*events).status_code == 400
+    response = post((1, 1, True), (2, 1, True))
+    assert (response.status_code, response.get_json()['error']) == (400, 'Unknown study_session_id: 2')
+    response = post((1, 1, True), (1, 7, True), (1, 8, False))
+    assert (response.status_code, response.get_json()['error']) == (400, 'Unknown word_id: 7, 8')
+    assert client.post('/api/review-events', json=[]).status_code == 400
+    assert db.execute('SELECT COUNT(*) FROM review_events').fetchone()[0] == 0
+
+    assert post((1, 1, True)).status_code == 201
+    assert [tuple(row) for row in db.execute('SELECT word_id, correct FROM review_events')] == [(1, 1)]
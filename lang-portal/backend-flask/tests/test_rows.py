@@ -0,0 +1,100 @@
+import sqlite3
+import pytest
+from flask import jsonify
+from lib.rows import Projection, stream_json
+
+@pytest.fixture
+def database(database):
+    conn = sqlite3.connect(database)
+    conn.executemany('INSERT INTO groups (name, words_count) VALUES (?, ?)',
+                     [(f'Group {i}', i) for i in range(1000)])
+    conn.commit()
+    conn.close()
+    return database
+
+def add_routes(app):
+    @app.route('/test/groups')
+    def groups():
+        cursor = app.db.read_cursor()
+        cursor.execute('SELECT id, name, words_count FROM groups ORDER BY id')
+        return stream_json(cursor, Projection('id', group_name='name', word_count='words_count'),
+                           'groups', total=1000)
+
+    # json('x') fails on the first row with id > broken_after
+    @app.route('/test/broken/<int:broken_after>')
+    def broken(broken_after):
+        try:
+            cursor = app.db.read_cursor()
+            app.opened.append(cursor.connection)
+            cursor.execute("SELECT id, CASE WHEN id > ? THEN json('x') ELSE name END AS name FROM groups ORDER BY id",
+                           (broken_after,))
+            return stream_json(cursor, Projection('id', 'name'), 'groups')
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    app.opened = []
+    return app
+
+@pytest.fixture
+def app(app):
+    return add_routes(app)
+
+def is_closed(connection):
+    try:
+        connection.execute('SELECT 1')
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+def test_projection_maps_and_renames_columns():
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.execute("SELECT 1 AS id, 'Verbs' AS name, 3 AS words_count")
+    assert Projection('id', group_name='name').map(cursor) == [{'id': 1, 'group_name': 'Verbs'}]
+    cursor = conn.execute("SELECT 1 AS id")
+    assert Projection('id').map(cursor) == [{'id': 1}]
+
+def test_stream_json_outlives_request_teardown(client):
+    response = client.get('/test/groups')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == 1000
+    assert len(data['groups']) == 1000
+    assert data['groups'][999] == {'id': 1000, 'group_name': 'Group 999', 'word_count': 999}
+
+def test_stream_json_fails_before_sending_rows_when_it_can(app, client):
+    response = client.get('/test/broken/0')
+    assert response.status_code == 500
+    assert 'malformed JSON' in response.get_json()['error']
+    assert is_closed(app.opened[0])
+
+def test_stream_json_cut_short_does_not_parse(app, client):
+    response = client.get('/test/broken/500')
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert body.startswith('{"groups":[{"id":')
+    assert not body.endswith('}\n')
+    with pytest.raises(ValueError):
+        response.get_json()
+    # As the server does once the body is sent
+    response.close()
+    assert is_closed(app.opened[0])
+
+def test_stream_json_releases_unread_responses(app, client):
+    # HEAD (or a client that goes away) never iterates the body
+    response = client.head('/test/broken/1000')
+    assert response.status_code == 200
+    response.close()
+    assert is_closed(app.opened[0])
+
+def test_stream_json_returns_tenant_connections_to_the_cache(make_app, tmp_path):
+    app = add_routes(make_app(TENANT_DIR=str(tmp_path / 'tenants')))
+    client = app.test_client()
+    # The learner's database gets the template's 1000 groups
+    for _ in range(2):
+        with client.get('/test/broken/1000', headers={'X-Learner-Id': 'ana'}) as response:
+            assert len(response.get_json()['groups']) == 1000
+        assert app.tenants.idle[('ana', True)] == [app.opened[0]]
+    # The second request streamed from the cached connection
+    assert app.opened == [app.opened[0]] * 2
+    assert not is_closed(app.opened[0])
+    app.tenants.close()
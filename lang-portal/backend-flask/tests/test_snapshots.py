@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import threading
+import pytest
+from lib import snapshots
+from lib.db import connect
+
+@pytest.fixture
+def database(database):
+    conn = connect(database)
+    conn.execute('CREATE TABLE t (x)')
+    conn.executemany('INSERT INTO t VALUES (randomblob(1000))', [()] * 2000)
+    conn.commit()
+    conn.close()
+    return database
+
+def count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+    finally:
+        conn.close()
+
+def test_stepped_backup_finishes_while_writes_continue(database, tmp_path):
+    stop = threading.Event()
+    def writer():
+        conn = sqlite3.connect(database)
+        while not stop.is_set():
+            conn.execute('INSERT INTO t VALUES (randomblob(1000))')
+            conn.commit()
+        conn.close()
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        target = str(tmp_path / 'snapshots' / snapshots.snapshot_name(database))
+        stats = snapshots.backup(database, target, pages=16, pause_ms=1)
+    finally:
+        stop.set()
+        thread.join()
+    assert stats['steps'] > 1
+    assert count(target) >= 2000
+    assert os.listdir(tmp_path / 'snapshots') == [os.path.basename(target)]
+
+def test_restore_is_seen_by_open_connections(database, tmp_path):
+    target = str(tmp_path / 'words-20240101T000000Z.db')
+    snapshots.backup(database, target)
+    live = connect(database)
+    live.execute('DELETE FROM t')
+    live.commit()
+
+    snapshots.restore(target, database)
+    assert live.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 2000
+    live.close()
+
+    (tmp_path / 'junk.db').write_bytes(b'not a database' * 100)
+    with pytest.raises(ValueError):
+        snapshots.restore(str(tmp_path / 'junk.db'), database)
+    assert count(database) == 2000
+
+def test_admin_endpoints(make_app, db, tmp_path):
+    app = make_app(SNAPSHOT_DIR=str(tmp_path / 'snapshots'), ADMIN_TOKEN='secret')
+    client = app.test_client()
+    auth = {'Authorization': 'Bearer secret'}
+
+    assert client.post('/api/admin/snapshots').status_code == 403
+    created = client.post('/api/admin/snapshots', headers=auth)
+    assert created.status_code == 201
+    name = created.get_json()['name']
+    assert [s['name'] for s in client.get('/api/admin/snapshots', headers=auth).get_json()['snapshots']] == [name]
+
+    db.execute("INSERT INTO groups (name) VALUES ('Later')")
+    db.commit()
+    assert client.post(f'/api/admin/snapshots/{name}/restore', headers=auth).status_code == 200
+    assert client.get('/groups').get_json()['groups'] == []
+
+    assert client.post('/api/admin/snapshots/..%2Fwords.db/restore', headers=auth).status_code == 404
+    assert client.post('/api/admin/snapshots/other-20240101T000000Z.db/restore', headers=auth).status_code == 404
+
+def test_admin_endpoints_are_off_without_a_token(client):
+    assert client.post('/api/admin/snapshots').status_code == 404
@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Generous enough for a slow CI runner; a regression back to importing
+# manga_ocr/torch at startup costs several seconds
+BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 2.0))
+
+HEAVY_MODULES = ['manga_ocr', 'torch', 'PIL', 'numpy', 'requests', 'dotenv']
+
+def test_create_app_is_fast_and_imports_no_heavy_modules(tmp_path):
+    # A fresh interpreter, so modules imported by other tests don't count
+    script = '''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app({'DATABASE': sys.argv[1]})
+print(json.dumps({'seconds': time.perf_counter() - start,
+                  'heavy': [name for name in sys.argv[2:] if name in sys.modules]}))
+'''
+    result = subprocess.run([sys.executable, '-c', script, str(tmp_path / 'words.db'), *HEAVY_MODULES],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    startup = json.loads(result.stdout.strip().splitlines()[-1])
+    assert startup['heavy'] == []
+    assert startup['seconds'] < BUDGET_SECONDS
@@ -1,27 +1,28 @@
 import pytest
 from datetime import datetime
 import logging
+from lib import daily_activity
 
 @pytest.fixture(autouse=True)
 def setup_logging():
     logging.basicConfig(level=logging.INFO)
 
-def test_create_study_session_success(client, app):
+def test_create_study_session_success(client, db):
     logging.info("Starting test_create_study_session_success")
     # Insert test data
-    cursor = app.db.cursor()
+    cursor = db.cursor()
     
     # Create test group
     cursor.execute('''
-        INSERT INTO groups (name, created_at) 
-        VALUES ('Test Group', datetime('now'))
+        INSERT INTO groups (name)
+        VALUES ('Test Group')
     ''')
     group_id = cursor.lastrowid
 
     # Create test activity
     cursor.execute('''
-        INSERT INTO study_activities (name, created_at) 
-        VALUES ('Test Activity', datetime('now'))
+        INSERT INTO study_activities (name, url)
+        VALUES ('Test Activity', 'http://localhost:8081')
     ''')
     activity_id = cursor.lastrowid
 
@@ -29,12 +30,12 @@ def test_create_study_session_success(client, app):
     word_ids = []
     for i in range(3):
         cursor.execute('''
-            INSERT INTO words (kanji, romaji, english, created_at)
-            VALUES (?, ?, ?, datetime('now'))
+            INSERT INTO words (kanji, romaji, english, parts)
+            VALUES (?, ?, ?, '[]')
         ''', (f'漢字{i}', f'kanji{i}', f'english{i}'))
         word_ids.append(cursor.lastrowid)
     
-    app.db.commit()
+    db.commit()
     cursor.close()
 
     # Test creating a study session
@@ -82,7 +83,7 @@ def test_create_study_session_validation_errors(client):
     assert response.status_code == 400
     assert 'word_ids cannot be empty' in response.get_json()['error']
 
-def test_create_study_session_invalid_references(client, app):
+def test_create_study_session_invalid_references(client, db):
     logging.info("Starting test_create_study_session_invalid_references")
     # Test invalid group_id and study_activity_id
     response = client.post('/api/study-sessions', json={
@@ -94,20 +95,20 @@ def test_create_study_session_invalid_references(client, app):
     assert 'Invalid group_id or study_activity_id' in response.get_json()['error']
 
     # Create valid group and activity
-    cursor = app.db.cursor()
+    cursor = db.cursor()
     cursor.execute('''
-        INSERT INTO groups (name, created_at) 
-        VALUES ('Test Group', datetime('now'))
+        INSERT INTO groups (name)
+        VALUES ('Test Group')
     ''')
     group_id = cursor.lastrowid
 
     cursor.execute('''
-        INSERT INTO study_activities (name, created_at) 
-        VALUES ('Test Activity', datetime('now'))
+        INSERT INTO study_activities (name, url)
+        VALUES ('Test Activity', 'http://localhost:8081')
     ''')
     activity_id = cursor.lastrowid
     
-    app.db.commit()
+    db.commit()
     cursor.close()
 
     response = client.post('/api/study-sessions', json={
@@ -118,29 +119,29 @@ def test_create_study_session_invalid_references(client, app):
     assert response.status_code == 400
     assert 'One or more word_ids are invalid' in response.get_json()['error']
 
-def test_submit_study_session_review_success(client, app):
-    cursor = app.db.cursor()
+def test_submit_study_session_review_success(client, db):
+    cursor = db.cursor()
     try:
         # Create test group
         cursor.execute('''
-            INSERT INTO groups (name, created_at) 
-            VALUES ('Test Group', datetime('now'))
+            INSERT INTO groups (name)
+            VALUES ('Test Group')
         ''')
         group_id = cursor.lastrowid
 
         # Create test activity
         cursor.execute('''
-            INSERT INTO study_activities (name, created_at) 
-            VALUES ('Test Activity', datetime('now'))
+            INSERT INTO study_activities (name, url)
+            VALUES ('Test Activity', 'http://localhost:8081')
         ''')
         activity_id = cursor.lastrowid
 
         # Create test words
         cursor.execute('''
-            INSERT INTO words (kanji, romaji, english, created_at) 
-            VALUES 
-                ('犬', 'inu', 'dog', datetime('now')),
-                ('猫', 'neko', 'cat', datetime('now'))
+            INSERT INTO words (kanji, romaji, english, parts)
+            VALUES
+                ('犬', 'inu', 'dog', '[]'),
+                ('猫', 'neko', 'cat', '[]')
         ''')
         word1_id = cursor.lastrowid
         word2_id = cursor.lastrowid - 1
@@ -163,7 +164,7 @@ def test_submit_study_session_review_success(client, app):
                 VALUES (?, ?, 0, datetime('now'))
             ''', (session_id, word_id))
 
-        app.db.commit()
+        db.commit()
 
         # Test the review submission
         response = client.post(f'/api/study-sessions/{session_id}/review', json={
@@ -187,12 +188,12 @@ def test_submit_study_session_review_success(client, app):
         cursor.execute('SELECT correct FROM word_review_items WHERE word_id = ?', (word2_id,))
         assert cursor.fetchone()['correct'] == 0
 
-        cursor.execute('SELECT correct_count, wrong_count FROM words WHERE id = ?', (word1_id,))
+        cursor.execute('SELECT correct_count, wrong_count FROM word_reviews WHERE word_id = ?', (word1_id,))
         word1_stats = cursor.fetchone()
         assert word1_stats['correct_count'] == 1
         assert word1_stats['wrong_count'] == 0
 
-        cursor.execute('SELECT correct_count, wrong_count FROM words WHERE id = ?', (word2_id,))
+        cursor.execute('SELECT correct_count, wrong_count FROM word_reviews WHERE word_id = ?', (word2_id,))
         word2_stats = cursor.fetchone()
         assert word2_stats['correct_count'] == 0
         assert word2_stats['wrong_count'] == 1
@@ -200,20 +201,20 @@ def test_submit_study_session_review_success(client, app):
     finally:
         cursor.close()
 
-def test_submit_study_session_review_validation(client, app):
+def test_submit_study_session_review_validation(client, db):
     """Test various validation cases for the review submission endpoint"""
-    cursor = app.db.cursor()
+    cursor = db.cursor()
     try:
         # Create minimal test data
         cursor.execute('''
-            INSERT INTO groups (name, created_at) 
-            VALUES ('Test Group', datetime('now'))
+            INSERT INTO groups (name)
+            VALUES ('Test Group')
         ''')
         group_id = cursor.lastrowid
 
         cursor.execute('''
-            INSERT INTO study_activities (name, created_at) 
-            VALUES ('Test Activity', datetime('now'))
+            INSERT INTO study_activities (name, url)
+            VALUES ('Test Activity', 'http://localhost:8081')
         ''')
         activity_id = cursor.lastrowid
 
@@ -227,7 +228,7 @@ def test_submit_study_session_review_validation(client, app):
         ''', (group_id, activity_id))
         session_id = cursor.lastrowid
 
-        app.db.commit()
+        db.commit()
 
         # Test missing JSON
         response = client.post(f'/api/study-sessions/{session_id}/review')
@@ -263,27 +264,27 @@ def test_submit_study_session_review_validation(client, app):
     finally:
         cursor.close()
 
-def test_submit_study_session_review_prevent_double_submission(client, app):
+def test_submit_study_session_review_prevent_double_submission(client, db):
     """Test that a study session cannot be reviewed twice"""
-    cursor = app.db.cursor()
+    cursor = db.cursor()
     try:
         # Create test data
         cursor.execute('''
-            INSERT INTO groups (name, created_at) 
-            VALUES ('Test Group', datetime('now'))
+            INSERT INTO groups (name)
+            VALUES ('Test Group')
         ''')
         group_id = cursor.lastrowid
 
         cursor.execute('''
-            INSERT INTO study_activities (name, created_at) 
-            VALUES ('Test Activity', datetime('now'))
+            INSERT INTO study_activities (name, url)
+            VALUES ('Test Activity', 'http://localhost:8081')
         ''')
         activity_id = cursor.lastrowid
 
         # Create test word
         cursor.execute('''
-            INSERT INTO words (kanji, romaji, english, created_at) 
-            VALUES ('犬', 'inu', 'dog', datetime('now'))
+            INSERT INTO words (kanji, romaji, english, parts)
+            VALUES ('犬', 'inu', 'dog', '[]')
         ''')
         word_id = cursor.lastrowid
 
@@ -309,7 +310,7 @@ def test_submit_study_session_review_prevent_double_submission(client, app):
             ) VALUES (?, ?, 1, datetime('now'))
         ''', (session_id, word_id))
 
-        app.db.commit()
+        db.commit()
 
         # Attempt to submit review for completed session
         response = client.post(f'/api/study-sessions/{session_id}/review', json={
@@ -324,29 +325,29 @@ def test_submit_study_session_review_prevent_double_submission(client, app):
     finally:
         cursor.close()
 
-def test_submit_study_session_review_requires_all_words(client, app):
+def test_submit_study_session_review_requires_all_words(client, db):
     """Test that all words in a session must be reviewed together"""
-    cursor = app.db.cursor()
+    cursor = db.cursor()
     try:
         # Create test data
         cursor.execute('''
-            INSERT INTO groups (name, created_at) 
-            VALUES ('Test Group', datetime('now'))
+            INSERT INTO groups (name)
+            VALUES ('Test Group')
         ''')
         group_id = cursor.lastrowid
 
         cursor.execute('''
-            INSERT INTO study_activities (name, created_at) 
-            VALUES ('Test Activity', datetime('now'))
+            INSERT INTO study_activities (name, url)
+            VALUES ('Test Activity', 'http://localhost:8081')
         ''')
         activity_id = cursor.lastrowid
 
         # Create test words
         cursor.execute('''
-            INSERT INTO words (kanji, romaji, english, created_at) 
-            VALUES 
-                ('犬', 'inu', 'dog', datetime('now')),
-                ('猫', 'neko', 'cat', datetime('now'))
+            INSERT INTO words (kanji, romaji, english, parts)
+            VALUES
+                ('犬', 'inu', 'dog', '[]'),
+                ('猫', 'neko', 'cat', '[]')
         ''')
         word1_id = cursor.lastrowid
         word2_id = cursor.lastrowid - 1
@@ -373,7 +374,7 @@ def test_submit_study_session_review_requires_all_words(client, app):
                 ) VALUES (?, ?, 0, datetime('now'))
             ''', (session_id, word_id))
 
-        app.db.commit()
+        db.commit()
 
         # Attempt to submit review for only one word
         response = client.post(f'/api/study-sessions/{session_id}/review', json={
@@ -386,4 +387,91 @@ def test_submit_study_session_review_requires_all_words(client, app):
         assert 'All words in the session must be reviewed' in response.get_json()['error']
 
     finally:
-        cursor.close() 
\ No newline at end of file
+        cursor.close() 
+def test_create_study_session_updates_daily_activity(client, db):
+    """Test that the daily_activity rollup is maintained when a session is created"""
+    cursor = db.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO groups (name)
+            VALUES ('Test Group')
+        ''')
+        group_id = cursor.lastrowid
+
+        cursor.execute('''
+            INSERT INTO study_activities (name, url)
+            VALUES ('Test Activity', 'http://localhost:8081')
+        ''')
+        activity_id = cursor.lastrowid
+
+        cursor.execute('''
+            INSERT INTO words (kanji, romaji, english, parts)
+            VALUES
+                ('犬', 'inu', 'dog', '[]'),
+                ('猫', 'neko', 'cat', '[]')
+        ''')
+        word_ids = [cursor.lastrowid - 1, cursor.lastrowid]
+        db.commit()
+
+        session_ids = []
+        for _ in range(2):
+            response = client.post('/api/study-sessions', json={
+                'group_id': group_id,
+                'study_activity_id': activity_id,
+                'word_ids': word_ids
+            })
+            assert response.status_code == 201
+            session_ids.append(response.get_json()['id'])
+
+        def activity():
+            return [tuple(row) for row in cursor.execute('''
+                SELECT day, sessions, reviews, correct
+                FROM daily_activity
+                WHERE group_id = ?
+            ''', (group_id,))]
+
+        today = cursor.execute("SELECT date('now')").fetchone()[0]
+        # Nothing has been answered yet
+        assert activity() == [(today, 2, 0, 0)]
+
+        response = client.post(f'/api/study-sessions/{session_ids[0]}/review', json={
+            'reviews': [
+                {'word_id': word_ids[0], 'is_correct': True},
+                {'word_id': word_ids[1], 'is_correct': False}
+            ]
+        })
+        assert response.status_code == 200
+        assert activity() == [(today, 2, 2, 1)]
+
+        # A rebuild agrees with the rows kept up to date by the routes
+        daily_activity.rebuild(cursor)
+        assert activity() == [(today, 2, 2, 1)]
+
+    finally:
+        cursor.close()
+
+def test_setup_adds_session_columns_to_an_older_database(tmp_path):
+    """Older databases were created without study_sessions.completed/updated_at"""
+    from app import create_app
+    from lib.db import connect
+    path = str(tmp_path / 'words.db')
+    connection = connect(path)
+    connection.execute('''
+        CREATE TABLE study_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER NOT NULL,
+            study_activity_id INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    connection.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+    connection.commit()
+
+    app = create_app({'DATABASE': path})
+    with app.app_context():
+        app.db.setup_tables(app.db.cursor())
+        app.db.close()
+
+    row = connection.execute('SELECT completed, updated_at FROM study_sessions').fetchone()
+    assert (row['completed'], row['updated_at']) == (0, None)
+    connection.close()
@@ -0,0 +1,71 @@
+import sqlite3
+import pytest
+from flask import jsonify
+from lib import tenants
+
+@pytest.fixture
+def database(database):
+    conn = sqlite3.connect(database)
+    conn.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+    conn.execute("INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)")
+    conn.commit()
+    conn.close()
+    return database
+
+@pytest.fixture
+def config(tmp_path):
+    return {'TENANT_DIR': str(tmp_path / 'tenants'), 'TENANT_CACHE_SIZE': 2,
+            'REVIEW_EVENTS_DURABILITY': 'sync', 'REVIEW_EVENTS_SYNC_TIMEOUT': 5}
+
+@pytest.fixture
+def app(app):
+    @app.route('/test/sessions', methods=['GET', 'POST'])
+    def sessions():
+        cursor = app.db.cursor()
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)")
+        app.db.commit()
+        cursor = app.db.read_cursor()
+        cursor.execute('SELECT COUNT(*) FROM study_sessions')
+        sessions = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM words')
+        return jsonify({"sessions": sessions, "words": cursor.fetchone()[0]})
+
+    yield app
+    app.review_events.close()
+    app.tenants.close()
+
+def test_each_learner_gets_a_database_seeded_from_the_template(app):
+    client = app.test_client()
+    assert client.post('/test/sessions', headers={'X-Learner-Id': 'ana'}).get_json() == {"sessions": 1, "words": 1}
+    assert client.post('/test/sessions', headers={'X-Learner-Id': 'ana'}).get_json() == {"sessions": 2, "words": 1}
+    assert client.post('/learners/ben/test/sessions').get_json() == {"sessions": 1, "words": 1}
+    assert app.tenants.list() == ['ana', 'ben']
+
+    # The template itself is untouched
+    conn = sqlite3.connect(app.config['DATABASE'])
+    assert conn.execute('SELECT COUNT(*) FROM study_sessions').fetchone()[0] == 1
+    conn.close()
+
+def test_requests_without_a_valid_learner_are_rejected(app):
+    client = app.test_client()
+    assert client.get('/test/sessions').status_code == 400
+    assert client.get('/test/sessions', headers={'X-Learner-Id': '../words'}).status_code == 400
+    assert client.get('/learners/a.b/test/sessions').status_code == 400
+
+def test_idle_connections_are_cached_and_evicted_lru(app):
+    client = app.test_client()
+    for learner in ['ana', 'ben', 'cy']:
+        client.post('/test/sessions', headers={'X-Learner-Id': learner})
+    assert app.tenants.idle_count == 2
+    assert [tenant for tenant, _ in app.tenants.idle] == ['cy', 'cy']
+
+def test_review_events_are_written_to_the_learners_database(app):
+    client = app.test_client()
+    client.post('/test/sessions', headers={'X-Learner-Id': 'ana'})
+    response = client.post('/api/review-events', headers={'X-Learner-Id': 'ana'},
+                           json={"events": [{"study_session_id": 1, "word_id": 1, "is_correct": True}]})
+    assert response.status_code == 201
+
+    rows = tenants.aggregate(app.tenants)
+    assert rows == [{"learner": "ana", "active_days": 1, "sessions": 1, "reviews": 1, "correct": 1,
+                     "accuracy": 100.0, "last_active": rows[0]['last_active']}]
@@ -0,0 +1,48 @@
+import numpy as np
+from lib import word_scores
+
+def test_score_smooths_and_ranks_by_difficulty():
+    word_ids = np.array([1, 2, 3, 4])
+    # word 1: 6/6 correct, word 2: 0/6 correct, word 3: unreviewed,
+    # word 4: one old wrong answer; word 99 no longer exists
+    review_word_ids = np.array([1] * 6 + [2] * 6 + [4, 99])
+    correct = np.array([1.0] * 6 + [0.0] * 6 + [0.0, 1.0])
+    age_days = np.array([1.0] * 12 + [365.0, 1.0])
+
+    scores = word_scores.score(word_ids, review_word_ids, correct, age_days)
+
+    assert scores['attempts'].tolist() == [6, 6, 0, 1]
+    assert scores['mastered'].tolist() == [True, False, False, False]
+    # Smoothing keeps rates strictly between 0 and 1
+    assert 0 < scores['success_rate'][1] < scores['success_rate'][2] < scores['success_rate'][0] < 1
+    assert np.argmax(scores['difficulty']) == 1
+    assert np.argmin(scores['difficulty']) == 0
+    # A year-old answer barely moves the recency-weighted difficulty
+    assert abs(scores['difficulty'][3] - scores['difficulty'][2]) < 0.01
+
+def test_score_without_history():
+    scores = word_scores.score(np.array([1, 2]), np.array([], dtype=np.int64), np.array([]), np.array([]))
+    assert scores['attempts'].tolist() == [0, 0]
+    assert scores['difficulty'].tolist() == [0.5, 0.5]
+
+def test_sessions_that_were_never_answered_are_not_history(db):
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('犬', 'inu', 'dog', '[]')")
+    cursor.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('猫', 'neko', 'cat', '[]')")
+    # Six sessions started with word 1 (placeholder review items), none answered
+    for _ in range(6):
+        cursor.execute("INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)")
+        cursor.execute('INSERT INTO word_review_items (study_session_id, word_id, correct) VALUES (?, 1, 0)',
+                       (cursor.lastrowid,))
+    # One real answer for word 2, and an event without a timestamp
+    cursor.execute("INSERT INTO review_events (study_session_id, word_id, correct, created_at) VALUES (1, 2, 1, datetime('now'))")
+    cursor.execute("INSERT INTO review_events (study_session_id, word_id, correct, created_at) VALUES (1, 2, 0, NULL)")
+    db.commit()
+
+    word_ids, review_word_ids, correct, age_days = word_scores.load_history(cursor)
+    assert review_word_ids.tolist() == [2]
+    scores = word_scores.score(word_ids, review_word_ids, correct, age_days)
+    # Word 1 gets no score of its own: no attempts, the prior's difficulty
+    assert scores['attempts'].tolist() == [0, 1]
+    assert scores['difficulty'][0] == 0.0
+    assert not scores['mastered'][0]
@@ -0,0 +1,85 @@
+import pytest
+
+@pytest.fixture
+def client(client, db):
+    db.executemany("INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, '[]')",
+                   [('犬', 'inu', 'dog'), ('猫', 'neko', 'cat'), ('鳥', 'tori', 'bird')])
+    db.execute("INSERT INTO groups (name) VALUES ('Animals')")
+    db.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, 1)', [(1,), (2,), (3,)])
+    db.executemany('INSERT INTO review_events (study_session_id, word_id, correct) VALUES (1, ?, ?)',
+                   [(1, 1), (1, 0), (2, 1), (2, 1), (2, 1), (3, 0)])
+    db.commit()
+    return client
+
+def test_words_sort_on_word_stats(client):
+    words = client.get('/words?sort_by=correct_count&order=desc').get_json()['words']
+    assert [(word['romaji'], word['correct_count'], word['wrong_count']) for word in words] == [
+        ('neko', 3, 0), ('inu', 1, 1), ('tori', 0, 1)
+    ]
+    words = client.get('/words?sort_by=accuracy').get_json()['words']
+    assert [(word['romaji'], word['accuracy']) for word in words] == [('tori', 0.0), ('inu', 0.5), ('neko', 1.0)]
+
+def test_group_words_sort_on_word_stats(client):
+    response = client.get('/groups/1/words?sort_by=wrong_count&order=desc').get_json()
+    assert [word['romaji'] for word in response['words']] == ['tori', 'inu', 'neko']
+    assert response['total_pages'] == 1
+
+def test_sorted_words_page_walks_the_index(db):
+    # The query /words runs for sort_by=correct_count must not sort in a temp b-tree
+    plan = ' '.join(row[3] for row in db.execute('''
+        EXPLAIN QUERY PLAN
+        SELECT w.id FROM words w
+        JOIN word_stats ws ON w.id = ws.word_id
+        LEFT JOIN word_scores s ON w.id = s.word_id
+        ORDER BY ws.correct_count DESC, ws.word_id DESC LIMIT 50
+    '''))
+    assert 'idx_word_stats_correct_count' in plan
+    assert 'TEMP B-TREE' not in plan
+
+def test_related_words_share_kanji_components(app):
+    import json
+    words = [
+        ('行く', 'iku', 'to go', [{'kanji': '行', 'romaji': ['i']}, {'kanji': 'く', 'romaji': ['ku']}]),
+        ('旅行', 'ryokou', 'travel', [{'kanji': '旅', 'romaji': ['ryo']}, {'kanji': '行', 'romaji': ['ko', 'u']}]),
+        ('旅', 'tabi', 'journey', [{'kanji': '旅', 'romaji': ['ta', 'bi']}]),
+        ('書く', 'kaku', 'to write', [{'kanji': '書', 'romaji': ['ka']}, {'kanji': 'く', 'romaji': ['ku']}]),
+        ('壊れた', 'broken', 'broken', 'not json'),
+    ]
+    with app.app_context():
+        cursor = app.db.cursor()
+        cursor.executemany('INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, ?)',
+                           [(kanji, romaji, english, json.dumps(parts) if isinstance(parts, list) else parts)
+                            for kanji, romaji, english, parts in words])
+        app.db.commit()
+        cursor.execute('SELECT kanji, romaji FROM word_parts WHERE word_id = 2 ORDER BY position')
+        assert [tuple(row) for row in cursor.fetchall()] == [('旅', 'ryo'), ('行', 'kou')]
+        app.db.close()
+    client = app.test_client()
+
+    response = client.get('/words/2/related').get_json()
+    assert response['components'] == ['旅', '行']
+    assert [(word['kanji'], word['shared']) for word in response['related']] == [('行く', ['行']), ('旅', ['旅'])]
+    # The shared okurigana く doesn't make 書く related to 行く
+    assert [word['kanji'] for word in client.get('/words/1/related').get_json()['related']] == ['旅行']
+    assert client.get('/words/5/related').get_json() == {'components': [], 'related': []}
+    assert client.get('/words/99/related').status_code == 404
+
+def test_words_batch_keeps_order_and_reports_missing_ids(client):
+    for response in [client.get('/words/batch?ids=3,1,99,3'), client.post('/words/batch', json={'ids': [3, 1, 99, 3]})]:
+        assert response.status_code == 200
+        body = response.get_json()
+        assert [word['romaji'] for word in body['words']] == ['tori', 'inu']
+        assert body['missing'] == [99]
+        assert body['words'][1]['groups'] == [{'id': 1, 'name': 'Animals'}]
+        assert (body['words'][1]['correct_count'], body['words'][1]['wrong_count']) == (1, 1)
+
+def test_words_batch_rejects_bad_input(client):
+    assert client.get('/words/batch').status_code == 400
+    assert client.get('/words/batch?ids=1,x').status_code == 400
+    assert client.get('/words/batch?ids=' + ','.join(['1'] * 1001)).status_code == 400
+    for body in [[1, 2], {'ids': []}, {'ids': [True, 2]}, {'ids': ['1']}, {'ids': 1}, {'ids': [1] * 1001}]:
+        response = client.post('/words/batch', json=body)
+        assert response.status_code == 400, body
+        assert 'error' in response.get_json()
+    assert client.post('/words/batch', data='[1', content_type='application/json').status_code == 400
+    assert client.post('/words/batch', data='ids=1').status_code == 400
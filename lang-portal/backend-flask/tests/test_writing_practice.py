@@ -0,0 +1,131 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from routes import writing_practice
+from tests.drawings import data_url, draw, png_bytes
+
+@pytest.fixture
+def config(classifier_path):
+    return {'KANA_CLASSIFIER_PATH': classifier_path, 'WRITING_PRACTICE_BATCH_LIMIT': 5}
+
+def test_batch_uses_the_classifier_and_one_ocr_call_for_the_rest(client, monkeypatch):
+    calls = []
+    def recognize_batch(images):
+        calls.append(len(images))
+        return ['う。'] * len(images)
+    # manga-ocr itself is far too heavy for a unit test
+    monkeypatch.setattr(writing_practice, 'recognize_batch', recognize_batch)
+
+    scribble = Image.new('L', (200, 200), 255)
+    ImageDraw.Draw(scribble).ellipse((40, 40, 160, 160), outline=0, width=8)
+    blank = np.full((100, 100), 255, dtype=np.uint8)
+
+    response = client.post('/writing-practice/verify-kana/batch', json={'items': [
+        {'image': data_url(draw('あ')), 'expectedKana': 'あ', 'kanaType': 'hiragana'},
+        {'image': data_url(draw('い', scale=0.9)), 'expectedKana': 'あ', 'kanaType': 'hiragana'},
+        {'image': data_url(np.array(scribble)), 'expectedKana': 'う', 'kanaType': 'hiragana'},
+        {'image': data_url(blank), 'expectedKana': 'え', 'kanaType': 'hiragana'},
+        {'expectedKana': 'お', 'kanaType': 'hiragana'},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert calls == [1]
+    assert [(r.get('recognized'), r.get('success'), r.get('engine')) for r in body['results']] == [
+        ('あ', True, 'classifier'),
+        ('い', False, 'classifier'),
+        ('う', True, 'manga_ocr'),
+        ('', False, 'none'),
+        (None, None, None),
+    ]
+    assert body['results'][4]['error'] == 'Missing required fields'
+    assert (body['correct'], body['total']) == (2, 5)
+
+def test_batch_validates_the_request(client):
+    assert client.post('/writing-practice/verify-kana/batch', json={}).status_code == 400
+    assert client.post('/writing-practice/verify-kana/batch', json={'items': []}).status_code == 400
+    item = {'image': '', 'expectedKana': 'あ', 'kanaType': 'hiragana'}
+    assert client.post('/writing-practice/verify-kana/batch', json={'items': [item] * 6}).status_code == 400
+
+FIELDS = {'expectedKana': 'あ', 'expectedRomaji': 'a', 'kanaType': 'hiragana'}
+
+def test_verify_kana_accepts_binary_uploads(client):
+    drawing = draw('あ', scale=0.9)
+    responses = [
+        client.post('/writing-practice/verify-kana', data={**FIELDS, 'image': (io.BytesIO(png_bytes(drawing)), 'kana.png')},
+                    content_type='multipart/form-data'),
+        client.post('/writing-practice/verify-kana', query_string=FIELDS, data=png_bytes(drawing),
+                    content_type='image/png'),
+        client.post('/writing-practice/verify-kana', query_string=FIELDS, data=drawing.tobytes(),
+                    content_type='application/octet-stream',
+                    headers={'X-Image-Width': str(drawing.shape[1]), 'X-Image-Height': str(drawing.shape[0])}),
+    ]
+    for response in responses:
+        assert response.status_code == 200
+        assert (response.get_json()['recognized'], response.get_json()['success']) == ('あ', True)
+
+def test_verify_kana_rejects_malformed_bitmaps(client):
+    drawing = draw('あ')
+    def raw(width, height, body=drawing.tobytes(), fields=FIELDS):
+        return client.post('/writing-practice/verify-kana', query_string=fields, data=body,
+                           content_type='application/octet-stream',
+                           headers={'X-Image-Width': str(width), 'X-Image-Height': str(height)}).status_code
+    assert raw(200, 201) == 400  # Short body
+    assert raw(100, 200) == 400  # Long body
+    assert raw(5000, 5000) == 400  # Over WRITING_PRACTICE_MAX_PIXELS
+    assert raw(200, 200, fields={'kanaType': 'hiragana'}) == 400
+    assert client.post('/writing-practice/verify-kana', data=b'x', content_type='text/plain').status_code == 400
+
+def test_verify_kana_caps_pixels_for_every_image_format(make_app):
+    client = make_app(WRITING_PRACTICE_MAX_PIXELS=10000).test_client()
+    large = np.full((300, 300), 255, dtype=np.uint8)
+    responses = [
+        client.post('/writing-practice/verify-kana', json={**FIELDS, 'image': data_url(large)}),
+        client.post('/writing-practice/verify-kana', query_string=FIELDS, data=png_bytes(large), content_type='image/png'),
+        client.post('/writing-practice/verify-kana', data={**FIELDS, 'image': (io.BytesIO(png_bytes(large)), 'kana.png')},
+                    content_type='multipart/form-data'),
+    ]
+    for response in responses:
+        assert response.status_code == 400
+        assert 'at most 10000 pixels' in response.get_json()['error']
+
+def test_batch_refuses_oversized_images(make_app):
+    large = np.full((300, 300), 255, dtype=np.uint8)
+    response = make_app(WRITING_PRACTICE_MAX_PIXELS=10000).test_client().post('/writing-practice/verify-kana/batch', json={'items': [
+        {'image': data_url(draw('あ', size=100)), 'expectedKana': 'あ', 'kanaType': 'hiragana'},
+        {'image': data_url(large), 'expectedKana': 'あ', 'kanaType': 'hiragana'},
+    ]})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Item 1: Image must be at most 10000 pixels'
+
+def test_verify_kana_grades_a_blank_drawing_as_wrong(client):
+    blank = np.full((100, 100), 255, dtype=np.uint8)
+    response = client.post('/writing-practice/verify-kana', json={**FIELDS, 'image': data_url(blank)})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['success'], body['recognized'], body['message']) == (False, '', 'Nothing was drawn')
+
+def test_verify_kana_rejects_unreadable_images(client):
+    def post(**kwargs):
+        return client.post('/writing-practice/verify-kana', **kwargs)
+    responses = [
+        post(query_string=FIELDS, data=b'garbage', content_type='image/png'),
+        post(data={**FIELDS, 'image': (io.BytesIO(b'garbage'), 'kana.png')}, content_type='multipart/form-data'),
+        post(query_string=FIELDS, data=png_bytes(draw('あ'))[:100], content_type='image/png'),
+        post(json={**FIELDS, 'image': 'data:image/png;base64'}),
+        post(json={**FIELDS, 'image': 'data:image/png;base64,abc'}),
+        post(json={**FIELDS, 'image': 12}),
+        post(json={**FIELDS, 'image': data_url(draw('あ')), 'kanaType': ['hiragana']}),
+    ]
+    for response in responses:
+        assert response.status_code == 400, response.get_json()
+        assert 'error' in response.get_json()
+
+def test_batch_reports_unreadable_items(client):
+    response = client.post('/writing-practice/verify-kana/batch', json={'items': [
+        {'image': 'data:image/png;base64,Z2FyYmFnZQ==', 'expectedKana': 'あ', 'kanaType': 'hiragana'},
+        {'image': data_url(draw('あ')), 'expectedKana': 'あ', 'kanaType': 1},
+    ]})
+    assert response.status_code == 200
+    assert [result['error'] for result in response.get_json()['results']] == [
+        'Invalid image: Could not read image: UnidentifiedImageError', 'kanaType must be a string']
@@ -95,19 +95,26 @@ export default function RomajiToKana({ kanaType }: RomajiToKanaProps) {
         if (!canvasRef.current || !currentKana) return
 
         try {
-            const imageData = canvasRef.current.toDataURL('image/png')
-            
-            const response = await fetch('/api/writing-practice/verify-kana', {
+            // Sent as a raw PNG body rather than a base64 data URL in JSON,
+            // which is a third larger and slower to parse on the server
+            const imageBlob = await new Promise<Blob | null>(resolve =>
+                canvasRef.current!.toBlob(resolve, 'image/png')
+            )
+            if (!imageBlob) {
+                throw new Error('Failed to encode drawing')
+            }
+            const params = new URLSearchParams({
+                expectedKana: currentKana.kana,
+                expectedRomaji: currentKana.romaji,
+                kanaType: kanaType.toLowerCase(),
+            })
+
+            const response = await fetch(`/api/writing-practice/verify-kana?${params}`, {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json',
+                    'Content-Type': 'image/png',
                 },
-                body: JSON.stringify({
-                    image: imageData,
-                    expectedKana: currentKana.kana,
-                    expectedRomaji: currentKana.romaji,
-                    kanaType: kanaType.toLowerCase(),
-                }),
+                body: imageBlob,
             })
 
             if (!response.ok) {